@@ -0,0 +1,255 @@
+# =============================================================================
+# PRECOMPUTED ANSWER STORE
+# Memory-mapped question -> answer table for known questions, tagged with the
+# checkpoint version that produced it and rebuilt when the checkpoint changes
+# =============================================================================
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from curated_answers import tokenize_words, load_curated_dataset
+from trimmed_vocab import VOCAB_MAP_FILE
+from numpy_t5 import WEIGHTS_DIR, MANIFEST_FILE
+
+STORE_DIR = "answer_store"
+STORE_MANIFEST = "manifest.json"
+
+# Best BLEU preset plus reranking over sampled candidates
+STORE_PRESET = "optimal"
+STORE_NUM_CANDIDATES = 4
+
+# Files whose change means a different checkpoint (weights, config, vocabulary, version)
+CHECKPOINT_FILES = ['tf_model.h5', 'model.safetensors', 'pytorch_model.bin', 'config.json', VOCAB_MAP_FILE,
+                    'version.json', os.path.join(WEIGHTS_DIR, MANIFEST_FILE)]
+
+
+def normalize_question(question: str) -> str:
+    """Case, punctuation and whitespace-insensitive form used as the store key"""
+    return ' '.join(tokenize_words(question))
+
+
+def question_key(question: str) -> int:
+    """64-bit key of the normalized question"""
+    digest = hashlib.blake2b(normalize_question(question).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def checkpoint_tag(model_path: str) -> str:
+    """
+    Version tag of a checkpoint: the published version (version.json) or directory name
+    plus a hash of the checkpoint files' sizes and modification times. A Hub id is its own tag.
+    """
+    if not os.path.isdir(model_path):
+        return model_path
+
+    digest = hashlib.sha1()
+    for name in CHECKPOINT_FILES:
+        path = os.path.join(model_path, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{name}:{stat.st_size}:{int(stat.st_mtime)}".encode('utf-8'))
+
+    label = os.path.basename(os.path.abspath(model_path))
+    version_file = os.path.join(model_path, 'version.json')
+    if os.path.exists(version_file):
+        with open(version_file, 'r', encoding='utf-8') as f:
+            label = f"v{int(json.load(f).get('version', 0)):03d}"
+    return f"{label}-{digest.hexdigest()[:12]}"
+
+
+def write_answer_store(answers: Dict[str, str], directory: str, model_tag: str, metadata: Optional[Dict] = None) -> Dict:
+    """
+    Write sorted uint64 keys, answer offsets and one UTF-8 answer blob, plus the manifest
+    and the question list (reused by rebuilds). Written to a uniquely named staging
+    directory next to `directory` and swapped in, so readers never see a half-written store.
+    """
+    entries = {}
+    for question, answer in answers.items():
+        entries.setdefault(question_key(question), (question, answer))
+    keys = np.array(sorted(entries), dtype=np.uint64)
+
+    encoded = [entries[int(key)][1].encode('utf-8') for key in keys]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(answer) for answer in encoded])
+
+    directory = directory.rstrip(os.sep)
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f"{os.path.basename(directory)}.staging-", dir=parent)
+    np.save(os.path.join(staging, 'keys.npy'), keys)
+    np.save(os.path.join(staging, 'offsets.npy'), offsets)
+    with open(os.path.join(staging, 'answers.bin'), 'wb') as f:
+        f.write(b''.join(encoded))
+    with open(os.path.join(staging, 'questions.json'), 'w', encoding='utf-8') as f:
+        json.dump(sorted(answers), f, ensure_ascii=False)
+
+    manifest = dict(metadata or {}, model_tag=model_tag, entries=len(keys), built=datetime.now().isoformat())
+    with open(os.path.join(staging, STORE_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # os.replace cannot overwrite a non-empty directory: move the current store aside and retry
+    retired = tempfile.mkdtemp(prefix=f"{os.path.basename(directory)}.old-", dir=parent)
+    try:
+        for attempt in range(10):
+            try:
+                os.replace(staging, directory)
+                break
+            except OSError:
+                if attempt == 9:
+                    raise
+                try:
+                    os.replace(directory, os.path.join(retired, str(attempt)))
+                except FileNotFoundError:
+                    pass
+    finally:
+        shutil.rmtree(retired, ignore_errors=True)
+        shutil.rmtree(staging, ignore_errors=True)
+    return manifest
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def build_lock(directory: str):
+    """
+    Exclusive `<directory>.lock` for the duration of a build, so one process answers the
+    questions and writes the store. A lock left by a dead process is taken over;
+    RuntimeError if another live process holds it.
+    """
+    path = f"{directory.rstrip(os.sep)}.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    owner = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                owner = 0
+            if owner and _pid_alive(owner):
+                raise RuntimeError(f"Answer store {directory} is being built by process {owner}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    else:
+        raise RuntimeError(f"Could not lock answer store {directory}")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(str(os.getpid()))
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class AnswerStore:
+    """Read-only view of a store directory; lookups are a binary search over memory-mapped keys"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, STORE_MANIFEST), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.keys = np.load(os.path.join(directory, 'keys.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'), mmap_mode='r')
+        self.blob = np.memmap(os.path.join(directory, 'answers.bin'), dtype=np.uint8, mode='r') \
+            if int(self.offsets[-1]) > 0 else np.zeros(0, dtype=np.uint8)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, directory: str) -> Optional["AnswerStore"]:
+        """The store in `directory`, or None if it has not been built"""
+        if not os.path.exists(os.path.join(directory, STORE_MANIFEST)):
+            return None
+        return cls(directory)
+
+    @property
+    def model_tag(self) -> str:
+        return self.manifest['model_tag']
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def questions(self) -> List[str]:
+        with open(os.path.join(self.directory, 'questions.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def lookup(self, question: str) -> Optional[str]:
+        key = np.uint64(question_key(question))
+        index = int(np.searchsorted(self.keys, key))
+        if index < len(self.keys) and self.keys[index] == key:
+            self.hits += 1
+            start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+            return bytes(self.blob[start:end]).decode('utf-8')
+        self.misses += 1
+        return None
+
+    def summary(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {'entries': len(self), 'model_tag': self.model_tag, 'lookups': lookups,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+def default_store_questions() -> List[str]:
+    """Curated dataset questions (the dataset already includes the generated variations)"""
+    return [entry['question'] for entry in load_curated_dataset()]
+
+
+def build_answer_store(answer_fn: Callable[[str], str], questions: List[str], directory: str, model_tag: str,
+                       metadata: Optional[Dict] = None, verbose: bool = True) -> Dict:
+    """Answer every distinct question with `answer_fn` and write the store (under the build lock)"""
+    with build_lock(directory):
+        return _build_answer_store(answer_fn, questions, directory, model_tag, metadata, verbose)
+
+
+def _build_answer_store(answer_fn, questions, directory, model_tag, metadata, verbose) -> Dict:
+    unique = list(dict.fromkeys(question.strip() for question in questions if question.strip()))
+    answers = {}
+    failed = 0
+    for index, question in enumerate(unique):
+        try:
+            answers[question] = answer_fn(question)
+        except Exception as e:
+            # Left out of the store: the question falls through to live generation
+            failed += 1
+            if verbose:
+                print(f"   Skipped '{question}': {e}")
+        if verbose and (index + 1) % 50 == 0:
+            print(f"   Precomputed {index + 1}/{len(unique)} answers")
+    return write_answer_store(answers, directory, model_tag, dict(metadata or {}, failed=failed))
+
+
+def rebuild_in_background(answer_fn: Callable[[str], str], questions: List[str], directory: str, model_tag: str,
+                          on_done: Callable[["AnswerStore"], None], metadata: Optional[Dict] = None) -> threading.Thread:
+    """Rebuild the store on a daemon thread and hand the new store to `on_done` (opt-in, see AyikaBot)"""
+    def run():
+        try:
+            build_answer_store(answer_fn, questions, directory, model_tag, metadata, verbose=False)
+            on_done(AnswerStore(directory))
+        except Exception as e:
+            print(f"Answer store rebuild failed: {e}")
+
+    thread = threading.Thread(target=run, name="answer-store-rebuild", daemon=True)
+    thread.start()
+    return thread
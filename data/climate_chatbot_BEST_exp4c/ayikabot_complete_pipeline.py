@@ -3,11 +3,22 @@
 # COMPLETE AYIKABOT PIPELINE - TRAINED MODEL + DOMAIN INTELLIGENCE
 # =============================================================================
 
+import os
 import re
 import time
 import numpy as np
-from typing import List, Tuple, Optional
-from transformers import TFT5ForConditionalGeneration, T5Tokenizer
+from typing import Dict, List, Tuple, Optional
+
+from generation_presets import get_preset
+from curated_answers import CuratedAnswerIndex
+from candidate_reranking import generate_best_answer, rerank_candidates, encode_question
+from trimmed_vocab import load_tokenizer
+from answer_store import (AnswerStore, STORE_DIR, STORE_PRESET, STORE_NUM_CANDIDATES, checkpoint_tag,
+                          default_store_questions, rebuild_in_background)
+from semantic_cache import SemanticCache, CACHE_DIR, mean_pool
+
+# TensorFlow-dependent modules (model, logits processors, speculative decoding) are
+# imported by the 'tf' backend only, so the 'numpy' backend never loads TensorFlow
 
 # Domain Detection Keywords
 CLIMATE_KEYWORDS = {
@@ -65,20 +76,163 @@ SCIENCE_CONNECTIONS = {
 class AyikaBot:
     """Complete AyikaBot with trained model and domain intelligence"""
     
-    def __init__(self, model_path):
-        """Initialize with trained model"""
+    def __init__(self, model_path, preset="pipeline", num_candidates=1, repetition_guard=True, use_xla=False,
+                 speculative=False, adaptive_length=True, backend="tf", use_answer_store=True,
+                 answer_store_dir=None, rebuild_answer_store=False, use_semantic_cache=False,
+                 semantic_cache_dir=None):
+        """
+        Initialize with trained model and a named generation preset.
+        num_candidates > 1 samples several answers in one batched run and keeps the best.
+        repetition_guard blocks repeated n-grams/word loops at decode time (XLA-compatible).
+        use_xla compiles generation with XLA; inputs are padded to a fixed length.
+        speculative decodes greedily with drafts looked up in the retrieved curated answers.
+        adaptive_length budgets max/min length per question and stops at a sentence boundary.
+        backend "numpy" runs the TensorFlow-free engine on weights exported by
+        data/model/numpy_export.py (no XLA, speculative or adaptive length; the
+        repetition guard becomes no_repeat_ngram_size=3).
+        use_answer_store answers known questions from the precomputed store
+        (default <model_path>/answer_store) if it was built for this checkpoint; build it
+        with data/model/precompute_answers.py (continual training does so for each checkpoint
+        it publishes). rebuild_answer_store=True instead rebuilds a
+        missing or stale store on a background thread (one process at a time, under a lock);
+        leave it off in batch workers, load tests and server replicas.
+        use_semantic_cache reuses the answer of a previously answered paraphrase, matched
+        on mean-pooled encoder states (default <model_path>/semantic_cache). Off by default:
+        calibrate the threshold with data/model/semantic_cache_audit.py first.
+        """
+        if backend not in ("tf", "numpy"):
+            raise ValueError(f"Unknown backend '{backend}'. Available: tf, numpy")
+        if backend == "numpy" and (use_xla or speculative):
+            raise ValueError("The numpy backend supports neither use_xla nor speculative")
+
         print("Loading AyikaBot...")
-        self.tokenizer = T5Tokenizer.from_pretrained(model_path)
+        # Vocabulary-trimmed checkpoints (vocab_map.json) get the remapping tokenizer
+        self.tokenizer = load_tokenizer(model_path)
+        self.backend = backend
+        self.preset = preset
+        self.num_candidates = num_candidates
+        self.repetition_guard = repetition_guard
+        self._curated_index = None
+        
+        self.repetition_processors = None
+        self.speculative = speculative
+        self.length_predictor = None
+        self.sentence_stops = None
+        self.use_xla = use_xla
+        
+        if backend == "numpy":
+            self._load_numpy_backend(model_path)
+        else:
+            self._load_tf_backend(model_path, adaptive_length)
+        
+        self.answer_store = None
+        self._answer_store_rebuild = None
+        if use_answer_store:
+            self._open_answer_store(model_path, answer_store_dir, rebuild_answer_store)
+        
+        self.semantic_cache = None
+        if use_semantic_cache:
+            directory = semantic_cache_dir or (os.path.join(model_path, CACHE_DIR) if os.path.isdir(model_path) else None)
+            d_model = self.model.d_model if backend == "numpy" else self.model.config.d_model
+            self.semantic_cache = (SemanticCache.load(directory, d_model, model_tag=checkpoint_tag(model_path))
+                                   if directory else SemanticCache(d_model))
+            print(f"Semantic cache: {len(self.semantic_cache)} cached answers")
+        print(f"AyikaBot loaded successfully! ({backend} backend)")
+
+    def _load_numpy_backend(self, model_path):
+        from numpy_t5 import NumpyT5
+        self.model = NumpyT5.from_pretrained(model_path)
+        self._generate_fn = self.model.generate
+
+    def _load_tf_backend(self, model_path, adaptive_length):
+        import tensorflow as tf
+        from transformers import TFT5ForConditionalGeneration
+        from repetition_control import build_repetition_processors, RepetitionStats
+        from speculative_decoding import SpeculativeStats
+        from length_budget import (LengthPredictor, LengthBudgetStats, SentenceStopProcessors,
+                                   build_sentence_end_mask)
+        
         self.model = TFT5ForConditionalGeneration.from_pretrained(model_path)
-        print("AyikaBot loaded successfully!")
+        
+        self.repetition_stats = RepetitionStats(self.tokenizer.eos_token_id, self.tokenizer.pad_token_id)
+        if self.repetition_guard:
+            self.repetition_processors = build_repetition_processors(self.tokenizer, self.model.config.vocab_size)
+        
+        self.speculative_stats = SpeculativeStats()
+        
+        self.length_stats = LengthBudgetStats()
+        if adaptive_length:
+            self.length_predictor = LengthPredictor(self.curated_index)
+            self.length_predictor.calibrate_tokens_per_word(self.tokenizer)
+            self.sentence_stops = SentenceStopProcessors(
+                build_sentence_end_mask(self.tokenizer, self.model.config.vocab_size),
+                self.tokenizer.eos_token_id
+            )
+        
+        self._generate_fn = tf.function(self.model.generate, jit_compile=True) if self.use_xla else self.model.generate
+
+    def _open_answer_store(self, model_path, answer_store_dir=None, rebuild=False):
+        """Use the precomputed store if it matches this checkpoint; otherwise, if asked, rebuild it in the background"""
+        directory = answer_store_dir or (os.path.join(model_path, STORE_DIR) if os.path.isdir(model_path) else None)
+        if directory is None:
+            return
+        
+        tag = checkpoint_tag(model_path)
+        store = AnswerStore.open(directory)
+        if store is not None and store.model_tag == tag:
+            self.answer_store = store
+            print(f"Answer store: {len(store)} precomputed answers ({tag})")
+            return
+        
+        # Answers from another checkpoint are not served; the rebuild swaps the new store in
+        if not rebuild:
+            print(f"Answer store {'is stale' if store is not None else 'missing'} for {tag}: not used "
+                  f"(run data/model/precompute_answers.py)")
+            return
+        questions = store.questions() if store is not None else default_store_questions()
+        print(f"Answer store {'is stale' if store is not None else 'missing'}: "
+              f"rebuilding {len(questions)} answers in the background for {tag}")
+        self._answer_store_rebuild = rebuild_in_background(
+            self.precompute_answer, questions, directory, tag, self._set_answer_store,
+            metadata={'preset': STORE_PRESET, 'num_candidates': STORE_NUM_CANDIDATES, 'backend': self.backend}
+        )
+
+    def _set_answer_store(self, store):
+        self.answer_store = store
+        print(f"Answer store rebuilt: {len(store)} precomputed answers ({store.model_tag})")
+
+    def precompute_answer(self, question: str) -> str:
+        """Store-quality answer: best preset plus reranking, cleaned like generate_answer"""
+        # The store preset's own max_length, not the per-request length budget; generation keeps
+        # no shared per-request state, so this can run on a background thread next to live requests
+        answer = self._generate_model_answer(question, get_preset(STORE_PRESET).get('max_length'), None,
+                                             STORE_PRESET, num_candidates=STORE_NUM_CANDIDATES)
+        return self._clean_answer(question, answer)
+
+    @property
+    def curated_index(self) -> CuratedAnswerIndex:
+        """Curated dataset retrieval index, built on first use"""
+        if self._curated_index is None:
+            self._curated_index = CuratedAnswerIndex()
+        return self._curated_index
     
-    def is_climate_related(self, question: str) -> Tuple[bool, float, str]:
-        """Check if question is climate-related"""
+    def match_climate_keywords(self, question: str) -> List[Tuple[str, List[str]]]:
+        """Climate keyword categories matched by the question, with their matched keywords"""
         question_lower = question.lower().strip()
         cleaned_question = re.sub(r'\b(what|how|why|when|where|who|can|is|are|do|does|will|would|could|should|please|tell|me|about)\b', '', question_lower)
         cleaned_question = re.sub(r'[^\w\s]', ' ', cleaned_question)
         cleaned_question = ' '.join(cleaned_question.split())
         
+        matches = []
+        for category, keywords in CLIMATE_KEYWORDS.items():
+            category_keywords = [keyword for keyword in keywords if keyword in cleaned_question]
+            if category_keywords:
+                matches.append((category, category_keywords))
+        
+        return matches
+    
+    def is_climate_related(self, question: str) -> Tuple[bool, float, str]:
+        """Check if question is climate-related"""
         total_score = 0
         matched_categories = []
         keyword_matches = []
@@ -86,20 +240,11 @@ class AyikaBot:
         weights = {'core_climate': 4.0, 'climate_science': 3.0, 'climate_impacts': 2.5, 
                   'climate_solutions': 2.5, 'climate_education': 2.0, 'environmental': 1.5}
         
-        for category, keywords in CLIMATE_KEYWORDS.items():
-            category_matches = 0
-            category_keywords = []
-            
-            for keyword in keywords:
-                if keyword in cleaned_question:
-                    category_matches += 1
-                    category_keywords.append(keyword)
-                    
-            if category_matches > 0:
-                weight = weights.get(category, 1.0)
-                total_score += category_matches * weight
-                matched_categories.append(category)
-                keyword_matches.extend(category_keywords)
+        for category, category_keywords in self.match_climate_keywords(question):
+            weight = weights.get(category, 1.0)
+            total_score += len(category_keywords) * weight
+            matched_categories.append(category)
+            keyword_matches.extend(category_keywords)
         
         max_possible_score = sum(len(keywords) * weights.get(category, 1.0) 
                                for category, keywords in CLIMATE_KEYWORDS.items())
@@ -145,12 +290,56 @@ class AyikaBot:
         
         return None
     
-    def generate_answer(self, question: str, max_length=100, temperature=0.7) -> str:
+    def generate_answer(self, question: str, max_length=None, temperature=None, preset=None) -> str:
         """Generate domain-specific climate education answer"""
+        return self.respond(question, max_length, temperature, preset)[0]
+    
+    def respond(self, question: str, max_length=None, temperature=None, preset=None) -> Tuple[str, Dict]:
+        """
+        Answer plus how it was produced: response_type (climate_answer, redirect,
+        science_connection or error), is_climate, confidence, reason and answer_source
+        (answer_store, semantic_cache or model) for climate answers
+        """
+        reply, metadata = self._route(question)
+        if reply is not None:
+            return reply, metadata
+        
+        # Known questions come straight from the precomputed store
+        if self.answer_store is not None and max_length is None and temperature is None and preset is None:
+            stored = self.answer_store.lookup(question)
+            if stored is not None:
+                return stored, dict(metadata, answer_source='answer_store')
+        
+        # Generate answer using trained model
+        try:
+            encoded = None
+            if self.semantic_cache is not None and max_length is None and temperature is None and preset is None:
+                # The encoder output used for the cache lookup is reused for decoding on a miss
+                encoded = self._encode_question(question)
+                cached = self.semantic_cache.lookup(encoded[2], question)
+                if cached is not None:
+                    return cached, dict(metadata, answer_source='semantic_cache')
+            
+            matched_categories = [category for category, _ in self.match_climate_keywords(question)]
+            answer = self._generate_model_answer(question, max_length, temperature, preset, matched_categories,
+                                                 encoded=encoded)
+            answer = self._clean_answer(question, answer)
+            if encoded is not None:
+                self.semantic_cache.add(encoded[2], question, answer)
+            return answer, dict(metadata, answer_source='model')
+            
+        except Exception as e:
+            return (f"I can help with this climate question, but encountered a technical issue. Please try rephrasing your question.",
+                    dict(metadata, response_type='error', reason=f"{type(e).__name__}: {e}"))
+    
+    def _route(self, question: str) -> Tuple[Optional[str], Dict]:
+        """Domain routing: the reply to a non-climate question, or None for a climate question"""
         # Domain analysis
         is_climate, confidence, reason = self.is_climate_related(question)
         is_non_climate, non_climate_topic, non_climate_keywords = self.detect_non_climate_topics(question)
         science_connection = self.handle_science_questions(question)
+        metadata = {'response_type': 'redirect', 'is_climate': is_climate, 'confidence': confidence,
+                    'reason': reason, 'answer_source': None}
         
         # Handle non-climate questions
         if is_non_climate and confidence < 0.2:
@@ -160,11 +349,12 @@ class AyikaBot:
                     f"environment, and sustainability. Your question appears to be about {topic_display} "
                     f"(detected: {examples}). \n\n"
                     f"Try asking about: global warming, renewable energy, carbon footprint, "
-                    f"climate impacts, or environmental solutions!")
+                    f"climate impacts, or environmental solutions!"), metadata
         
         # Handle science connections
         if science_connection and not is_climate:
-            return f"{science_connection}\n\nWould you like to know more about the climate aspects of this topic?"
+            metadata['response_type'] = 'science_connection'
+            return f"{science_connection}\n\nWould you like to know more about the climate aspects of this topic?", metadata
         
         # Handle low confidence questions
         if not is_climate or confidence < 0.05:
@@ -173,47 +363,220 @@ class AyikaBot:
                     f"   Environmental impacts (sea level rise, extreme weather)\n"
                     f"   Climate solutions (renewable energy, sustainability)\n"
                     f"   Climate education and awareness\n\n"
-                    f"Could you please ask a climate-related question?")
+                    f"Could you please ask a climate-related question?"), metadata
         
-        # Generate answer using trained model
-        try:
-            prompt = f"question: {question.strip()}"
-            inputs = self.tokenizer(prompt, return_tensors="tf")
-            
-            output_ids = self.model.generate(
-                inputs.input_ids,
-                attention_mask=inputs.attention_mask,
-                max_length=max_length,
-                min_length=20,
-                temperature=temperature,
-                do_sample=True,
-                top_p=0.9,
-                top_k=50,
-                repetition_penalty=1.2,
-                num_beams=2,
-                early_stopping=True,
-                pad_token_id=self.tokenizer.pad_token_id,
-                eos_token_id=self.tokenizer.eos_token_id
-            )
-            
-            answer = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
-            
-            # Clean response
-            if answer.lower().startswith(question.lower()):
-                answer = answer[len(question):].strip()
-            
-            prefixes = ["question:", "answer:", "response:"]
-            for prefix in prefixes:
-                if answer.lower().startswith(prefix):
-                    answer = answer[len(prefix):].strip()
-            
-            if len(answer.split()) < 8:
-                answer = f"This is an important climate topic. {answer}"
-            
+        metadata['response_type'] = 'climate_answer'
+        return None, metadata
+    
+    def respond_batch(self, questions: List[str], batch_size: int = 16) -> List[Tuple[str, Dict]]:
+        """
+        respond() for many questions: routing and answer store lookups per question, then
+        the remaining climate questions decoded together in padded batches. Speculative and
+        multi-candidate generation are per question, so they fall back to respond().
+        Each item's metadata carries its generation_time (its batch's decode time if batched).
+        """
+        results: List[Optional[Tuple[str, Dict]]] = [None] * len(questions)
+        pending = []
+        for position, question in enumerate(questions):
+            start = time.time()
+            reply, metadata = self._route(question)
+            if reply is None and self.answer_store is not None:
+                reply = self.answer_store.lookup(question)
+                if reply is not None:
+                    metadata = dict(metadata, answer_source='answer_store')
+            if reply is None and (self.speculative or self.num_candidates > 1):
+                reply, metadata = self.respond(question)
+            if reply is None:
+                pending.append((position, metadata))
+            else:
+                results[position] = (reply, dict(metadata, generation_time=time.time() - start, batch_size=1))
+        
+        for offset in range(0, len(pending), batch_size):
+            chunk = pending[offset:offset + batch_size]
+            batch = [questions[position] for position, _ in chunk]
+            start = time.time()
+            try:
+                answers = [(self._clean_answer(question, answer), {'answer_source': 'model'})
+                           for question, answer in zip(batch, self._generate_model_answers(batch))]
+            except Exception as e:
+                answers = [("I can help with this climate question, but encountered a technical issue. "
+                            "Please try rephrasing your question.",
+                            {'response_type': 'error', 'reason': f"{type(e).__name__}: {e}"})] * len(batch)
+            elapsed = time.time() - start
+            for (position, metadata), (answer, update) in zip(chunk, answers):
+                results[position] = (answer, dict(metadata, **update, generation_time=elapsed, batch_size=len(batch)))
+        return results
+    
+    def _clean_answer(self, question: str, answer: str) -> str:
+        """Strip an echoed question or prefix and pad very short answers"""
+        if answer.lower().startswith(question.lower()):
+            answer = answer[len(question):].strip()
+        
+        prefixes = ["question:", "answer:", "response:"]
+        for prefix in prefixes:
+            if answer.lower().startswith(prefix):
+                answer = answer[len(prefix):].strip()
+        
+        if len(answer.split()) < 8:
+            answer = f"This is an important climate topic. {answer}"
+        
+        return answer
+    
+    def _generation_params(self, question, max_length=None, temperature=None, preset=None,
+                           matched_categories=None) -> Dict:
+        """Preset parameters plus per-question (or per-batch, for a list) length budget and decode-time processors"""
+        params = get_preset(preset or self.preset, max_length=max_length, temperature=temperature)
+        if self.backend == "numpy":
+            if self.repetition_guard:
+                params['no_repeat_ngram_size'] = max(params.get('no_repeat_ngram_size', 0), 3)
+            return params
+        
+        from transformers import TFLogitsProcessorList
+        from repetition_control import with_repetition_guard
+        processors = list(self.repetition_processors or [])
+        
+        if self.length_predictor is not None and max_length is None:
+            budget = self._length_budget(question, matched_categories, params.get('max_length', 100))
+            params['max_length'] = budget['max_length']
+            params['min_length'] = min(max(params.get('min_length', 0), budget['min_length']),
+                                       budget['predicted_length'])
+            # A processor per target, never mutated: concurrent requests keep their own budget
+            processors.append(self.sentence_stops.get(budget['predicted_length']))
+        
+        if self.repetition_processors is not None:
+            params = with_repetition_guard(params, TFLogitsProcessorList(processors))
+        elif processors:
+            params['logits_processor'] = TFLogitsProcessorList(processors)
+        
+        return params
+    
+    def _length_budget(self, question, matched_categories, max_cap: int) -> Dict:
+        """
+        Length budget of a question, or for a list of questions the budget covering all of
+        them (longest max_length, shortest min_length, latest stop target): a sentence
+        stop processor applies one target to every row of a batch
+        """
+        if isinstance(question, str):
+            return self.length_predictor.budget(question, matched_categories, max_cap=max_cap)
+        budgets = [self.length_predictor.budget(text, categories, max_cap=max_cap)
+                   for text, categories in zip(question, matched_categories or [None] * len(question))]
+        return {'max_length': max(budget['max_length'] for budget in budgets),
+                'min_length': min(budget['min_length'] for budget in budgets),
+                'predicted_length': max(budget['predicted_length'] for budget in budgets)}
+    
+    def _generate_model_answers(self, questions: List[str]) -> List[str]:
+        """Raw decoded answers of several climate questions from one padded generate call"""
+        matched_categories = [[category for category, _ in self.match_climate_keywords(question)]
+                              for question in questions]
+        generation_params = self._generation_params(questions, matched_categories=matched_categories)
+        default_max_length = get_preset(self.preset).get('max_length', 100)
+        
+        prompts = [f"question: {question.strip()}" for question in questions]
+        if self.backend == "numpy":
+            inputs = self.tokenizer(prompts, return_tensors="np", padding=True, max_length=110, truncation=True)
+        elif self.use_xla:
+            inputs = self.tokenizer(prompts, return_tensors="tf", padding="max_length", max_length=64, truncation=True)
+        else:
+            inputs = self.tokenizer(prompts, return_tensors="tf", padding=True)
+        
+        output_ids = self._generate_fn(
+            inputs.input_ids,
+            attention_mask=inputs.attention_mask,
+            pad_token_id=self.tokenizer.pad_token_id,
+            eos_token_id=self.tokenizer.eos_token_id,
+            **generation_params
+        )
+        
+        for row in output_ids:
+            if self.repetition_processors is not None:
+                self.repetition_stats.record(row, generation_params.get('max_length', 100))
+            if self.length_predictor is not None:
+                self.length_stats.record(generation_params.get('max_length', 100), default_max_length,
+                                         int(output_ids.shape[-1]))
+        return [self.tokenizer.decode(row, skip_special_tokens=True) for row in output_ids]
+    
+    def _generate_model_answer(self, question: str, max_length=None, temperature=None, preset=None,
+                               matched_categories=None, num_candidates=None, encoded=None) -> str:
+        """Run the T5 model for a climate question and return the raw decoded answer"""
+        preset = preset or self.preset
+        num_candidates = num_candidates or self.num_candidates
+        default_max_length = max_length or get_preset(preset).get('max_length', 100)
+        
+        if self.speculative:
+            from speculative_decoding import generate_speculative
+            # Greedy-identical output; sampling options of the preset do not apply
+            references = [entry['answer'] for entry in self.curated_index.retrieve(question, top_k=3)]
+            return generate_speculative(self.model, self.tokenizer, question, references,
+                                        max_length=default_max_length, stats=self.speculative_stats)
+        
+        generation_params = self._generation_params(question, max_length, temperature, preset, matched_categories)
+        
+        if num_candidates > 1:
+            reference = self.curated_index.best_answer(question)
+            if self.backend == "numpy":
+                return self._numpy_best_answer(question, reference, num_candidates, generation_params)
+            overrides = {key: generation_params[key]
+                         for key in ('max_length', 'min_length', 'temperature', 'logits_processor')
+                         if key in generation_params}
+            answer, _ = generate_best_answer(self.model, self.tokenizer, question, reference,
+                                             num_candidates=num_candidates, preset=preset,
+                                             **overrides)
             return answer
-            
-        except Exception as e:
-            return f"I can help with this climate question, but encountered a technical issue. Please try rephrasing your question."
+        
+        prompt = f"question: {question.strip()}"
+        if encoded is not None and not self.use_xla:
+            inputs = encoded[0]
+            generation_params = dict(generation_params, encoder_outputs=encoded[1])
+        elif self.backend == "numpy":
+            inputs = self.tokenizer(prompt, return_tensors="np")
+        elif self.use_xla:
+            # Fixed input shape so the compiled generate function is reused
+            inputs = self.tokenizer(prompt, return_tensors="tf", padding="max_length",
+                                    max_length=64, truncation=True)
+        else:
+            inputs = self.tokenizer(prompt, return_tensors="tf")
+        
+        output_ids = self._generate_fn(
+            inputs.input_ids,
+            attention_mask=inputs.attention_mask,
+            pad_token_id=self.tokenizer.pad_token_id,
+            eos_token_id=self.tokenizer.eos_token_id,
+            **generation_params
+        )
+        
+        if self.repetition_processors is not None:
+            self.repetition_stats.record(output_ids[0], generation_params.get('max_length', 100))
+        if self.length_predictor is not None:
+            self.length_stats.record(generation_params.get('max_length', 100), default_max_length,
+                                     int(output_ids.shape[-1]))
+        
+        return self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
+    
+    def _encode_question(self, question: str):
+        """Tokenized prompt, encoder output and its mean-pooled unit embedding"""
+        if self.backend == "numpy":
+            inputs = self.tokenizer(f"question: {question.strip()}", return_tensors="np", max_length=110, truncation=True)
+            hidden = self.model.encode(inputs.input_ids, inputs.attention_mask)
+            return inputs, hidden, mean_pool(hidden, inputs.attention_mask)[0]
+        
+        inputs, encoder_outputs = encode_question(self.model, self.tokenizer, question)
+        vector = mean_pool(encoder_outputs.last_hidden_state.numpy(), inputs.attention_mask.numpy())[0]
+        return inputs, encoder_outputs, vector
+    
+    def embed_question(self, question: str) -> np.ndarray:
+        """Mean-pooled encoder embedding used as the semantic cache key"""
+        return self._encode_question(question)[2]
+    
+    def _numpy_best_answer(self, question: str, reference, num_candidates: int, generation_params: Dict) -> str:
+        """generate_best_answer for the numpy backend: one encoder pass, sampled candidates, rerank"""
+        inputs = self.tokenizer(f"question: {question.strip()}", return_tensors="np", max_length=110, truncation=True)
+        params = dict(generation_params, do_sample=True, num_beams=1)
+        output_ids = self.model.generate(inputs.input_ids, inputs.attention_mask, num_return_sequences=num_candidates,
+                                         pad_token_id=self.tokenizer.pad_token_id,
+                                         eos_token_id=self.tokenizer.eos_token_id, **params)
+        candidates = [self.tokenizer.decode(ids, skip_special_tokens=True) for ids in output_ids]
+        answer, _ = rerank_candidates(candidates, reference)
+        return answer
     
     def chat(self):
         """Interactive chat interface"""
@@ -235,6 +598,26 @@ class AyikaBot:
                     print(f"   Climate questions answered: {session_stats['climate_questions']}")
                     print(f"   Off-topic questions redirected: {session_stats['rejected_questions']}")
                     print(f"   Average response time: {avg_time:.1f}s")
+                    if self.repetition_processors is not None:
+                        repetition = self.repetition_stats.summary()
+                        print(f"   Decode steps saved by loop stopping: {repetition['avg_tokens_saved']:.1f} tokens/answer")
+                    if self.length_predictor is not None:
+                        lengths = self.length_stats.summary()
+                        print(f"   Length budget: {lengths['avg_budget_max_length']:.0f} max tokens/answer "
+                              f"(preset {lengths['avg_default_max_length']:.0f}), "
+                              f"{lengths['avg_generated_length']:.0f} generated")
+                    if self.semantic_cache is not None:
+                        cache = self.semantic_cache.summary()
+                        print(f"   Semantic cache hit rate: {cache['hit_rate']:.1%} ({cache['entries']} cached answers)")
+                        if self.semantic_cache.directory:
+                            self.semantic_cache.save()
+                    if self.answer_store is not None:
+                        store = self.answer_store.summary()
+                        print(f"   Answer store hit rate: {store['hit_rate']:.1%} of {store['lookups']} lookups")
+                    if self.speculative:
+                        speculative = self.speculative_stats.summary()
+                        print(f"   Draft acceptance rate: {speculative['acceptance_rate']:.1%} "
+                              f"({speculative['tokens_per_forward_pass']:.2f} tokens/forward pass)")
                     print("Thanks for learning about climate with AyikaBot!")
                     break
                     
@@ -275,9 +658,10 @@ class AyikaBot:
                 print(f"Error occurred. Please try rephrasing your question.")
 
 # Usage functions
-def load_ayikabot(model_path="/content/climate_chatbot_BEST_exp4c"):
+def load_ayikabot(model_path="/content/climate_chatbot_BEST_exp4c", preset="pipeline", num_candidates=1,
+                  backend="tf"):
     """Load complete AyikaBot system"""
-    return AyikaBot(model_path)
+    return AyikaBot(model_path, preset=preset, num_candidates=num_candidates, backend=backend)
 
 def quick_test(bot):
     """Quick test of the system"""
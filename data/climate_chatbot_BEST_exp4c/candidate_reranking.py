@@ -0,0 +1,177 @@
+# =============================================================================
+# MULTI-CANDIDATE GENERATION + FAST RERANKING
+# One encoder pass, K sampled answers in one batched decoder run, best one wins
+# =============================================================================
+
+import re
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from generation_presets import get_preset, estimate_generation_cost, DEFAULT_INPUT_LENGTH
+from curated_answers import tokenize_words
+
+# Factual error patterns (from the notebook's check_factual_errors), as regexes
+FACTUAL_ERROR_PATTERNS = {
+    'sea_level_error': [r'sea levels? falling', r'decreasing sea levels?'],
+    'temperature_error': [r'temperatures? decreasing', r'cooling trend', r'getting cooler'],
+    'co2_error': [r'co2 decreasing', r'carbon dioxide falling'],
+    'contradiction': [r'rising.*falling', r'increasing.*decreasing']
+}
+
+_COMPILED_PATTERNS = {error_type: [re.compile(pattern) for pattern in patterns]
+                      for error_type, patterns in FACTUAL_ERROR_PATTERNS.items()}
+
+# Reranking weights: higher score is better
+SCORE_WEIGHTS = {
+    'overlap': 2.0,
+    'repetition': 3.0,
+    'factual_errors': 2.5,
+    'length': 1.0
+}
+
+TARGET_WORDS = (25, 70)
+
+
+def check_factual_errors(answer: str) -> List[str]:
+    """Factual error types detected in an answer (one entry per matching pattern)"""
+    answer_lower = answer.lower()
+    errors = []
+    for error_type, patterns in _COMPILED_PATTERNS.items():
+        for pattern in patterns:
+            if pattern.search(answer_lower):
+                errors.append(error_type)
+    return errors
+
+
+def encode_question(model, tokenizer, question: str, max_input_length: int = 110):
+    """Tokenize and run the encoder once; the result can be reused by several decoder runs"""
+    inputs = tokenizer(f"question: {question.strip()}", return_tensors="tf",
+                       max_length=max_input_length, truncation=True)
+    encoder_outputs = model.get_encoder()(
+        inputs.input_ids, attention_mask=inputs.attention_mask, return_dict=True
+    )
+    return inputs, encoder_outputs
+
+
+def generate_candidates(model, tokenizer, question: str, num_candidates: int = 4,
+                        preset: str = "optimal", encoded=None, **overrides) -> List[str]:
+    """
+    Sample `num_candidates` answers in a single batched decoder run.
+    The encoder output is computed once and expanded across the candidates.
+    """
+    inputs, encoder_outputs = encoded or encode_question(model, tokenizer, question)
+    params = get_preset(preset, do_sample=True, num_beams=1, **overrides)
+    params.pop('early_stopping', None)
+    if 'logits_processor' in params:
+        # Decode-time repetition processors replace the non-XLA n-gram option
+        params.pop('no_repeat_ngram_size', None)
+
+    output_ids = model.generate(
+        inputs.input_ids,
+        attention_mask=inputs.attention_mask,
+        encoder_outputs=encoder_outputs,
+        num_return_sequences=num_candidates,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        **params
+    )
+    return [tokenizer.decode(ids, skip_special_tokens=True) for ids in output_ids]
+
+
+def _ngram_counts(word_lists: List[List[str]], n: int) -> np.ndarray:
+    """Candidate x n-gram count matrix over the n-grams seen in any candidate"""
+    grams = [[tuple(words[i:i + n]) for i in range(len(words) - n + 1)] for words in word_lists]
+    vocabulary = {gram: i for i, gram in enumerate({g for row in grams for g in row})}
+    counts = np.zeros((len(word_lists), max(len(vocabulary), 1)), dtype=np.float32)
+    for row, row_grams in enumerate(grams):
+        for gram in row_grams:
+            counts[row, vocabulary[gram]] += 1.0
+    return counts
+
+
+def score_candidates(candidates: List[str], reference: Optional[str] = None,
+                     target_words: Tuple[int, int] = TARGET_WORDS,
+                     weights: Dict = SCORE_WEIGHTS) -> Dict[str, np.ndarray]:
+    """
+    Score candidates on repetition, factual errors, length and reference overlap.
+    Returns per-feature arrays plus the combined `score` array.
+    """
+    word_lists = [tokenize_words(candidate) for candidate in candidates]
+    lengths = np.array([len(words) for words in word_lists], dtype=np.float32)
+
+    # Repetition: share of repeated unigrams and bigrams
+    repetition = np.zeros(len(candidates), dtype=np.float32)
+    for n in (1, 2):
+        counts = _ngram_counts(word_lists, n)
+        totals = counts.sum(axis=1)
+        distinct = (counts > 0).sum(axis=1)
+        repetition += np.where(totals > 0, 1.0 - distinct / np.maximum(totals, 1.0), 1.0)
+    repetition /= 2.0
+
+    factual_errors = np.array([len(check_factual_errors(candidate)) for candidate in candidates],
+                              dtype=np.float32)
+
+    low, high = target_words
+    length_penalty = np.where(lengths < low, np.log((low + 1.0) / (lengths + 1.0)),
+                              np.where(lengths > high, np.log((lengths + 1.0) / (high + 1.0)), 0.0))
+
+    overlap = np.zeros(len(candidates), dtype=np.float32)
+    if reference:
+        reference_words = set(tokenize_words(reference))
+        vocabulary = {word: i for i, word in enumerate(reference_words | {w for ws in word_lists for w in ws})}
+        presence = np.zeros((len(candidates), max(len(vocabulary), 1)), dtype=np.float32)
+        for row, words in enumerate(word_lists):
+            presence[row, [vocabulary[word] for word in set(words)]] = 1.0
+        reference_vector = np.zeros(presence.shape[1], dtype=np.float32)
+        reference_vector[[vocabulary[word] for word in reference_words]] = 1.0
+        intersection = presence @ reference_vector
+        union = presence.sum(axis=1) + reference_vector.sum() - intersection
+        overlap = intersection / np.maximum(union, 1.0)
+
+    score = (weights['overlap'] * overlap
+             - weights['repetition'] * repetition
+             - weights['factual_errors'] * factual_errors
+             - weights['length'] * length_penalty)
+
+    return {
+        'score': score,
+        'overlap': overlap,
+        'repetition': repetition,
+        'factual_errors': factual_errors,
+        'length_penalty': length_penalty,
+        'word_count': lengths
+    }
+
+
+def rerank_candidates(candidates: List[str], reference: Optional[str] = None) -> Tuple[str, Dict]:
+    """Return the best candidate and the score table"""
+    scores = score_candidates(candidates, reference)
+    best = int(np.argmax(scores['score']))
+    return candidates[best], scores
+
+
+def choose_num_candidates(preset: str = "optimal", budget_preset: str = "pipeline",
+                          max_candidates: int = 4, input_length: int = DEFAULT_INPUT_LENGTH,
+                          tolerance: float = 1.1) -> int:
+    """Largest K whose estimated cost stays within `tolerance` x a single `budget_preset` call"""
+    budget = estimate_generation_cost(budget_preset, input_length)['estimated_latency_s'] * tolerance
+    best = 1
+    for k in range(1, max_candidates + 1):
+        if estimate_generation_cost(preset, input_length, num_sequences=k)['estimated_latency_s'] <= budget:
+            best = k
+    return best
+
+
+def generate_best_answer(model, tokenizer, question: str, reference: Optional[str] = None,
+                         num_candidates: Optional[int] = None, preset: str = "optimal",
+                         **overrides) -> Tuple[str, Dict]:
+    """Encode once, sample K candidates, rerank against the retrieved curated answer"""
+    encoded = encode_question(model, tokenizer, question)
+    if num_candidates is None:
+        num_candidates = choose_num_candidates(preset, input_length=int(encoded[0].input_ids.shape[-1]))
+
+    candidates = generate_candidates(model, tokenizer, question, num_candidates,
+                                     preset=preset, encoded=encoded, **overrides)
+    best, scores = rerank_candidates(candidates, reference)
+    scores['candidates'] = candidates
+    return best, scores
@@ -0,0 +1,95 @@
+# =============================================================================
+# CURATED ANSWER INDEX
+# Lightweight TF-IDF retrieval over the curated climate Q&A dataset
+# =============================================================================
+
+import os
+import re
+import csv
+import numpy as np
+from typing import Dict, List, Optional
+
+DATASET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'dataset', 'climate_dataset.csv')
+
+STOPWORDS = {
+    'what', 'how', 'why', 'when', 'where', 'who', 'which', 'can', 'is', 'are', 'do', 'does',
+    'will', 'would', 'could', 'should', 'please', 'tell', 'me', 'about', 'the', 'a', 'an',
+    'of', 'to', 'in', 'on', 'and', 'or', 'for', 'it', 'its', 'this', 'that', 'be', 'by',
+    'with', 'as', 'at', 'from', 'we', 'you', 'i', 'our', 'your', 'they', 'their'
+}
+
+
+def tokenize_words(text: str) -> List[str]:
+    """Lowercase word tokens without punctuation"""
+    return re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower())
+
+
+def content_words(text: str) -> List[str]:
+    """Word tokens with question words and stopwords removed"""
+    return [word for word in tokenize_words(text) if word not in STOPWORDS]
+
+
+def load_curated_dataset(path: str = DATASET_FILE) -> List[Dict]:
+    """Read the curated dataset CSV into a list of row dicts"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        if row.get('word_count'):
+            row['word_count'] = int(row['word_count'])
+    return rows
+
+
+class CuratedAnswerIndex:
+    """TF-IDF index over curated questions for retrieving the closest curated answer"""
+
+    def __init__(self, entries: Optional[List[Dict]] = None, path: str = DATASET_FILE):
+        self.entries = entries if entries is not None else load_curated_dataset(path)
+
+        documents = [content_words(entry['question']) for entry in self.entries]
+        vocabulary = sorted({word for words in documents for word in words})
+        self.vocabulary = {word: i for i, word in enumerate(vocabulary)}
+
+        counts = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+        for row, words in enumerate(documents):
+            for word in words:
+                counts[row, self.vocabulary[word]] += 1.0
+
+        document_frequency = (counts > 0).sum(axis=0)
+        self.idf = np.log((1.0 + len(documents)) / (1.0 + document_frequency)) + 1.0
+        self.matrix = self._normalize(counts * self.idf)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-8)
+
+    def _vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for word in content_words(text):
+            index = self.vocabulary.get(word)
+            if index is not None:
+                vector[index] += 1.0
+        return self._normalize(vector * self.idf)
+
+    def retrieve(self, question: str, top_k: int = 1, min_score: float = 0.1) -> List[Dict]:
+        """Return up to `top_k` curated entries (with a `score` field) most similar to the question"""
+        if not self.entries:
+            return []
+
+        scores = self.matrix @ self._vectorize(question)
+        best = np.argsort(-scores)[:top_k]
+
+        results = []
+        for index in best:
+            if scores[index] < min_score:
+                break
+            entry = dict(self.entries[index])
+            entry['score'] = float(scores[index])
+            results.append(entry)
+        return results
+
+    def best_answer(self, question: str, min_score: float = 0.1) -> Optional[str]:
+        """Curated answer of the closest curated question, if any is close enough"""
+        results = self.retrieve(question, top_k=1, min_score=min_score)
+        return results[0]['answer'] if results else None
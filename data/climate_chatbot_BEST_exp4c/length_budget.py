@@ -0,0 +1,194 @@
+# =============================================================================
+# ADAPTIVE ANSWER-LENGTH BUDGETING
+# Per-question max_length/min_length from dataset statistics + sentence-boundary stop
+# =============================================================================
+
+import re
+import threading
+import numpy as np
+import tensorflow as tf
+from typing import Dict, List, Optional
+from transformers import TFLogitsProcessor
+
+from curated_answers import CuratedAnswerIndex
+
+# Domain-detection keyword categories -> dataset categories
+KEYWORD_TO_DATASET_CATEGORY = {
+    'core_climate': 'basic_concepts',
+    'climate_science': 'basic_concepts',
+    'climate_impacts': 'impacts',
+    'environmental': 'solutions',
+    'climate_solutions': 'solutions',
+    'climate_education': 'solutions'
+}
+
+# Question-form multipliers on the predicted answer length
+QUESTION_FORM_FACTORS = [
+    (r'^(what is|what\'s|define|definition of|meaning of)\b', 0.8),
+    (r'\b(explain|mechanism|why|how does|how do|in what way|what causes|process)\b', 1.15),
+    (r'\b(what are|examples|ways|list|name some|steps)\b', 1.05)
+]
+
+DIFFICULTY_FALLBACK = 'intermediate'
+TOKENS_PER_WORD = 1.35
+CORE_SENTENCES = 2
+
+# Budgets are rounded up to this multiple so XLA-compiled generation is not retraced per request
+LENGTH_BUCKET = 8
+
+
+def core_answer_words(answer: str, sentences: int = CORE_SENTENCES) -> int:
+    """
+    Words in the leading sentences of a curated answer. Training targets were cut to the
+    first sentences of long answers, so this is the length the model learned to produce
+    before elaborating; decoding may continue to the next sentence boundary after it.
+    """
+    return len('. '.join(answer.strip().split('. ')[:sentences]).split())
+
+
+class LengthPredictor:
+    """Predicts answer length (tokens) per question from the curated dataset's length statistics"""
+
+    def __init__(self, curated_index: Optional[CuratedAnswerIndex] = None,
+                 tokens_per_word: float = TOKENS_PER_WORD):
+        self.curated_index = curated_index or CuratedAnswerIndex()
+        self.tokens_per_word = tokens_per_word
+
+        groups: Dict = {}
+        for entry in self.curated_index.entries:
+            word_count = core_answer_words(entry['answer'])
+            for key in ((entry['category'], entry['difficulty']), (entry['category'], None), (None, None)):
+                groups.setdefault(key, []).append(word_count)
+
+        self.word_count_stats = {key: float(np.mean(counts)) for key, counts in groups.items()}
+
+    def calibrate_tokens_per_word(self, tokenizer) -> float:
+        """Measure the tokenizer's tokens-per-word ratio on the curated answers"""
+        answers = [entry['answer'] for entry in self.curated_index.entries]
+        tokens = sum(len(tokenizer.encode(answer, add_special_tokens=False)) for answer in answers)
+        words = sum(len(answer.split()) for answer in answers)
+        self.tokens_per_word = tokens / max(words, 1)
+        return self.tokens_per_word
+
+    def _group_words(self, category: Optional[str], difficulty: Optional[str]) -> float:
+        for key in ((category, difficulty), (category, None), (None, None)):
+            if key in self.word_count_stats:
+                return self.word_count_stats[key]
+        return 40.0
+
+    def predict_words(self, question: str, matched_categories: Optional[List[str]] = None) -> float:
+        """Expected answer length in words"""
+        matched_categories = matched_categories or []
+        nearest = self.curated_index.retrieve(question, top_k=1, min_score=0.3)
+
+        if nearest:
+            words = float(core_answer_words(nearest[0]['answer']))
+            # Blend the closest example with its group mean to smooth single-example noise
+            words = 0.5 * words + 0.5 * self._group_words(nearest[0]['category'], nearest[0]['difficulty'])
+        else:
+            category = KEYWORD_TO_DATASET_CATEGORY.get(matched_categories[0]) if matched_categories else None
+            words = self._group_words(category, DIFFICULTY_FALLBACK if category else None)
+
+        question_lower = question.lower().strip()
+        for pattern, factor in QUESTION_FORM_FACTORS:
+            if re.search(pattern, question_lower):
+                words *= factor
+                break
+
+        # Questions spanning several keyword categories tend to need broader answers
+        words *= 1.0 + 0.05 * min(max(len(set(matched_categories)) - 1, 0), 3)
+        return words
+
+    def budget(self, question: str, matched_categories: Optional[List[str]] = None,
+               max_cap: int = 100, min_floor: int = 12) -> Dict:
+        """Per-request `max_length`/`min_length` plus the sentence-boundary stop target"""
+        predicted = int(round(self.predict_words(question, matched_categories) * self.tokens_per_word))
+        predicted = min(max(predicted, min_floor), max_cap)
+
+        # Headroom past the prediction lets the current sentence finish before the stop fires
+        max_length = int(np.ceil(predicted * 1.5 / LENGTH_BUCKET) * LENGTH_BUCKET)
+        return {
+            'predicted_length': predicted,
+            'min_length': max(min_floor, int(predicted * 0.5)),
+            'max_length': min(max(max_length, predicted + LENGTH_BUCKET), max_cap)
+        }
+
+
+class TFSentenceBoundaryStopLogitsProcessor(TFLogitsProcessor):
+    """
+    Force EOS right after a sentence-ending token once `target_length` is reached.
+    The target is fixed per instance, so concurrent requests never share one; get
+    instances from SentenceStopProcessors so XLA-compiled generation is reused.
+    """
+
+    def __init__(self, sentence_end_mask, eos_token_id: int, target_length: int = 1000):
+        self.sentence_end_mask = (sentence_end_mask if isinstance(sentence_end_mask, tf.Tensor)
+                                  else tf.constant(sentence_end_mask, dtype=tf.bool))
+        self.eos_token_id = eos_token_id
+        self.target_length = int(target_length)
+
+    def __call__(self, input_ids: tf.Tensor, scores: tf.Tensor, cur_len) -> tf.Tensor:
+        cur_len = tf.cast(cur_len, tf.int32)
+        last_token = tf.gather(input_ids, tf.maximum(cur_len - 1, 0), axis=1)
+        stop = tf.logical_and(tf.gather(self.sentence_end_mask, last_token), cur_len > self.target_length)
+
+        eos_only = tf.one_hot(self.eos_token_id, tf.shape(scores)[-1], on_value=0.0,
+                              off_value=float("-inf"), dtype=scores.dtype)
+        return tf.where(stop[:, None], tf.broadcast_to(eos_only[None, :], tf.shape(scores)), scores)
+
+
+class SentenceStopProcessors:
+    """
+    One immutable sentence-stop processor per target length, created on first use.
+    Requests with the same target share an instance (and its XLA trace); targets are
+    bounded by LengthPredictor.budget's floor and cap, so at most ~90 are ever built.
+    """
+
+    def __init__(self, sentence_end_mask: np.ndarray, eos_token_id: int):
+        self.sentence_end_mask = tf.constant(sentence_end_mask, dtype=tf.bool)
+        self.eos_token_id = eos_token_id
+        self._processors: Dict[int, TFSentenceBoundaryStopLogitsProcessor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, target_length: int) -> TFSentenceBoundaryStopLogitsProcessor:
+        target_length = int(target_length)
+        with self._lock:
+            if target_length not in self._processors:
+                self._processors[target_length] = TFSentenceBoundaryStopLogitsProcessor(
+                    self.sentence_end_mask, self.eos_token_id, target_length)
+            return self._processors[target_length]
+
+
+def build_sentence_end_mask(tokenizer, vocab_size: int) -> np.ndarray:
+    """Boolean mask of pieces that end a sentence ('.', '?', '!')"""
+    mask = np.zeros(vocab_size, dtype=bool)
+    pieces = tokenizer.convert_ids_to_tokens(list(range(min(vocab_size, len(tokenizer)))))
+    for token_id, piece in enumerate(pieces):
+        if piece and piece.rstrip().endswith(('.', '?', '!')) and not piece.endswith('...'):
+            mask[token_id] = True
+    return mask
+
+
+class LengthBudgetStats:
+    """Decode-step budget actually used versus the fixed preset budget"""
+
+    def __init__(self):
+        self.answers = 0
+        self.budget_steps = 0
+        self.default_steps = 0
+        self.generated_steps = 0
+
+    def record(self, budget_max_length: int, default_max_length: int, generated_length: int):
+        self.answers += 1
+        self.budget_steps += budget_max_length
+        self.default_steps += default_max_length
+        self.generated_steps += generated_length
+
+    def summary(self) -> Dict:
+        answers = max(self.answers, 1)
+        return {
+            'answers': self.answers,
+            'avg_budget_max_length': self.budget_steps / answers,
+            'avg_default_max_length': self.default_steps / answers,
+            'avg_generated_length': self.generated_steps / answers
+        }
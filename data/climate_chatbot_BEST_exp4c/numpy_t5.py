@@ -0,0 +1,511 @@
+# =============================================================================
+# PURE-NUMPY T5 INFERENCE ENGINE
+# TensorFlow-free encoder/decoder forward pass over memory-mapped weights
+# exported by data/model/numpy_export.py, with an incremental KV cache
+# =============================================================================
+
+import os
+import json
+import math
+import functools
+import threading
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+WEIGHTS_DIR = "numpy_weights"
+MANIFEST_FILE = "manifest.json"
+
+# Additive mask for padded encoder positions (same constant as the TF model)
+LARGE_NEGATIVE = -1e9
+
+# Storage dtypes written by the exporter. bfloat16 is stored as the upper 16 bits of
+# the float32 pattern in a uint16 array, so loading it needs no extra dependency.
+STORAGE_DTYPES = ('float32', 'float16', 'bfloat16')
+
+# Vocabulary rows upcast at a time by a half-precision LM head (512 x 512 float32 = 1 MB,
+# reused across blocks), so the embedding matrix is never materialised in float32
+LM_HEAD_BLOCK = 512
+
+
+def find_weights_dir(model_path: str) -> Optional[str]:
+    """Directory holding the exported weights: `model_path` itself or its numpy_weights/ subfolder"""
+    for directory in (model_path, os.path.join(model_path, WEIGHTS_DIR)):
+        if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            return directory
+    return None
+
+
+def load_weights(directory: str, mmap: bool = True) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """Exported tensors (memory-mapped by default, so pages are shared between processes) and the manifest"""
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    weights = {name: np.load(os.path.join(directory, entry['file']), mmap_mode='r' if mmap else None)
+               for name, entry in manifest['tensors'].items()}
+    return weights, manifest
+
+
+def to_float32(value: np.ndarray, dtype: str = 'float32') -> np.ndarray:
+    """Upcast stored weights for float32 compute (no copy for float32 storage)"""
+    if dtype == 'bfloat16':
+        return (np.asarray(value, dtype=np.uint32) << 16).view(np.float32)
+    if value.dtype == np.float32:
+        return value
+    return value.astype(np.float32)
+
+
+def upcast_into(value: np.ndarray, dtype: str, out: np.ndarray) -> np.ndarray:
+    """to_float32 into a preallocated contiguous float32 array (no temporaries)"""
+    if dtype == 'bfloat16':
+        np.left_shift(value, 16, out=out.view(np.uint32), dtype=np.uint32)
+    else:
+        np.copyto(out, value)
+    return out
+
+
+def relative_position_bucket(relative_position: np.ndarray, bidirectional: bool = True,
+                             num_buckets: int = 32, max_distance: int = 128) -> np.ndarray:
+    """
+    T5 relative position buckets: exact buckets for small distances, log-spaced up to
+    `max_distance`. The encoder splits the buckets between both directions; the
+    decoder only looks back.
+    """
+    relative_position = np.asarray(relative_position, dtype=np.int64)
+    buckets = np.zeros_like(relative_position)
+    if bidirectional:
+        num_buckets //= 2
+        buckets += (relative_position > 0).astype(np.int64) * num_buckets
+        relative_position = np.abs(relative_position)
+    else:
+        relative_position = -np.minimum(relative_position, 0)
+
+    max_exact = num_buckets // 2
+    is_small = relative_position < max_exact
+    # float32 like the TF implementation, so bucket boundaries round identically
+    scaled = (np.log(np.maximum(relative_position, 1).astype(np.float32) / np.float32(max_exact))
+              / np.float32(math.log(max_distance / max_exact)) * np.float32(num_buckets - max_exact))
+    if_large = np.minimum(max_exact + scaled.astype(np.int64), num_buckets - 1)
+    return buckets + np.where(is_small, relative_position, if_large)
+
+
+def _upcast_per_call(method: Callable) -> Callable:
+    """
+    Run `method` with the decoder matrices upcast (on first use) into one float32 arena
+    that lives for the whole call; nested calls share it. The arena belongs to the calling
+    thread, so concurrent calls never share buffers. A single large allocation is
+    memory-mapped by malloc, so it is returned to the OS when the call ends.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        state = self._local
+        if getattr(state, 'call_weights', None) is not None or not self._decoder_layout:
+            return method(self, *args, **kwargs)
+        state.call_weights, state.arena = {}, np.empty(self._arena_size, dtype=np.float32)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            state.call_weights = state.arena = None
+    return wrapper
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    weights = np.exp(scores)
+    return weights / weights.sum(axis=-1, keepdims=True)
+
+
+class NumpyT5:
+    """
+    T5 encoder/decoder in NumPy. Mirrors the TF model: RMS layer norm without mean
+    subtraction, unscaled dot-product attention with a relative position bias from
+    block 0 shared by every layer of a stack, ReLU feed-forward, and a tied LM head
+    scaled by d_model ** -0.5.
+
+    Weights may be stored in float16/bfloat16 (`dtypes` maps names to storage dtypes);
+    activations, layer norms and softmax are always float32 (NumPy has no fast
+    half-precision matmul). Layer-norm scales and position biases are upcast once and
+    kept; decoder matrices, used at every step, are upcast once per generate()/logits()
+    call and dropped afterwards; encoder matrices are upcast when used; the embedding is
+    only ever upcast row by row or in LM_HEAD_BLOCK blocks. `cache_decoder_weights=False`
+    upcasts decoder matrices at every step instead: lowest peak memory, slowest decoding.
+    float16 upcasts are done by NumPy without hardware conversion, so bfloat16 decodes faster.
+    Upcast buffers are per thread: one engine can serve concurrent generate() calls.
+    """
+
+    def __init__(self, weights: Dict[str, np.ndarray], config: Dict, dtypes: Optional[Dict[str, str]] = None,
+                 cache_decoder_weights: bool = True):
+        self.weights = weights
+        self.dtypes = dtypes or {name: str(value.dtype) for name, value in weights.items()}
+        self.config = config
+        self.d_model = config['d_model']
+        self.d_kv = config['d_kv']
+        self.num_heads = config['num_heads']
+        self.num_layers = config['num_layers']
+        self.num_decoder_layers = config.get('num_decoder_layers', config['num_layers'])
+        self.num_buckets = config.get('relative_attention_num_buckets', 32)
+        self.max_distance = config.get('relative_attention_max_distance', 128)
+        self.epsilon = config.get('layer_norm_epsilon', 1e-6)
+        self.tie_word_embeddings = config.get('tie_word_embeddings', True)
+        self.decoder_start_token_id = config.get('decoder_start_token_id', 0)
+        self.eos_token_id = config.get('eos_token_id', 1)
+        self.pad_token_id = config.get('pad_token_id', 0)
+        self._resident: Dict[str, np.ndarray] = {}          # small tensors, upcast once
+        # Per thread: call_weights/arena (decoder matrices of the running call), block (LM head buffer)
+        self._local = threading.local()
+
+        # Arena offsets of the half-precision decoder matrices
+        self._decoder_layout: Dict[str, int] = {}
+        self._arena_size = 0
+        if cache_decoder_weights:
+            for name, value in weights.items():
+                if (self.dtypes[name] != 'float32' and name.startswith('decoder.') and value.ndim >= 2
+                        and not name.endswith('relative_attention_bias')):
+                    self._decoder_layout[name] = self._arena_size
+                    self._arena_size += value.size
+
+    @classmethod
+    def from_pretrained(cls, model_path: str, mmap: bool = True, cache_decoder_weights: bool = True) -> "NumpyT5":
+        directory = find_weights_dir(model_path)
+        if directory is None:
+            raise FileNotFoundError(f"No exported NumPy weights in {model_path} "
+                                    f"(run data/model/numpy_export.py first)")
+        weights, manifest = load_weights(directory, mmap)
+        return cls(weights, manifest['config'],
+                   {name: entry['dtype'] for name, entry in manifest['tensors'].items()}, cache_decoder_weights)
+
+    @property
+    def vocab_size(self) -> int:
+        return self.config['vocab_size']
+
+    @property
+    def storage_dtype(self) -> str:
+        return self.dtypes['shared']
+
+    # -------------------------------------------------------------------------
+    # Building blocks
+    # -------------------------------------------------------------------------
+
+    def _weight(self, name: str) -> np.ndarray:
+        value, dtype = self.weights[name], self.dtypes[name]
+        if dtype == 'float32':
+            return value
+        if value.ndim < 2 or name.endswith('relative_attention_bias'):
+            if name not in self._resident:
+                self._resident[name] = to_float32(value, dtype)
+            return self._resident[name]
+        state = self._local
+        call_weights = getattr(state, 'call_weights', None)
+        if call_weights is None or name not in self._decoder_layout:
+            return to_float32(value, dtype)
+        if name not in call_weights:
+            offset = self._decoder_layout[name]
+            call_weights[name] = upcast_into(value, dtype, state.arena[offset:offset + value.size]
+                                             .reshape(value.shape))
+        return call_weights[name]
+
+    def _layer_norm(self, hidden: np.ndarray, name: str) -> np.ndarray:
+        variance = np.mean(np.square(hidden), axis=-1, keepdims=True)
+        return hidden / np.sqrt(variance + self.epsilon) * self._weight(name)
+
+    def _split_heads(self, states: np.ndarray) -> np.ndarray:
+        batch, length, _ = states.shape
+        return states.reshape(batch, length, self.num_heads, self.d_kv).transpose(0, 2, 1, 3)
+
+    def _merge_heads(self, states: np.ndarray) -> np.ndarray:
+        batch, _, length, _ = states.shape
+        return states.transpose(0, 2, 1, 3).reshape(batch, length, self.num_heads * self.d_kv)
+
+    def _project_kv(self, prefix: str, states: np.ndarray):
+        return (self._split_heads(states @ self._weight(f"{prefix}.k")),
+                self._split_heads(states @ self._weight(f"{prefix}.v")))
+
+    def _attend(self, prefix: str, normed: np.ndarray, keys: np.ndarray, values: np.ndarray,
+                bias: np.ndarray) -> np.ndarray:
+        # No 1/sqrt(d_kv): T5 folds the scaling into its weight initialization
+        query = self._split_heads(normed @ self._weight(f"{prefix}.q"))
+        weights = _softmax(query @ keys.transpose(0, 1, 3, 2) + bias)
+        return self._merge_heads(weights @ values) @ self._weight(f"{prefix}.o")
+
+    def _feed_forward(self, prefix: str, hidden: np.ndarray) -> np.ndarray:
+        normed = self._layer_norm(hidden, f"{prefix}.ffn.layer_norm")
+        return np.maximum(normed @ self._weight(f"{prefix}.ffn.wi"), 0.0) @ self._weight(f"{prefix}.ffn.wo")
+
+    def _position_bias(self, stack: str, query_positions: np.ndarray, key_length: int) -> np.ndarray:
+        """(1, heads, queries, keys) bias looked up in the stack's block-0 table"""
+        relative = np.arange(key_length)[None, :] - np.asarray(query_positions)[:, None]
+        buckets = relative_position_bucket(relative, bidirectional=(stack == 'encoder'),
+                                           num_buckets=self.num_buckets, max_distance=self.max_distance)
+        values = self._weight(f"{stack}.relative_attention_bias")[buckets]
+        return values.transpose(2, 0, 1)[None].astype(np.float32)
+
+    def _embed(self, token_ids: np.ndarray) -> np.ndarray:
+        return to_float32(self.weights['shared'][token_ids], self.dtypes['shared'])
+
+    def _lm_logits(self, hidden: np.ndarray) -> np.ndarray:
+        name = 'shared' if self.tie_word_embeddings else 'lm_head'
+        if self.tie_word_embeddings:
+            hidden = hidden * self.d_model ** -0.5
+        weight, dtype = self.weights[name], self.dtypes[name]
+        if dtype == 'float32':
+            return hidden @ (weight.T if self.tie_word_embeddings else weight)
+
+        # Blocks of (rows, d_model); an untied lm_head is (d_model, vocab), so its blocks are transposed
+        block = getattr(self._local, 'block', None)
+        if block is None:
+            block = self._local.block = np.empty((LM_HEAD_BLOCK, self.d_model), dtype=np.float32)
+        logits = np.empty(hidden.shape[:-1] + (self.vocab_size,), dtype=np.float32)
+        for start in range(0, self.vocab_size, LM_HEAD_BLOCK):
+            end = min(start + LM_HEAD_BLOCK, self.vocab_size)
+            rows = weight[start:end] if self.tie_word_embeddings else weight[:, start:end].T
+            np.matmul(hidden, upcast_into(rows, dtype, block[:end - start]).T, out=logits[..., start:end])
+        return logits
+
+    # -------------------------------------------------------------------------
+    # Encoder / decoder
+    # -------------------------------------------------------------------------
+
+    def encode(self, input_ids, attention_mask=None) -> np.ndarray:
+        """Final encoder hidden states, (batch, length, d_model)"""
+        input_ids = np.asarray(input_ids)
+        if attention_mask is None:
+            attention_mask = np.ones_like(input_ids)
+        length = input_ids.shape[1]
+
+        mask_bias = (1.0 - np.asarray(attention_mask, dtype=np.float32))[:, None, None, :] * LARGE_NEGATIVE
+        bias = self._position_bias('encoder', np.arange(length), length) + mask_bias
+
+        hidden = self._embed(input_ids)
+        for index in range(self.num_layers):
+            prefix = f"encoder.block.{index}"
+            normed = self._layer_norm(hidden, f"{prefix}.self_attention.layer_norm")
+            keys, values = self._project_kv(f"{prefix}.self_attention", normed)
+            hidden = hidden + self._attend(f"{prefix}.self_attention", normed, keys, values, bias)
+            hidden = hidden + self._feed_forward(prefix, hidden)
+        return self._layer_norm(hidden, 'encoder.final_layer_norm')
+
+    def init_cache(self, encoder_hidden: np.ndarray, attention_mask, max_length: int) -> Dict:
+        """
+        Decoder state for incremental decoding: cross-attention keys/values computed once,
+        self-attention keys/values preallocated for `max_length` steps.
+        """
+        batch = encoder_hidden.shape[0]
+        shape = (batch, self.num_heads, max_length, self.d_kv)
+        if attention_mask is None:
+            attention_mask = np.ones(encoder_hidden.shape[:2])
+        return {
+            'length': 0,
+            'self_keys': [np.zeros(shape, dtype=np.float32) for _ in range(self.num_decoder_layers)],
+            'self_values': [np.zeros(shape, dtype=np.float32) for _ in range(self.num_decoder_layers)],
+            'cross': [self._project_kv(f"decoder.block.{index}.cross_attention", encoder_hidden)
+                      for index in range(self.num_decoder_layers)],
+            'cross_bias': (1.0 - np.asarray(attention_mask, dtype=np.float32))[:, None, None, :] * LARGE_NEGATIVE
+        }
+
+    def decode_step(self, token_ids, cache: Dict) -> np.ndarray:
+        """Next-token logits (batch, vocab) after feeding one token per row; extends the cache"""
+        step = cache['length']
+        bias = self._position_bias('decoder', np.array([step]), step + 1)
+
+        hidden = self._embed(np.asarray(token_ids)[:, None])
+        for index in range(self.num_decoder_layers):
+            prefix = f"decoder.block.{index}"
+            normed = self._layer_norm(hidden, f"{prefix}.self_attention.layer_norm")
+            key, value = self._project_kv(f"{prefix}.self_attention", normed)
+            cache['self_keys'][index][:, :, step] = key[:, :, 0]
+            cache['self_values'][index][:, :, step] = value[:, :, 0]
+            hidden = hidden + self._attend(f"{prefix}.self_attention", normed,
+                                           cache['self_keys'][index][:, :, :step + 1],
+                                           cache['self_values'][index][:, :, :step + 1], bias)
+
+            normed = self._layer_norm(hidden, f"{prefix}.cross_attention.layer_norm")
+            keys, values = cache['cross'][index]
+            hidden = hidden + self._attend(f"{prefix}.cross_attention", normed, keys, values, cache['cross_bias'])
+            hidden = hidden + self._feed_forward(prefix, hidden)
+
+        cache['length'] = step + 1
+        return self._lm_logits(self._layer_norm(hidden, 'decoder.final_layer_norm')[:, 0])
+
+    @_upcast_per_call
+    def logits(self, input_ids, attention_mask=None, decoder_input_ids=None,
+               encoder_outputs: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Teacher-forced logits (batch, decoder length, vocab), e.g. for parity checks against TF;
+        `encoder_outputs` reuses hidden states from encode(), as in generate()
+        """
+        encoder_hidden = encoder_outputs if encoder_outputs is not None else self.encode(input_ids, attention_mask)
+        decoder_input_ids = np.asarray(decoder_input_ids)
+        cache = self.init_cache(encoder_hidden, attention_mask, decoder_input_ids.shape[1])
+        return np.stack([self.decode_step(decoder_input_ids[:, step], cache)
+                         for step in range(decoder_input_ids.shape[1])], axis=1)
+
+    # -------------------------------------------------------------------------
+    # Generation
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _banned_ngram_tokens(sequence: List[int], ngram_size: int) -> List[int]:
+        if len(sequence) < ngram_size:
+            return []
+        prefix = tuple(sequence[len(sequence) - ngram_size + 1:])
+        return [sequence[start + ngram_size - 1] for start in range(len(sequence) - ngram_size + 1)
+                if tuple(sequence[start:start + ngram_size - 1]) == prefix]
+
+    @staticmethod
+    def _top_k_top_p(scores: np.ndarray, top_k: int, top_p: float) -> np.ndarray:
+        if top_k and top_k < scores.shape[-1]:
+            threshold = np.partition(scores, -top_k, axis=-1)[:, -top_k][:, None]
+            scores = np.where(scores < threshold, -np.inf, scores)
+        if top_p < 1.0:
+            order = np.argsort(-scores, axis=-1)
+            sorted_scores = np.take_along_axis(scores, order, axis=-1)
+            cumulative = np.cumsum(_softmax(sorted_scores), axis=-1)
+            # Keep the smallest prefix whose probability reaches top_p (always at least one token)
+            keep_sorted = np.concatenate([np.ones_like(cumulative[:, :1], dtype=bool),
+                                          cumulative[:, :-1] < top_p], axis=-1)
+            keep = np.zeros_like(keep_sorted)
+            np.put_along_axis(keep, order, keep_sorted, axis=-1)
+            scores = np.where(keep, scores, -np.inf)
+        return scores
+
+    @_upcast_per_call
+    def generate(self, input_ids, attention_mask=None, max_length: int = 100, min_length: int = 0,
+                 do_sample: bool = False, temperature: float = 1.0, top_k: int = 0, top_p: float = 1.0,
+                 repetition_penalty: float = 1.0, no_repeat_ngram_size: int = 0, num_beams: int = 1,
+                 early_stopping: bool = False, num_return_sequences: int = 1,
+                 encoder_outputs: Optional[np.ndarray] = None, pad_token_id: Optional[int] = None,
+                 eos_token_id: Optional[int] = None, logits_processor: Optional[List[Callable]] = None,
+                 seed: Optional[int] = None) -> np.ndarray:
+        """
+        Greedy or top-k/top-p sampled decoding with the `model.generate` arguments used by
+        the generation presets. Beam search is not implemented: num_beams > 1 decodes one
+        beam (early_stopping only applies to beams). num_return_sequences decodes several
+        sequences per input from one encoder pass; `encoder_outputs` reuses hidden states
+        from encode() instead of running the encoder again. `logits_processor` entries are NumPy
+        callables (input_ids, scores, cur_len) -> scores. Returns (batch, length) ids
+        starting with the decoder start token, like the TF model.
+        """
+        pad_token_id = self.pad_token_id if pad_token_id is None else pad_token_id
+        eos_token_id = self.eos_token_id if eos_token_id is None else eos_token_id
+        rng = np.random.default_rng(seed)
+
+        input_ids = np.asarray(input_ids)
+        if attention_mask is None:
+            attention_mask = np.ones_like(input_ids)
+        encoder_hidden = encoder_outputs if encoder_outputs is not None else self.encode(input_ids, attention_mask)
+        if num_return_sequences > 1:
+            encoder_hidden = np.repeat(encoder_hidden, num_return_sequences, axis=0)
+            attention_mask = np.repeat(np.asarray(attention_mask), num_return_sequences, axis=0)
+        batch = encoder_hidden.shape[0]
+        cache = self.init_cache(encoder_hidden, attention_mask, max_length)
+
+        sequences = np.full((batch, max_length), pad_token_id, dtype=np.int64)
+        sequences[:, 0] = self.decoder_start_token_id
+        finished = np.zeros(batch, dtype=bool)
+
+        cur_len = 1
+        while cur_len < max_length and not finished.all():
+            scores = self.decode_step(sequences[:, cur_len - 1], cache).astype(np.float32)
+            generated = sequences[:, :cur_len]
+
+            if repetition_penalty != 1.0:
+                previous = np.take_along_axis(scores, generated, axis=-1)
+                penalized = np.where(previous < 0, previous * repetition_penalty, previous / repetition_penalty)
+                np.put_along_axis(scores, generated, penalized, axis=-1)
+            if no_repeat_ngram_size > 0:
+                for row in range(batch):
+                    banned = self._banned_ngram_tokens(generated[row].tolist(), no_repeat_ngram_size)
+                    scores[row, banned] = -np.inf
+            if cur_len < min_length:
+                scores[:, eos_token_id] = -np.inf
+            for processor in logits_processor or []:
+                scores = processor(generated, scores, cur_len)
+
+            if do_sample:
+                scores = self._top_k_top_p(scores / temperature, top_k, top_p)
+                probabilities = _softmax(scores.astype(np.float64))
+                next_tokens = np.array([rng.choice(len(row), p=row) for row in probabilities])
+            else:
+                next_tokens = scores.argmax(axis=-1)
+
+            next_tokens = np.where(finished, pad_token_id, next_tokens)
+            sequences[:, cur_len] = next_tokens
+            finished |= next_tokens == eos_token_id
+            cur_len += 1
+
+        return sequences[:, :cur_len]
+
+
+# =============================================================================
+# SELF-CHECK
+# =============================================================================
+
+def random_weights(config: Dict, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Randomly initialized tensors with the exported names and shapes (for TF-free checks)"""
+    rng = np.random.default_rng(seed)
+    d_model, inner, ff = config['d_model'], config['num_heads'] * config['d_kv'], config['d_ff']
+    buckets = config.get('relative_attention_num_buckets', 32)
+
+    def matrix(rows, columns):
+        return (rng.standard_normal((rows, columns)) / math.sqrt(rows)).astype(np.float32)
+
+    weights = {'shared': rng.standard_normal((config['vocab_size'], d_model)).astype(np.float32)}
+    for stack, layers in (('encoder', config['num_layers']),
+                          ('decoder', config.get('num_decoder_layers', config['num_layers']))):
+        weights[f"{stack}.relative_attention_bias"] = rng.standard_normal((buckets, config['num_heads'])).astype(np.float32)
+        weights[f"{stack}.final_layer_norm"] = np.ones(d_model, dtype=np.float32)
+        for index in range(layers):
+            prefix = f"{stack}.block.{index}"
+            for attention in ('self_attention', 'cross_attention') if stack == 'decoder' else ('self_attention',):
+                weights[f"{prefix}.{attention}.layer_norm"] = np.ones(d_model, dtype=np.float32)
+                for name in ('q', 'k', 'v'):
+                    weights[f"{prefix}.{attention}.{name}"] = matrix(d_model, inner)
+                weights[f"{prefix}.{attention}.o"] = matrix(inner, d_model)
+            weights[f"{prefix}.ffn.layer_norm"] = np.ones(d_model, dtype=np.float32)
+            weights[f"{prefix}.ffn.wi"] = matrix(d_model, ff)
+            weights[f"{prefix}.ffn.wo"] = matrix(ff, d_model)
+    return weights
+
+
+def self_check(engine: NumpyT5, input_ids, attention_mask=None, max_length: int = 20) -> Dict:
+    """
+    Teacher-forced logits() against the engine's own greedy decode: the logits must pick
+    the generated tokens, and reusing encoder_outputs must not change them.
+    """
+    input_ids = np.asarray(input_ids)
+    if attention_mask is None:
+        attention_mask = np.ones_like(input_ids)
+    generated = engine.generate(input_ids, attention_mask, max_length=max_length)
+    logits = engine.logits(input_ids, attention_mask, generated[:, :-1])
+    reused = engine.logits(input_ids, attention_mask, generated[:, :-1],
+                           encoder_outputs=engine.encode(input_ids, attention_mask))
+
+    # Positions after a row's EOS are padding, not greedy choices
+    emitted = np.cumsum(generated[:, :-1] == engine.eos_token_id, axis=1) == 0
+    greedy = (logits.argmax(axis=-1) == generated[:, 1:]) | ~emitted
+    report = {
+        'tokens': int(emitted.sum()),
+        'greedy_matches': bool(greedy.all()),
+        'encoder_outputs_difference': float(np.abs(logits - reused).max())
+    }
+    report['passed'] = report['greedy_matches'] and report['encoder_outputs_difference'] == 0.0
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check logits() against greedy decoding (TensorFlow-free)")
+    parser.add_argument('--model-path', default=None, help="Exported weights (default: a small random model)")
+    args = parser.parse_args()
+
+    if args.model_path:
+        check_engine = NumpyT5.from_pretrained(args.model_path)
+    else:
+        tiny = {'vocab_size': 64, 'd_model': 32, 'd_kv': 8, 'num_heads': 4, 'd_ff': 64, 'num_layers': 2,
+                'decoder_start_token_id': 0, 'eos_token_id': 1, 'pad_token_id': 0}
+        check_engine = NumpyT5(random_weights(tiny), tiny)
+    ids = np.random.default_rng(1).integers(2, min(check_engine.vocab_size, 1000), size=(3, 12))
+    mask = np.ones_like(ids)
+    mask[1, 8:] = 0
+    result = self_check(check_engine, ids, mask)
+    print(json.dumps(result, indent=2))
+    raise SystemExit(0 if result['passed'] else 1)
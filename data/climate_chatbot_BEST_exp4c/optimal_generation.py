@@ -1,7 +1,9 @@
 # OPTIMAL GENERATION FUNCTION FOR CLIMATE CHATBOT
 # Experiment 4c - Balanced parameters for best performance
 
-def generate_answer_optimal(question, max_length=70, temperature=0.5):
+from generation_presets import get_preset
+
+def generate_answer_optimal(question, max_length=None, temperature=None, preset="optimal"):
     """
     OPTIMAL generation function for climate chatbot
     Balanced for quality, speed, and factual accuracy
@@ -18,20 +20,13 @@ def generate_answer_optimal(question, max_length=70, temperature=0.5):
         add_special_tokens=True
     )
     
-    # OPTIMAL PARAMETERS (Experiment 4c)
+    # OPTIMAL PARAMETERS (Experiment 4c preset, see generation_presets.py)
+    generation_params = get_preset(preset, max_length=max_length, temperature=temperature)
     outputs = model.generate(
         input_ids,
-        max_length=max_length,        # 70 tokens for focused answers
-        min_length=18,               # Ensure substantial content
-        temperature=temperature,      # 0.5 for balanced creativity
-        do_sample=True,
-        top_p=0.8,                   # Nucleus sampling
-        top_k=40,                    # Vocabulary restriction
-        repetition_penalty=2.0,      # Anti-repetition
-        no_repeat_ngram_size=3,      # Prevent 3-gram repetition
-        num_beams=1,                 # Single beam for speed
         pad_token_id=tokenizer.pad_token_id,
-        eos_token_id=tokenizer.eos_token_id
+        eos_token_id=tokenizer.eos_token_id,
+        **generation_params
     )
     
     # Decode
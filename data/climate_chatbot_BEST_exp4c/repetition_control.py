@@ -0,0 +1,183 @@
+# =============================================================================
+# DECODE-TIME REPETITION CONTROL
+# XLA-compatible logits processors that block repeats and stop on loops
+# =============================================================================
+
+import numpy as np
+import tensorflow as tf
+from typing import Dict, List, Optional
+from transformers import TFLogitsProcessor, TFLogitsProcessorList
+
+# HF TF generation passes the full (padded) token buffer plus `cur_len`, and under
+# XLA `cur_len` is a tensor. Every processor below therefore uses static shapes,
+# masks positions >= cur_len and avoids Python control flow on tensor values.
+
+
+def _banned_scores(scores: tf.Tensor, banned: tf.Tensor) -> tf.Tensor:
+    """Set banned (boolean, same shape as scores) entries to -inf"""
+    return tf.where(banned, tf.fill(tf.shape(scores), tf.constant(float("-inf"), dtype=scores.dtype)), scores)
+
+
+class TFNGramRepeatBlockLogitsProcessor(TFLogitsProcessor):
+    """Ban any token that would complete an n-gram already present in the sequence"""
+
+    def __init__(self, ngram_size: int = 3):
+        if ngram_size < 2:
+            raise ValueError(f"ngram_size must be >= 2, got {ngram_size}")
+        self.ngram_size = ngram_size
+
+    def __call__(self, input_ids: tf.Tensor, scores: tf.Tensor, cur_len) -> tf.Tensor:
+        n = self.ngram_size
+        num_windows = input_ids.shape[1] - n + 1
+        if num_windows <= 0:
+            return scores
+
+        cur_len = tf.cast(cur_len, tf.int32)
+        batch_size = tf.shape(input_ids)[0]
+
+        # A window starting at i matches when its first n-1 tokens equal the current suffix
+        match = tf.ones((batch_size, num_windows), dtype=tf.bool)
+        for k in range(n - 1):
+            suffix_token = tf.gather(input_ids, tf.maximum(cur_len - (n - 1) + k, 0), axis=1)
+            match = tf.logical_and(match, tf.equal(input_ids[:, k:k + num_windows], suffix_token[:, None]))
+
+        # Only windows whose continuation token has already been generated count
+        valid = tf.range(num_windows) <= cur_len - n
+        match = tf.logical_and(match, valid[None, :])
+
+        continuation = input_ids[:, n - 1:n - 1 + num_windows]
+        batch_index = tf.broadcast_to(tf.range(batch_size)[:, None], tf.shape(continuation))
+        indices = tf.reshape(tf.stack([batch_index, continuation], axis=-1), (-1, 2))
+        updates = tf.reshape(tf.cast(match, scores.dtype), (-1,))
+        banned = tf.tensor_scatter_nd_max(tf.zeros_like(scores), indices, updates) > 0
+
+        return _banned_scores(scores, banned)
+
+
+class TFImmediateWordRepeatLogitsProcessor(TFLogitsProcessor):
+    """Ban repeating the previous token when it starts a whole word ("the the", "emissions emissions")"""
+
+    def __init__(self, word_start_mask: np.ndarray):
+        self.word_start_mask = tf.constant(word_start_mask, dtype=tf.bool)
+
+    def __call__(self, input_ids: tf.Tensor, scores: tf.Tensor, cur_len) -> tf.Tensor:
+        cur_len = tf.cast(cur_len, tf.int32)
+        last_token = tf.gather(input_ids, tf.maximum(cur_len - 1, 0), axis=1)
+        is_word = tf.logical_and(tf.gather(self.word_start_mask, last_token), cur_len > 1)
+
+        banned = tf.logical_and(tf.one_hot(last_token, tf.shape(scores)[-1], on_value=True,
+                                           off_value=False, dtype=tf.bool),
+                                is_word[:, None])
+        return _banned_scores(scores, banned)
+
+
+class TFLoopStopLogitsProcessor(TFLogitsProcessor):
+    """
+    Force EOS once the last `window` tokens contain too few distinct tokens,
+    so a degenerate loop ends the sequence instead of burning the remaining budget.
+    """
+
+    def __init__(self, eos_token_id: int, window: int = 12, min_distinct_ratio: float = 0.5):
+        self.eos_token_id = eos_token_id
+        self.window = window
+        self.min_distinct = int(np.ceil(window * min_distinct_ratio))
+        # earlier[i, j] is True when position j comes before position i in the window
+        self.earlier = tf.constant(np.tril(np.ones((window, window), dtype=bool), k=-1))
+
+    def __call__(self, input_ids: tf.Tensor, scores: tf.Tensor, cur_len) -> tf.Tensor:
+        cur_len = tf.cast(cur_len, tf.int32)
+        positions = tf.maximum(cur_len - self.window + tf.range(self.window), 0)
+        recent = tf.gather(input_ids, positions, axis=1)
+
+        same = tf.equal(recent[:, :, None], recent[:, None, :])
+        seen_before = tf.reduce_any(tf.logical_and(same, self.earlier[None, :, :]), axis=-1)
+        distinct = tf.reduce_sum(tf.cast(tf.logical_not(seen_before), tf.int32), axis=-1)
+
+        # Position 0 is the decoder start token, so a full window needs cur_len > window
+        in_loop = tf.logical_and(distinct < self.min_distinct, cur_len > self.window)
+
+        eos_only = tf.one_hot(self.eos_token_id, tf.shape(scores)[-1], on_value=False,
+                              off_value=True, dtype=tf.bool)
+        banned = tf.logical_and(in_loop[:, None], eos_only[None, :])
+        forced = tf.where(in_loop[:, None], tf.zeros_like(scores), scores)
+        return _banned_scores(forced, banned)
+
+
+def build_word_start_mask(tokenizer, vocab_size: int) -> np.ndarray:
+    """Boolean mask of SentencePiece pieces that start with a word boundary and contain letters"""
+    mask = np.zeros(vocab_size, dtype=bool)
+    pieces = tokenizer.convert_ids_to_tokens(list(range(min(vocab_size, len(tokenizer)))))
+    for token_id, piece in enumerate(pieces):
+        if piece and piece.startswith('▁') and any(ch.isalpha() for ch in piece):
+            mask[token_id] = True
+    return mask
+
+
+def build_repetition_processors(tokenizer, vocab_size: int, ngram_size: int = 3,
+                                loop_window: int = 12, min_distinct_ratio: float = 0.5) -> TFLogitsProcessorList:
+    """Processor list passed as `logits_processor=` to `model.generate`"""
+    return TFLogitsProcessorList([
+        TFNGramRepeatBlockLogitsProcessor(ngram_size),
+        TFImmediateWordRepeatLogitsProcessor(build_word_start_mask(tokenizer, vocab_size)),
+        TFLoopStopLogitsProcessor(tokenizer.eos_token_id, loop_window, min_distinct_ratio)
+    ])
+
+
+def with_repetition_guard(params: Dict, processors: Optional[TFLogitsProcessorList]) -> Dict:
+    """Swap the (non-XLA) no_repeat_ngram_size option for the XLA-compatible processors"""
+    if processors is None:
+        return params
+    params = dict(params)
+    params.pop('no_repeat_ngram_size', None)
+    params['logits_processor'] = processors
+    return params
+
+
+# =============================================================================
+# TOKENS-SAVED REPORTING
+# =============================================================================
+
+def detect_loop(token_ids: List[int], window: int = 12, min_distinct_ratio: float = 0.5) -> bool:
+    """NumPy mirror of TFLoopStopLogitsProcessor on a finished sequence"""
+    recent = np.asarray(token_ids[-window:])
+    return len(recent) == window and len(np.unique(recent)) < int(np.ceil(window * min_distinct_ratio))
+
+
+class RepetitionStats:
+    """Tracks decode steps avoided by loop stopping across answers"""
+
+    def __init__(self, eos_token_id: int, pad_token_id: int = 0, window: int = 12,
+                 min_distinct_ratio: float = 0.5):
+        self.eos_token_id = eos_token_id
+        self.pad_token_id = pad_token_id
+        self.window = window
+        self.min_distinct_ratio = min_distinct_ratio
+        self.answers = 0
+        self.loop_stops = 0
+        self.tokens_generated = 0
+        self.tokens_saved = 0
+
+    def record(self, output_ids, max_length: int):
+        """Record one generated sequence (decoder start token included)"""
+        tokens = [int(t) for t in np.asarray(output_ids).reshape(-1)]
+        if self.eos_token_id in tokens:
+            body = tokens[1:tokens.index(self.eos_token_id)]
+            stopped = detect_loop([tokens[0]] + body, self.window, self.min_distinct_ratio)
+        else:
+            body = [t for t in tokens[1:] if t != self.pad_token_id]
+            stopped = False
+
+        self.answers += 1
+        self.tokens_generated += len(body) + 1
+        if stopped:
+            self.loop_stops += 1
+            self.tokens_saved += max(max_length - (len(body) + 2), 0)
+
+    def summary(self) -> Dict:
+        answers = max(self.answers, 1)
+        return {
+            'answers': self.answers,
+            'loop_stops': self.loop_stops,
+            'avg_tokens_generated': self.tokens_generated / answers,
+            'avg_tokens_saved': self.tokens_saved / answers
+        }
@@ -2,35 +2,263 @@
 """
 Climate Education Chatbot - Optimal Deployment Script
 Experiment 4c - Best performing configuration
+
+Without arguments, starts the interactive chat. With --batch, answers every question
+of a CSV/JSONL file (or stdin) and streams JSONL results in input order:
+    python run_chatbot.py --batch questions.csv --output answers.jsonl [--workers 2] [--resume]
 """
 
 import sys
 import os
-from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+import csv
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from collections import deque
+from typing import Dict, Iterator, List
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BATCH_CONFIG = {
+    'batch_size': 16,          # climate questions decoded per padded generate call
+    'items_per_task': 64,      # input rows handed to a worker at once
+    'workers': 1,              # processes, each with its own model copy
+    'max_pending_tasks': 2     # in-flight tasks per worker (bounds memory on long inputs)
+}
+
 
 def load_optimal_chatbot():
     """Load the optimal climate chatbot"""
+    from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+
     print("Loading Climate Education Chatbot (Optimal)...")
-    
+
     try:
         # Load model and tokenizer
         tokenizer = T5Tokenizer.from_pretrained("./", legacy=False)
         model = TFT5ForConditionalGeneration.from_pretrained("./")
-        
+
         print("Model loaded successfully!")
-        
+
         # Load optimal generation functions
         from optimal_generation import interactive_climate_chat_optimal
-        
+
         print("Optimal generation functions loaded!")
         print("\nStarting interactive chat...")
-        
+
         # Start interactive chat
         interactive_climate_chat_optimal()
-        
+
     except Exception as e:
         print(f"Error loading chatbot: {e}")
         print("Make sure you're in the correct directory with model files.")
 
+
+# =============================================================================
+# BATCH MODE
+# =============================================================================
+
+def _question_of(entry: Dict) -> str:
+    """Question of a CSV row or JSON object (question, user_question or a 'question: ...' input)"""
+    for key in ('question', 'user_question'):
+        if entry.get(key):
+            return str(entry[key])
+    if entry.get('input'):
+        return str(entry['input']).split('question:', 1)[-1].strip()
+    return ''
+
+
+def read_questions(path: str) -> Iterator[Dict]:
+    """Items {'index', 'question'[, 'id']} streamed from a CSV or JSONL file, or stdin ('-')"""
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8', newline='')
+    try:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            # JSON lines, or plain one-question-per-line text (stdin)
+            rows = ({'question': line.strip()} if not line.lstrip().startswith('{') else json.loads(line)
+                    for line in f if line.strip())
+        for index, row in enumerate(rows):
+            item = {'index': index, 'question': _question_of(row)}
+            if row.get('id'):
+                item['id'] = row['id']
+            yield item
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def completed_indices(output_file: str) -> set:
+    """Indices already answered in `output_file`; a partially written last line is truncated"""
+    if not os.path.exists(output_file):
+        return set()
+    done, valid_bytes = set(), 0
+    with open(output_file, 'rb') as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)['index'])
+            except (ValueError, KeyError):
+                break
+            valid_bytes += len(line)
+    with open(output_file, 'r+b') as f:
+        f.truncate(valid_bytes)
+    return done
+
+
+_bot = None
+
+
+def _init_worker(model_path: str, backend: str, preset: str):
+    global _bot
+    # The bot reports progress with print(); keep stdout for the JSONL results
+    with contextlib.redirect_stdout(sys.stderr):
+        from ayikabot_complete_pipeline import AyikaBot
+        _bot = AyikaBot(model_path, preset=preset, backend=backend)
+
+
+def answer_items(items: List[Dict], batch_size: int = BATCH_CONFIG['batch_size']) -> List[Dict]:
+    """JSONL records of a task's items, in order (runs in the worker that owns the model)"""
+    with contextlib.redirect_stdout(sys.stderr):
+        replies = _bot.respond_batch([item['question'] for item in items], batch_size) if items else []
+    records = []
+    for item, (answer, metadata) in zip(items, replies):
+        records.append(dict(item, answer=answer, response_type=metadata['response_type'],
+                            confidence=round(float(metadata['confidence']), 4), is_climate=metadata['is_climate'],
+                            answer_source=metadata.get('answer_source'),
+                            latency=round(metadata.get('generation_time', 0.0), 4),
+                            batch_size=metadata.get('batch_size', 1)))
+    return records
+
+
+def _tasks(items: Iterator[Dict], size: int, skip: set) -> Iterator[List[Dict]]:
+    task = []
+    for item in items:
+        if item['index'] in skip:
+            continue
+        task.append(item)
+        if len(task) == size:
+            yield task
+            task = []
+    if task:
+        yield task
+
+
+def run_batch(input_path: str, output_file: str, model_path: str = "./", backend: str = "tf",
+              preset: str = "pipeline", config: Dict = BATCH_CONFIG, resume: bool = False) -> Dict:
+    """
+    Answer every question of `input_path`, appending one JSON line per question to
+    `output_file` ('-' for stdout, which then carries nothing else) in input order.
+    With `resume`, questions already in the output are skipped.
+    Tasks go to a pool of workers, each holding its own model; results are written as
+    tasks finish, in order.
+    """
+    config = {**BATCH_CONFIG, **config}
+    done = completed_indices(output_file) if resume and output_file != '-' else set()
+    tasks = _tasks(read_questions(input_path), config['items_per_task'], done)
+    counts = {'answered': 0, 'skipped': len(done)}
+    started = time.time()
+
+    if config['workers'] > 1:
+        context = multiprocessing.get_context('spawn')   # TensorFlow is not fork-safe
+        pool = context.Pool(config['workers'], initializer=_init_worker, initargs=(model_path, backend, preset))
+        max_pending = config['workers'] * config['max_pending_tasks']
+
+        def results():
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(answer_items, (task, config['batch_size'])))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+    else:
+        pool = None
+        _init_worker(model_path, backend, preset)
+
+        def results():
+            for task in tasks:
+                yield answer_items(task, config['batch_size'])
+
+    out = sys.stdout if output_file == '-' else open(output_file, 'a' if resume else 'w', encoding='utf-8')
+    try:
+        for records in results():
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                counts[record['response_type']] = counts.get(record['response_type'], 0) + 1
+            out.flush()
+            counts['answered'] += len(records)
+            print(f"   {counts['answered']:,} answered ({counts['answered'] / (time.time() - started):.1f}/s)",
+                  file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    counts['seconds'] = round(time.time() - started, 1)
+    print(f"Batch complete: {counts}", file=sys.stderr)
+    return counts
+
+
+SELF_CHECK_QUESTIONS = ["hello", "How do I cook pasta?", "What is the greenhouse effect?",
+                        "How does climate change affect sea levels?"]
+
+
+def stdout_self_check(model_path: str = "./", backend: str = "tf", preset: str = "pipeline", workers: int = 1) -> Dict:
+    """
+    Run the batch mode stdin -> stdout in a subprocess and parse every stdout line as a
+    JSON record: any progress message mixed into the stream fails the check.
+    """
+    import subprocess
+
+    command = [sys.executable, os.path.abspath(__file__), '--batch', '-', '--model-path', model_path,
+               '--backend', backend, '--preset', preset, '--workers', str(workers)]
+    completed = subprocess.run(command, input='\n'.join(SELF_CHECK_QUESTIONS) + '\n', capture_output=True,
+                               text=True, encoding='utf-8')
+    lines = completed.stdout.splitlines()
+    invalid = []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            invalid.append(line)
+    indices = [record.get('index') for record in records]
+    report = {'returncode': completed.returncode, 'lines': len(lines), 'invalid_lines': invalid,
+              'in_order': indices == list(range(len(SELF_CHECK_QUESTIONS)))}
+    report['passed'] = completed.returncode == 0 and not invalid and report['in_order']
+    if not report['passed']:
+        report['stderr_tail'] = completed.stderr[-2000:]
+    return report
+
+
 if __name__ == "__main__":
-    load_optimal_chatbot()
+    parser = argparse.ArgumentParser(description="AyikaBot interactive chat, or batch answering with --batch")
+    parser.add_argument('--batch', metavar='INPUT', help="CSV/JSONL file of questions ('-' for stdin)")
+    parser.add_argument('--output', default='-', help="JSONL results file ('-' for stdout)")
+    parser.add_argument('--resume', action='store_true', help="Skip questions already in --output and append")
+    parser.add_argument('--model-path', default="./")
+    parser.add_argument('--backend', choices=['tf', 'numpy'], default='tf')
+    parser.add_argument('--preset', default='pipeline')
+    parser.add_argument('--workers', type=int, default=BATCH_CONFIG['workers'])
+    parser.add_argument('--batch-size', type=int, default=BATCH_CONFIG['batch_size'])
+    parser.add_argument('--items-per-task', type=int, default=BATCH_CONFIG['items_per_task'])
+    parser.add_argument('--self-check', action='store_true',
+                        help="Check that batch mode on stdout emits only JSON lines, in order")
+    args = parser.parse_args()
+
+    if args.self_check:
+        check = stdout_self_check(args.model_path, args.backend, args.preset, args.workers)
+        print(json.dumps(check, indent=2))
+        sys.exit(0 if check['passed'] else 1)
+    elif args.batch is None:
+        load_optimal_chatbot()
+    else:
+        if args.resume and args.output == '-':
+            parser.error("--resume needs an --output file")
+        run_batch(args.batch, args.output, args.model_path, args.backend,
+                  args.preset, {'workers': args.workers, 'batch_size': args.batch_size,
+                                'items_per_task': args.items_per_task}, args.resume)
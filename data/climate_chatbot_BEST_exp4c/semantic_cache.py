@@ -0,0 +1,230 @@
+# =============================================================================
+# SEMANTIC ANSWER CACHE
+# Mean-pooled T5 encoder embeddings of answered questions in a bounded,
+# persistent NumPy IVF index; paraphrases above a cosine threshold reuse the answer
+# =============================================================================
+
+import os
+import json
+import threading
+import numpy as np
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+CACHE_DIR = "semantic_cache"
+
+CACHE_CONFIG = {
+    'capacity': 5000,            # entries kept; the least recently used one is evicted
+    'threshold': 0.95,           # cosine similarity needed to reuse an answer (calibrate with the audit)
+    'num_lists': 16,             # IVF lists (k-means centroids)
+    'num_probe': 4,              # lists searched per lookup
+    'min_train_size': 256,       # exact search until this many entries
+    'kmeans_iterations': 10,
+    'audit_size': 1000,          # recent hits kept for false-hit auditing
+    'autosave_every': 50,        # persist after this many inserts (0 disables)
+    'seed': 42
+}
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Unit-length mean of the encoder states over real (unpadded) tokens, one row per input"""
+    hidden = np.asarray(hidden, dtype=np.float32)
+    mask = np.asarray(attention_mask, dtype=np.float32)[..., None]
+    pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1.0)
+    return pooled / np.maximum(np.linalg.norm(pooled, axis=-1, keepdims=True), 1e-8)
+
+
+def _kmeans(vectors: np.ndarray, num_lists: int, iterations: int, seed: int) -> np.ndarray:
+    """Spherical k-means centroids (unit length) for the IVF lists"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), num_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for index in range(num_lists):
+            members = vectors[assignment == index]
+            if len(members):
+                centroids[index] = members.sum(axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=-1, keepdims=True), 1e-8)
+    return centroids
+
+
+class SemanticCache:
+    """
+    Fixed-capacity embedding table. Lookups search the `num_probe` closest IVF lists
+    (or every entry before the index is trained); the least recently used entry is
+    replaced when full. Thread-safe; every hit is kept for auditing.
+    """
+
+    def __init__(self, dim: int = 512, config: Dict = CACHE_CONFIG, directory: Optional[str] = None,
+                 model_tag: str = ""):
+        self.config = {**CACHE_CONFIG, **config}
+        self.directory = directory
+        self.model_tag = model_tag
+        capacity = self.config['capacity']
+
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.hit_counts = np.zeros(capacity, dtype=np.int64)
+        self.lists = np.full(capacity, -1, dtype=np.int64)
+        self.questions: List[Optional[str]] = [None] * capacity
+        self.answers: List[Optional[str]] = [None] * capacity
+
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self.clock = 0
+        self.stats = {'lookups': 0, 'hits': 0, 'inserts': 0, 'evictions': 0}
+        self.recent_hits = deque(maxlen=self.config['audit_size'])
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(self.valid.sum())
+
+    # -------------------------------------------------------------------------
+    # Index
+    # -------------------------------------------------------------------------
+
+    def _maybe_train(self):
+        """(Re)build the IVF centroids once the cache has doubled since the last training"""
+        size = len(self)
+        if size < self.config['min_train_size'] or size < 2 * self.trained_size:
+            return
+        slots = np.nonzero(self.valid)[0]
+        self.centroids = _kmeans(self.vectors[slots], self.config['num_lists'],
+                                 self.config['kmeans_iterations'], self.config['seed'])
+        self.lists[slots] = np.argmax(self.vectors[slots] @ self.centroids.T, axis=1)
+        self.trained_size = size
+
+    def _candidates(self, vector: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.nonzero(self.valid)[0]
+        probe = np.argsort(-(self.centroids @ vector))[:self.config['num_probe']]
+        return np.nonzero(self.valid & np.isin(self.lists, probe))[0]
+
+    def search(self, vector: np.ndarray, exclude: Optional[str] = None) -> Tuple[Optional[int], float]:
+        """
+        Closest cached slot and its cosine similarity (None if the cache is empty);
+        entries of the question `exclude` are skipped (calibration replays)
+        """
+        slots = self._candidates(vector)
+        if exclude is not None:
+            exclude = exclude.strip().lower()
+            slots = np.array([slot for slot in slots if self.questions[slot].strip().lower() != exclude],
+                             dtype=np.int64)
+        if len(slots) == 0:
+            return None, 0.0
+        similarities = self.vectors[slots] @ vector
+        best = int(np.argmax(similarities))
+        return int(slots[best]), float(similarities[best])
+
+    # -------------------------------------------------------------------------
+    # Cache operations
+    # -------------------------------------------------------------------------
+
+    def lookup(self, vector: np.ndarray, question: str = "") -> Optional[str]:
+        """Cached answer of the nearest question if it is similar enough"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self.stats['lookups'] += 1
+            slot, similarity = self.search(vector)
+            if slot is None or similarity < self.config['threshold']:
+                return None
+
+            self.clock += 1
+            self.last_used[slot] = self.clock
+            self.hit_counts[slot] += 1
+            self.stats['hits'] += 1
+            self.recent_hits.append({'question': question, 'matched_question': self.questions[slot],
+                                     'similarity': similarity})
+            return self.answers[slot]
+
+    def add(self, vector: np.ndarray, question: str, answer: str):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            free = np.nonzero(~self.valid)[0]
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self.last_used))
+                self.stats['evictions'] += 1
+
+            self.clock += 1
+            self.vectors[slot] = vector
+            self.valid[slot] = True
+            self.last_used[slot] = self.clock
+            self.hit_counts[slot] = 0
+            self.questions[slot], self.answers[slot] = question, answer
+            self.lists[slot] = int(np.argmax(self.centroids @ vector)) if self.centroids is not None else -1
+            self.stats['inserts'] += 1
+            self._maybe_train()
+
+            autosave = self.config['autosave_every']
+            if self.directory and autosave and self.stats['inserts'] % autosave == 0:
+                self._save(self.directory)
+
+    def summary(self) -> Dict:
+        lookups = self.stats['lookups']
+        return dict(self.stats, entries=len(self), indexed=self.centroids is not None,
+                    hit_rate=self.stats['hits'] / lookups if lookups else 0.0)
+
+    # -------------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------------
+
+    def save(self, directory: Optional[str] = None):
+        with self._lock:
+            self._save(directory or self.directory)
+
+    def _save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        slots = np.nonzero(self.valid)[0]
+        np.save(os.path.join(directory, 'vectors.npy'), self.vectors[slots])
+        state = {
+            'model_tag': self.model_tag,
+            'config': self.config,
+            'questions': [self.questions[slot] for slot in slots],
+            'answers': [self.answers[slot] for slot in slots],
+            'last_used': self.last_used[slots].tolist(),
+            'hit_counts': self.hit_counts[slots].tolist(),
+            'clock': self.clock,
+            'stats': self.stats,
+            'recent_hits': list(self.recent_hits)
+        }
+        path = os.path.join(directory, 'cache.json')
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, dim: int = 512, config: Optional[Dict] = None,
+             model_tag: str = "") -> "SemanticCache":
+        """
+        Cache persisted in `directory`; `config` overrides the saved settings. Starts empty
+        if nothing was saved or it was saved for another checkpoint (embeddings differ).
+        """
+        path = os.path.join(directory, 'cache.json')
+        if not os.path.exists(path):
+            return cls(dim, config or {}, directory, model_tag)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('model_tag', "") != model_tag:
+            return cls(dim, {**state['config'], **(config or {})}, directory, model_tag)
+        vectors = np.load(os.path.join(directory, 'vectors.npy'))
+        cache = cls(vectors.shape[1] if len(vectors) else dim, {**state['config'], **(config or {})}, directory,
+                    model_tag)
+
+        # Keep the most recently used entries if the capacity shrank
+        order = np.argsort(state['last_used'])[-cache.config['capacity']:]
+        for slot, index in enumerate(order):
+            cache.vectors[slot] = vectors[index]
+            cache.valid[slot] = True
+            cache.last_used[slot] = state['last_used'][index]
+            cache.hit_counts[slot] = state['hit_counts'][index]
+            cache.questions[slot] = state['questions'][index]
+            cache.answers[slot] = state['answers'][index]
+        cache.clock = state['clock']
+        cache.stats.update(state['stats'])
+        cache.recent_hits.extend(state['recent_hits'])
+        cache._maybe_train()
+        return cache
@@ -0,0 +1,175 @@
+# =============================================================================
+# PROMPT-LOOKUP SPECULATIVE DECODING
+# Draft tokens from curated answers / own output, verified in one decoder pass
+# =============================================================================
+
+import time
+import numpy as np
+import tensorflow as tf
+from typing import Dict, List, Optional, Sequence
+
+from candidate_reranking import encode_question
+
+
+class SpeculativeStats:
+    """Acceptance rate and model-call savings across speculative generations"""
+
+    def __init__(self):
+        self.answers = 0
+        self.forward_passes = 0
+        self.tokens_generated = 0
+        self.draft_tokens_proposed = 0
+        self.draft_tokens_accepted = 0
+        self.decode_time = 0.0
+
+    def summary(self) -> Dict:
+        return {
+            'answers': self.answers,
+            'acceptance_rate': self.draft_tokens_accepted / max(self.draft_tokens_proposed, 1),
+            'tokens_per_forward_pass': self.tokens_generated / max(self.forward_passes, 1),
+            'avg_forward_passes': self.forward_passes / max(self.answers, 1),
+            'avg_decode_time_s': self.decode_time / max(self.answers, 1)
+        }
+
+
+def find_draft(generated: Sequence[int], sources: List[np.ndarray], num_draft: int = 8,
+               max_ngram: int = 3, min_ngram: int = 1) -> List[int]:
+    """
+    Propose up to `num_draft` tokens by matching the last n generated tokens
+    against the reference sources and the output so far (longest n first).
+    """
+    if num_draft <= 0:
+        return []
+
+    generated = np.asarray(generated)
+    own_output = generated[:-1]
+
+    for n in range(min(max_ngram, len(generated)), min_ngram - 1, -1):
+        suffix = generated[-n:]
+        for source in list(sources) + [own_output]:
+            if len(source) <= n:
+                continue
+            windows = np.lib.stride_tricks.sliding_window_view(source[:-1], n)
+            hits = np.nonzero(np.all(windows == suffix, axis=1))[0]
+            if len(hits):
+                start = hits[-1] + n
+                return source[start:start + num_draft].tolist()
+
+    return []
+
+
+def _crop_past(past_key_values, length: int):
+    """Keep the first `length` self-attention cache positions; cross-attention caches are static"""
+    return tuple(
+        (layer[0][:, :, :length], layer[1][:, :, :length]) + tuple(layer[2:])
+        for layer in past_key_values
+    )
+
+
+def speculative_greedy_decode(model, encoder_outputs, attention_mask, reference_token_ids: List[List[int]],
+                              max_length: int = 70, num_draft: int = 8, max_ngram: int = 3,
+                              stats: Optional[SpeculativeStats] = None) -> List[int]:
+    """
+    Greedy decoding with prompt-lookup drafts. Each step feeds the last accepted token
+    plus the draft, accepts the longest prefix matching the model's argmax and appends
+    the model's own next token, so the result is identical to plain greedy decoding.
+    """
+    config = model.config
+    sources = [np.asarray(ids) for ids in reference_token_ids if len(ids)]
+    generated = [config.decoder_start_token_id]
+    past = None
+    start_time = time.time()
+
+    while len(generated) < max_length:
+        draft = find_draft(generated, sources, min(num_draft, max_length - len(generated) - 1), max_ngram)
+        feed = generated if past is None else [generated[-1]]
+        feed = feed + draft
+
+        outputs = model(
+            encoder_outputs=encoder_outputs,
+            attention_mask=attention_mask,
+            decoder_input_ids=tf.constant([feed], dtype=tf.int32),
+            past_key_values=past,
+            use_cache=True,
+            return_dict=True
+        )
+        predictions = tf.argmax(outputs.logits[0, -(len(draft) + 1):], axis=-1).numpy().tolist()
+
+        accepted = 0
+        while accepted < len(draft) and predictions[accepted] == draft[accepted]:
+            accepted += 1
+        new_tokens = draft[:accepted] + [predictions[accepted]]
+
+        if stats is not None:
+            stats.forward_passes += 1
+            stats.draft_tokens_proposed += len(draft)
+            stats.draft_tokens_accepted += accepted
+
+        generated.extend(new_tokens)
+        if config.eos_token_id in new_tokens:
+            generated = generated[:generated.index(config.eos_token_id) + 1]
+            break
+
+        # Cache must cover every token except the last one, which is fed next step
+        past = _crop_past(outputs.past_key_values, len(generated) - 1)
+
+    generated = generated[:max_length]
+    if stats is not None:
+        stats.answers += 1
+        stats.tokens_generated += len(generated) - 1
+        stats.decode_time += time.time() - start_time
+
+    return generated
+
+
+def generate_speculative(model, tokenizer, question: str, references: List[str],
+                         max_length: int = 70, num_draft: int = 8,
+                         stats: Optional[SpeculativeStats] = None) -> str:
+    """Encode the question once and decode it speculatively against the reference answers"""
+    inputs, encoder_outputs = encode_question(model, tokenizer, question)
+    reference_token_ids = [tokenizer.encode(reference, add_special_tokens=False) for reference in references]
+    output_ids = speculative_greedy_decode(model, encoder_outputs, inputs.attention_mask,
+                                           reference_token_ids, max_length, num_draft, stats=stats)
+    return tokenizer.decode(output_ids, skip_special_tokens=True)
+
+
+def benchmark_speculative(model, tokenizer, questions: List[str], curated_index,
+                          max_length: int = 70, num_draft: int = 8) -> Dict:
+    """
+    Compare speculative decoding with `model.generate` greedy decoding:
+    acceptance rate, wall-clock speed-up and whether every output is identical.
+    """
+    stats = SpeculativeStats()
+    baseline_time = 0.0
+    speculative_time = 0.0
+    mismatches = []
+
+    for question in questions:
+        references = [entry['answer'] for entry in curated_index.retrieve(question, top_k=3)]
+
+        start = time.time()
+        inputs = tokenizer(f"question: {question.strip()}", return_tensors="tf",
+                           max_length=110, truncation=True)
+        baseline_ids = model.generate(inputs.input_ids, attention_mask=inputs.attention_mask,
+                                      max_length=max_length, do_sample=False, num_beams=1)
+        baseline_time += time.time() - start
+        baseline = tokenizer.decode(baseline_ids[0], skip_special_tokens=True)
+
+        start = time.time()
+        speculative = generate_speculative(model, tokenizer, question, references,
+                                           max_length, num_draft, stats)
+        speculative_time += time.time() - start
+        if speculative != baseline:
+            mismatches.append({'question': question, 'greedy': baseline, 'speculative': speculative})
+
+    summary = stats.summary()
+    summary['speed_up'] = baseline_time / max(speculative_time, 1e-9)
+    summary['identical_outputs'] = len(questions) - len(mismatches)
+    summary['mismatches'] = mismatches
+
+    print(f"Speculative decoding over {len(questions)} questions:")
+    print(f"   Acceptance rate: {summary['acceptance_rate']:.1%}")
+    print(f"   Tokens per forward pass: {summary['tokens_per_forward_pass']:.2f}")
+    print(f"   Wall-clock speed-up vs greedy generate: {summary['speed_up']:.2f}x")
+    print(f"   Identical to greedy: {summary['identical_outputs']}/{len(questions)}")
+    return summary
@@ -0,0 +1,101 @@
+# =============================================================================
+# TRIMMED-VOCABULARY TOKENIZER
+# Remaps SentencePiece ids to a checkpoint whose embedding/LM head keep only
+# the domain vocabulary (see data/model/vocab_trimming.py)
+# =============================================================================
+
+import os
+import json
+import numpy as np
+from typing import Dict, List, Optional
+
+VOCAB_MAP_FILE = "vocab_map.json"
+
+
+class RemappingTokenizer:
+    """
+    Wraps a T5Tokenizer: encodes with the full SentencePiece model, then maps
+    original ids to trimmed ids (tokens outside the kept set become <unk>);
+    decoding maps back first. Special ids (pad 0, eos 1, unk 2) are unchanged.
+    """
+
+    def __init__(self, tokenizer, kept_ids: List[int]):
+        self.tokenizer = tokenizer
+        self.kept_ids = np.asarray(kept_ids, dtype=np.int64)
+        self.to_trimmed = np.full(max(len(tokenizer), int(self.kept_ids.max()) + 1),
+                                  tokenizer.unk_token_id, dtype=np.int64)
+        self.to_trimmed[self.kept_ids] = np.arange(len(self.kept_ids))
+
+    @classmethod
+    def from_pretrained(cls, path: str):
+        from transformers import T5Tokenizer
+
+        with open(os.path.join(path, VOCAB_MAP_FILE), 'r', encoding='utf-8') as f:
+            vocab_map = json.load(f)
+        return cls(T5Tokenizer.from_pretrained(path), vocab_map['kept_ids'])
+
+    def save_pretrained(self, path: str, metadata: Optional[Dict] = None):
+        self.tokenizer.save_pretrained(path)
+        with open(os.path.join(path, VOCAB_MAP_FILE), 'w', encoding='utf-8') as f:
+            json.dump(dict(metadata or {}, kept_ids=self.kept_ids.tolist()), f)
+
+    def __len__(self) -> int:
+        return len(self.kept_ids)
+
+    def __getattr__(self, name):
+        # pad/eos/unk ids and other attributes come from the wrapped tokenizer
+        return getattr(self.tokenizer, name)
+
+    def _remap(self, ids):
+        ids = np.asarray(ids)
+        return self.to_trimmed[np.clip(ids, 0, len(self.to_trimmed) - 1)]
+
+    def _restore(self, ids):
+        ids = np.asarray(ids)
+        return self.kept_ids[np.clip(ids, 0, len(self.kept_ids) - 1)]
+
+    def __call__(self, *args, return_tensors: Optional[str] = None, **kwargs):
+        from transformers import BatchEncoding
+
+        encoding = self.tokenizer(*args, **kwargs)
+        data = dict(encoding)
+        ids = data['input_ids']
+        if ids and isinstance(ids[0], list):
+            data['input_ids'] = [self._remap(row).tolist() for row in ids]
+        else:
+            data['input_ids'] = self._remap(ids).tolist()
+        return BatchEncoding(data, tensor_type=return_tensors)
+
+    def encode(self, text: str, return_tensors: Optional[str] = None, **kwargs):
+        ids = self._remap(self.tokenizer.encode(text, **kwargs)).tolist()
+        if return_tensors == 'tf':
+            import tensorflow as tf
+            return tf.constant([ids], dtype=tf.int32)
+        return ids
+
+    def decode(self, ids, **kwargs) -> str:
+        ids = ids.numpy() if hasattr(ids, 'numpy') else ids
+        return self.tokenizer.decode(self._restore(ids).tolist(), **kwargs)
+
+    def batch_decode(self, sequences, **kwargs) -> List[str]:
+        return [self.decode(ids, **kwargs) for ids in sequences]
+
+    def convert_ids_to_tokens(self, ids):
+        if isinstance(ids, int):
+            return self.tokenizer.convert_ids_to_tokens(int(self.kept_ids[ids]))
+        return self.tokenizer.convert_ids_to_tokens(self._restore(ids).tolist())
+
+    def convert_tokens_to_ids(self, tokens):
+        ids = self.tokenizer.convert_tokens_to_ids(tokens)
+        if isinstance(ids, int):
+            return int(self.to_trimmed[ids])
+        return self._remap(ids).tolist()
+
+
+def load_tokenizer(model_path: str):
+    """T5Tokenizer for a normal checkpoint, RemappingTokenizer for a vocabulary-trimmed one"""
+    if os.path.exists(os.path.join(model_path, VOCAB_MAP_FILE)):
+        return RemappingTokenizer.from_pretrained(model_path)
+
+    from transformers import T5Tokenizer
+    return T5Tokenizer.from_pretrained(model_path)
@@ -2,7 +2,7 @@ import pandas as pd
 import json
 import os
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 import re
 
 # Set up logging
@@ -353,40 +353,16 @@ class ClimateDatasetBuilder:
         
         return dataset
     
-    def create_question_variations(self, base_dataset: List[Dict]) -> List[Dict]:
+    def create_question_variations(self, base_dataset: List[Dict], config: Optional[Dict] = None) -> List[Dict]:
         """
-        Create question variations to expand the dataset
+        Create question variations to expand the dataset (see question_augmentation.py:
+        every listed prefix rewrite, keyword synonym swaps and optional model paraphrases)
         """
-        variations = []
-        
-        # Question starters and their alternatives
-        variation_patterns = {
-            "What is": ["Can you explain", "How would you define", "Tell me about"],
-            "How does": ["In what way does", "What is the mechanism of", "By what process does"],
-            "Why does": ["What causes", "What is the reason", "How come"],
-            "What are": ["Can you list", "What would be examples of", "Name some"],
-            "How do": ["What is the process by which", "In what way do", "By what means do"]
-        }
-        
-        for entry in base_dataset:
-            original_question = entry['question']
-            
-            # Try to create one variation per original question
-            for original_start, alternatives in variation_patterns.items():
-                if original_question.startswith(original_start):
-                    # Use the first alternative
-                    new_start = alternatives[0]
-                    new_question = original_question.replace(original_start, new_start, 1)
-                    
-                    # Create new entry
-                    new_entry = entry.copy()
-                    new_entry['question'] = new_question
-                    new_entry['source'] = f"{entry['source']}_variation"
-                    
-                    variations.append(new_entry)
-                    break
-        
-        return variations
+        from question_augmentation import AUGMENT_CONFIG, QuestionAugmenter
+        
+        augmenter = QuestionAugmenter({**AUGMENT_CONFIG, **(config or {})},
+                                      existing=[entry['question'] for entry in base_dataset])
+        return augmenter.augment(base_dataset)
     
     def add_education_specific_content(self) -> List[Dict]:
         """
@@ -578,11 +554,13 @@ def main():
         # Save the dataset
         df = builder.save_dataset(dataset)
         
-        # Create train/test split files for convenience
-        from sklearn.model_selection import train_test_split
+        # Create train/validation/test split files (stable: membership follows a hash of
+        # each question and near-duplicate variations stay together, so adding examples
+        # never moves existing ones to another split)
+        from stable_split import split_records
         
-        train_data, temp_data = train_test_split(dataset, test_size=0.3, random_state=42)
-        val_data, test_data = train_test_split(temp_data, test_size=0.5, random_state=42)
+        splits = split_records(dataset)
+        train_data, val_data, test_data = splits['train'], splits['val'], splits['test']
         
         # Save split datasets
         pd.DataFrame(train_data).to_csv("climate_train_data.csv", index=False)
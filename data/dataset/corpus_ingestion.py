@@ -0,0 +1,377 @@
+# =============================================================================
+# LOCAL CORPUS INGESTION
+# Parse saved HTML/text pages (IPCC, NASA, ...) in a process pool, split them
+# into heading sections and extract candidate Q&A pairs with heuristics, as a
+# stream of records in the ClimateDatasetBuilder schema
+# =============================================================================
+
+import os
+import re
+import json
+import argparse
+import multiprocessing
+from functools import partial
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dataset_pipeline import PIPELINE_CONFIG, PipelineMetrics, parallel_stages
+
+INGEST_CONFIG = {
+    'extensions': ['.html', '.htm', '.txt', '.md'],   # PDF pages are ingested as their extracted text
+    'files_per_task': 8,
+    'min_answer_words': 25,
+    'max_answer_words': 120,
+    'max_subject_words': 5,          # "X is ..." definitions with longer subjects are skipped
+    'source_prefix': 'corpus'
+}
+
+# Headings that read as questions once prefixed ("Causes of sea level rise" -> "What are the causes ...")
+LIST_HEADINGS = {'causes', 'effects', 'impacts', 'benefits', 'types', 'sources', 'signs', 'consequences',
+                 'examples', 'drivers', 'risks', 'solutions'}
+QUESTION_WORDS = {'what', 'why', 'how', 'when', 'where', 'who', 'which', 'can', 'is', 'are', 'do', 'does',
+                  'will', 'should'}
+NON_SUBJECTS = {'it', 'this', 'that', 'these', 'those', 'they', 'there', 'he', 'she', 'we', 'you', 'one',
+                'which', 'what', 'here'}
+# Irregular past participles; with regular -ed/-ing forms they mark 'X is driven by ...' as passive/progressive
+IRREGULAR_PARTICIPLES = {'driven', 'made', 'known', 'seen', 'taken', 'given', 'shown', 'found', 'thought',
+                         'built', 'grown', 'done', 'held', 'led', 'kept', 'left', 'lost', 'set', 'brought',
+                         'spread', 'put', 'cut', 'felt', 'meant', 'sent', 'spent', 'understood', 'written',
+                         'drawn', 'born', 'borne', 'broken', 'chosen', 'fallen', 'frozen', 'risen', 'hidden',
+                         'likely', 'unlikely', 'able', 'unable'}
+
+CLIMATE_TERMS = ['climate', 'warming', 'greenhouse', 'carbon', 'co2', 'emission', 'methane', 'temperature',
+                 'sea level', 'ice', 'glacier', 'ocean', 'atmosphere', 'fossil', 'renewable', 'solar', 'wind',
+                 'drought', 'flood', 'heat', 'ipcc', 'mitigation', 'adaptation', 'weather', 'energy']
+
+# Dataset categories, scored by keyword hits; basic_concepts when nothing matches
+CATEGORY_KEYWORDS = {
+    'impacts': ['impact', 'effect', 'sea level', 'drought', 'flood', 'heat wave', 'heatwave', 'extinction',
+                'coral', 'wildfire', 'storm', 'hurricane', 'health', 'crop', 'migration', 'melting'],
+    'solutions': ['renewable', 'solar', 'wind power', 'mitigation', 'adaptation', 'reduce', 'efficiency',
+                  'electric', 'carbon capture', 'reforestation', 'policy', 'action', 'transition'],
+    'data_trends': ['percent', '%', 'ppm', 'record', 'since 18', 'since 19', 'trend', 'per decade', 'data',
+                    'measurement', 'observed', 'increase of', 'average of']
+}
+
+
+# =============================================================================
+# PARSING
+# =============================================================================
+
+class _BlockExtractor(HTMLParser):
+    """Headings and paragraph-like blocks of an HTML page, skipping scripts and page chrome"""
+
+    BLOCKS = {'p', 'li', 'dt', 'dd', 'td', 'blockquote', 'figcaption'}
+    HEADINGS = {'h1', 'h2', 'h3', 'h4'}
+    SKIPPED = {'script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'form'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[Tuple[str, str]] = []
+        self.title = ''
+        self.url = ''
+        self._skip = 0
+        self._kind: Optional[str] = None
+        self._text: List[str] = []
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in self.SKIPPED:
+            self._skip += 1
+        elif tag == 'title':
+            self._in_title = True
+        elif tag == 'link' and attrs.get('rel') == 'canonical':
+            self.url = attrs.get('href', '') or self.url
+        elif tag == 'meta' and attrs.get('property') == 'og:url' and not self.url:
+            self.url = attrs.get('content', '')
+        elif tag in self.HEADINGS or tag in self.BLOCKS:
+            self._flush()
+            self._kind = 'heading' if tag in self.HEADINGS else 'paragraph'
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self._skip = max(self._skip - 1, 0)
+        elif tag == 'title':
+            self._in_title = False
+        elif tag in self.HEADINGS or tag in self.BLOCKS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip and self._kind:
+            self._text.append(data)
+
+    def _flush(self):
+        text = ' '.join(''.join(self._text).split())
+        if self._kind and text:
+            self.blocks.append((self._kind, text))
+        self._kind, self._text = None, []
+
+
+def parse_html(html: str) -> Dict:
+    """Title, canonical URL and (kind, text) blocks; BeautifulSoup is used when installed"""
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        extractor = _BlockExtractor()
+        extractor.feed(html)
+        extractor.close()
+        return {'title': ' '.join(extractor.title.split()), 'url': extractor.url, 'blocks': extractor.blocks}
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(list(_BlockExtractor.SKIPPED)):
+        element.decompose()
+    canonical = soup.find('link', rel='canonical') or soup.find('meta', property='og:url')
+    blocks = []
+    for element in soup.find_all(list(_BlockExtractor.HEADINGS | _BlockExtractor.BLOCKS)):
+        if element.find(list(_BlockExtractor.BLOCKS)):
+            continue  # container of other blocks; its children are visited themselves
+        text = ' '.join(element.get_text(' ').split())
+        if text:
+            blocks.append(('heading' if element.name in _BlockExtractor.HEADINGS else 'paragraph', text))
+    return {'title': ' '.join(soup.title.get_text().split()) if soup.title else '',
+            'url': (canonical.get('href') or canonical.get('content') or '') if canonical else '',
+            'blocks': blocks}
+
+
+def parse_text(text: str) -> Dict:
+    """Blank-line separated blocks; markdown headings, questions and short unpunctuated lines are headings"""
+    blocks = []
+    for raw in re.split(r'\n\s*\n', text):
+        lines = [line.strip() for line in raw.strip().splitlines() if line.strip()]
+        if not lines:
+            continue
+        first = lines[0]
+        if first.startswith('#') or first.endswith('?') or \
+                (len(first.split()) <= 12 and not re.search(r'[.!:;,]$', first)):
+            blocks.append(('heading', first.lstrip('#').strip()))
+            lines = lines[1:]
+        if lines:
+            blocks.append(('paragraph', ' '.join(' '.join(lines).split())))
+    title = next((text for kind, text in blocks if kind == 'heading'), '')
+    return {'title': title, 'url': '', 'blocks': blocks}
+
+
+def parse_files(paths: List[Tuple[str, str]]) -> Tuple[List[Dict], Counter]:
+    """(root, path) pairs -> parsed documents (pool stage)"""
+    documents, reasons = [], Counter()
+    for root, path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except OSError:
+            reasons['unreadable'] += 1
+            continue
+        document = parse_html(content) if path.lower().endswith(('.html', '.htm')) else parse_text(content)
+        if not document['blocks']:
+            reasons['no_text'] += 1
+            continue
+        relative = os.path.relpath(path, root)
+        document.update(path=relative, bytes=len(content))
+        documents.append(document)
+    return documents, reasons
+
+
+# =============================================================================
+# CHUNKING + EXTRACTION
+# =============================================================================
+
+def chunk_documents(documents: List[Dict]) -> Tuple[List[Dict], Counter]:
+    """Split documents into sections: a heading and the paragraphs up to the next heading"""
+    sections, reasons = [], Counter()
+    for document in documents:
+        heading, paragraphs = document['title'], []
+        for kind, text in document['blocks'] + [('heading', '')]:
+            if kind == 'heading':
+                if paragraphs:
+                    sections.append({'heading': heading, 'paragraphs': paragraphs, 'path': document['path'],
+                                     'url': document['url']})
+                elif heading and heading != document['title']:
+                    reasons['empty_section'] += 1
+                heading, paragraphs = text, []
+            else:
+                paragraphs.append(text)
+    return sections, reasons
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence for sentence in re.split(r'(?<=[.!?])\s+(?=[A-Z0-9"(])', text) if sentence]
+
+
+def compose_answer(paragraphs: List[str], config: Dict = INGEST_CONFIG) -> Optional[str]:
+    """Leading whole sentences of the paragraphs, between the answer word limits"""
+    answer, words = [], 0
+    for sentence in (sentence for paragraph in paragraphs for sentence in split_sentences(paragraph)):
+        length = len(sentence.split())
+        if words + length > config['max_answer_words']:
+            break
+        answer.append(sentence)
+        words += length
+        if words >= config['min_answer_words'] and sentence.endswith('.') and words >= 2 * config['min_answer_words']:
+            break
+    return ' '.join(answer) if words >= config['min_answer_words'] else None
+
+
+def heading_question(heading: str) -> Optional[str]:
+    """A heading that is, or reads as, a question"""
+    heading = heading.strip().rstrip(':').strip()
+    words = heading.split()
+    if not words or len(words) > 16:
+        return None
+    if heading.endswith('?'):
+        return heading
+    first = words[0].lower()
+    if first in QUESTION_WORDS and len(words) >= 3:
+        return f"{heading}?"
+    if first in LIST_HEADINGS and len(words) >= 3:
+        return f"What are the {heading[0].lower()}{heading[1:]}?"
+    return None
+
+
+_DEFINITION = re.compile(r"^(?:The |An? )?([A-Za-z][\w\-' ()]*?) (is|are|refers to|describes|means) (?!not\b|also\b)(?:the |an? )?\S")
+# Passive or progressive verb after the copula, optionally behind an adverb ('is largely driven by')
+_NOT_A_DEFINITION = re.compile(r"(?:\w+ly )?(?:\w+(?:ed|ing)|" + '|'.join(sorted(IRREGULAR_PARTICIPLES)) + r")\b",
+                               re.IGNORECASE)
+
+
+def definition_question(paragraph: str, config: Dict = INGEST_CONFIG) -> Optional[str]:
+    """'Ocean acidification is ...' -> 'What is ocean acidification?'"""
+    match = _DEFINITION.match(paragraph)
+    if not match:
+        return None
+    subject, verb = match.group(1).strip(), match.group(2)
+    if len(subject.split()) > config['max_subject_words'] or subject.split()[0].lower() in NON_SUBJECTS:
+        return None
+    if verb in ('is', 'are') and _NOT_A_DEFINITION.match(paragraph, match.end(2) + 1):
+        return None
+    if not subject.isupper():
+        subject = subject[0].lower() + subject[1:] if not subject[:2].isupper() else subject
+    return f"What {'are' if verb == 'are' else 'is'} {subject}?"
+
+
+def classify(question: str, answer: str) -> Tuple[str, str]:
+    """(category, difficulty) of a candidate pair"""
+    text = f"{question} {answer}".lower()
+    scores = {category: sum(text.count(keyword) for keyword in keywords)
+              for category, keywords in CATEGORY_KEYWORDS.items()}
+    category = max(scores, key=scores.get) if max(scores.values()) >= 2 else 'basic_concepts'
+
+    words = answer.split()
+    long_share = sum(len(word) >= 10 for word in words) / max(len(words), 1)
+    difficulty = 'advanced' if long_share > 0.15 else 'beginner' if len(words) < 60 and long_share < 0.07 \
+        else 'intermediate'
+    return category, difficulty
+
+
+def source_name(path: str, config: Dict = INGEST_CONFIG) -> str:
+    """'corpus_<first directory under the corpus root>' (or the file name for top-level files)"""
+    first = path.split(os.sep)[0]
+    stem = os.path.splitext(first)[0] if first == path else first
+    return f"{config['source_prefix']}_{re.sub(r'[^a-z0-9]+', '_', stem.lower()).strip('_')}"
+
+
+def is_climate_related(text: str) -> bool:
+    text = text.lower()
+    return any(term in text for term in CLIMATE_TERMS)
+
+
+def extract_pairs(sections: List[Dict], config: Dict = INGEST_CONFIG) -> Tuple[List[Dict], Counter]:
+    """
+    Candidate pairs per section: a question heading answered by its paragraphs, and
+    'X is ...' definitions answered by their own paragraph (pool stage)
+    """
+    pairs, reasons = [], Counter()
+    for section in sections:
+        candidates, questions = [], set()
+        question = heading_question(section['heading'])
+        if question:
+            candidates.append((question, compose_answer(section['paragraphs'], config), 'heading'))
+        for paragraph in section['paragraphs']:
+            question = definition_question(paragraph, config)
+            if question:
+                candidates.append((question, compose_answer([paragraph], config), 'definition'))
+
+        if not candidates:
+            reasons['no_candidate'] += 1
+        for question, answer, heuristic in candidates:
+            # A question heading whose first paragraph defines its subject yields the same question twice
+            key = question.lower().rstrip('?').strip()
+            if key in questions:
+                reasons['duplicate_in_section'] += 1
+                continue
+            questions.add(key)
+            if answer is None:
+                reasons[f'{heuristic}_too_short'] += 1
+            elif not is_climate_related(f"{question} {answer}"):
+                reasons['off_topic'] += 1
+            else:
+                category, difficulty = classify(question, answer)
+                pairs.append({'question': question, 'answer': answer, 'category': category,
+                              'difficulty': difficulty, 'source': source_name(section['path'], config),
+                              'url': section['url'] or section['path']})
+    return pairs, reasons
+
+
+# =============================================================================
+# STREAM
+# =============================================================================
+
+def iter_corpus_files(root: str, config: Dict = INGEST_CONFIG) -> Iterator[Tuple[str, str]]:
+    """(root, path) of every ingestible file under `root`, in a stable order"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in config['extensions']:
+                yield root, os.path.join(directory, name)
+
+
+def ingest_corpus(roots: List[str], metrics: PipelineMetrics, pool=None, config: Dict = INGEST_CONFIG,
+                  pipeline_config: Dict = PIPELINE_CONFIG) -> Iterator[Dict]:
+    """Candidate Q&A records from every file under `roots`, parsed/chunked/extracted in the pool"""
+    config = {**INGEST_CONFIG, **config}
+
+    def files():
+        for root in roots:
+            yield from iter_corpus_files(root, config)
+
+    stages = [('parse', parse_files), ('chunk', chunk_documents), ('extract', partial(extract_pairs, config=config))]
+    task_config = {**pipeline_config, 'chunk_size': config['files_per_task']}
+    records = metrics.wrap('discover', files())
+    return metrics.wrap('collect', parallel_stages(stages, records, metrics, pool, task_config))
+
+
+def run_ingestion(roots: List[str], output_file: str, workers: int = PIPELINE_CONFIG['workers'],
+                  config: Dict = INGEST_CONFIG) -> Dict:
+    """Write candidate pairs to JSONL for review, with per-stage throughput"""
+    metrics = PipelineMetrics()
+    pool = multiprocessing.get_context().Pool(workers) if workers > 1 else None
+    written = Counter()
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for record in ingest_corpus(roots, metrics, pool, config, {**PIPELINE_CONFIG, 'workers': workers}):
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                written[record['category']] += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    print(f"\nCORPUS INGESTION: {sum(written.values()):,} candidate pairs -> {output_file}")
+    for category, count in written.most_common():
+        print(f"   {category}: {count:,}")
+    metrics.print_report()
+    return {'pairs': sum(written.values()), 'categories': dict(written), 'stages': metrics.report()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract candidate climate Q&A pairs from saved HTML/text pages")
+    parser.add_argument('roots', nargs='+', help="Corpus directories")
+    parser.add_argument('--output', default='corpus_candidates.jsonl')
+    parser.add_argument('--workers', type=int, default=PIPELINE_CONFIG['workers'])
+    parser.add_argument('--files-per-task', type=int, default=INGEST_CONFIG['files_per_task'])
+    args = parser.parse_args()
+
+    run_ingestion(args.roots, args.output, args.workers, {**INGEST_CONFIG, 'files_per_task': args.files_per_task})
@@ -0,0 +1,613 @@
+# =============================================================================
+# STREAMING DATASET BUILDER
+# Generator stages (source -> augment -> validate -> minhash -> dedupe -> split)
+# with the per-record stages run in a process pool, written as sharded
+# JSONL/Parquet splits plus a manifest; memory is bounded by the shard and chunk sizes
+# =============================================================================
+
+import os
+import re
+import csv
+import glob
+import json
+import time
+import shutil
+import argparse
+import multiprocessing
+from functools import partial
+from collections import Counter, deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from climate_dataset_scraper import ClimateDatasetBuilder
+from near_duplicates import NEAR_DUP_CONFIG, NearDuplicateIndex, LeakageTracker, signature_chunk
+from stable_split import STATE_DIR, SplitState, example_key, normalize_text
+from question_augmentation import AUGMENT_CONFIG, QuestionAugmenter
+
+DATASET_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join(DATASET_DIR, 'build')
+LOG_DIR = os.path.join(DATASET_DIR, '..', '..', 'outputs', 'ayikabot_logs')
+MANIFEST_FILE = "manifest.json"
+
+# Column order of climate_dataset.csv and the split files
+COLUMNS = ['question', 'answer', 'category', 'difficulty', 'source', 'id', 'word_count', 'char_count',
+           'created_date', 'url']
+SPLITS = ['train', 'val', 'test']
+SPLIT_CSV_FILES = {'train': 'climate_train_data.csv', 'val': 'climate_val_data.csv', 'test': 'climate_test_data.csv'}
+
+PIPELINE_CONFIG = {
+    'shard_size': 5000,              # rows per output shard
+    'formats': ['jsonl'],            # add 'parquet' for Parquet shards (needs pyarrow)
+    'workers': max(1, (os.cpu_count() or 2) - 1),
+    'chunk_size': 256,               # records per pool task
+    'max_pending_chunks': 4,         # in-flight tasks per worker (bounds memory)
+    'split_ratios': {'train': 0.70, 'val': 0.15, 'test': 0.15},
+    'split_salt': 'climate-qa-split-v1',   # stable_split.py: split = salted hash of the normalized question
+    'variants_per_question': AUGMENT_CONFIG['variants_per_question'],
+    'paraphrase_model': None,        # seq2seq paraphraser for extra variants (question_augmentation.py)
+    'min_question_words': 2,
+    'min_answer_words': 8,
+    'max_answer_words': 400,
+    'min_distinct_bigrams': 0.88,    # share of distinct word bigrams; degenerate generations repeat phrases
+    'min_log_confidence': 0.3,       # logged answers below this confidence are not training data
+    'near_duplicates': True,         # MinHash-LSH clustering (see near_duplicates.py for its settings)
+    'created_date': datetime.now().strftime('%Y-%m-%d')
+}
+
+
+# =============================================================================
+# STAGE PLUMBING
+# =============================================================================
+
+class PipelineMetrics:
+    """
+    Records out of each stage and the time spent in it. Main-process stages are nested
+    generators, so a stage's own time is its pull time minus its upstream stage's; stages
+    run in the pool report their time summed over workers.
+    """
+
+    def __init__(self):
+        self.stages: List[str] = []
+        self.worker_stages: set = set()
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.rejected: Dict[str, Counter] = {}
+        self.started = time.time()
+
+    def wrap(self, name: str, records: Iterable) -> Iterator:
+        """Count and time the records pulled through a stage (wrap stages upstream first)"""
+        self.stages.append(name)
+        self.counts[name] = 0
+        self.seconds[name] = 0.0
+        self.rejected.setdefault(name, Counter())
+        return self._metered(name, iter(records))
+
+    def _metered(self, name: str, iterator: Iterator) -> Iterator:
+        while True:
+            start = time.perf_counter()
+            try:
+                record = next(iterator)
+            except StopIteration:
+                self.seconds[name] += time.perf_counter() - start
+                return
+            self.seconds[name] += time.perf_counter() - start
+            self.counts[name] += 1
+            yield record
+
+    def add_worker_stage(self, name: str):
+        self.stages.append(name)
+        self.worker_stages.add(name)
+        self.counts[name] = 0
+        self.seconds[name] = 0.0
+        self.rejected.setdefault(name, Counter())
+
+    def record(self, name: str, records: int, seconds: float, rejected: Counter):
+        self.counts[name] += records
+        self.seconds[name] += seconds
+        self.reject(name, rejected)
+
+    def reject(self, stage: str, reasons: Counter):
+        self.rejected.setdefault(stage, Counter()).update(reasons)
+
+    def report(self) -> List[Dict]:
+        rows = []
+        upstream = 0.0
+        for name in self.stages:
+            if name in self.worker_stages:
+                own = self.seconds[name]
+            else:
+                own = max(self.seconds[name] - upstream, 0.0)
+                upstream = self.seconds[name]
+            rows.append({'stage': name, 'records': self.counts[name], 'seconds': round(own, 3),
+                         'records_per_s': round(self.counts[name] / own, 1) if own > 0 else None,
+                         'in_workers': name in self.worker_stages,
+                         'rejected': dict(self.rejected.get(name, {}))})
+        return rows
+
+    def print_report(self):
+        print(f"\nSTAGE THROUGHPUT ({time.time() - self.started:.1f}s total):")
+        for row in self.report():
+            rate = f"{row['records_per_s']:,.0f}/s" if row['records_per_s'] else '-'
+            rejected = f", rejected {row['rejected']}" if row['rejected'] else ''
+            where = ' (worker time)' if row['in_workers'] else ''
+            print(f"   {row['stage']:<10} {row['records']:>8,} records  {row['seconds']:>7.2f}s  {rate:>10}"
+                  f"{rejected}{where}")
+
+
+def chunked(records: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parallel_map(function: Callable, chunks: Iterable, pool=None, max_pending: int = 8) -> Iterator:
+    """
+    Ordered map over chunks with at most `max_pending` tasks in flight (Pool.imap would
+    drain the whole input generator into its task queue). Runs inline without a pool.
+    """
+    if pool is None:
+        for chunk in chunks:
+            yield function(chunk)
+        return
+
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(function, (chunk,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def run_chunk_stages(chunk: List[Dict], stages: List[Tuple[str, Callable]]) -> Tuple[List[Dict], List[Tuple]]:
+    """Apply chunk functions returning (records, rejection reasons) in turn, timing each"""
+    stats = []
+    for name, function in stages:
+        start = time.perf_counter()
+        chunk, reasons = function(chunk)
+        stats.append((name, len(chunk), time.perf_counter() - start, reasons))
+    return chunk, stats
+
+
+def parallel_stages(stages: List[Tuple[str, Callable]], records: Iterable[Dict], metrics: PipelineMetrics,
+                    pool=None, config: Dict = PIPELINE_CONFIG) -> Iterator[Dict]:
+    """
+    Run consecutive per-record stages on each chunk in one pool task (records cross the
+    process boundary once, not once per stage), flattened back in order
+    """
+    for name, _ in stages:
+        metrics.add_worker_stage(name)
+    max_pending = config['max_pending_chunks'] * max(config['workers'], 1)
+    task = partial(run_chunk_stages, stages=stages)
+    for kept, stats in parallel_map(task, chunked(records, config['chunk_size']), pool, max_pending):
+        for name, count, seconds, reasons in stats:
+            metrics.record(name, count, seconds, reasons)
+        yield from kept
+
+
+# =============================================================================
+# SOURCES
+# =============================================================================
+
+def curated_source() -> Iterator[Dict]:
+    """Hand-curated base and education Q&A pairs from ClimateDatasetBuilder"""
+    builder = ClimateDatasetBuilder()
+    yield from builder.create_base_dataset()
+    yield from builder.add_education_specific_content()
+
+
+def _read_log_entries(path: str) -> Iterator[Dict]:
+    """Rows of an interaction CSV/JSON-lines file (streamed) or a training-export JSON list"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+            return
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == '[':
+            # Training exports are one JSON list; only one file is held at a time
+            yield from json.loads(first + f.read())
+            return
+        line = first + f.readline()
+        while line:
+            if line.strip():
+                yield json.loads(line)
+            line = f.readline()
+
+
+def logged_source(paths: List[str], config: Dict = PIPELINE_CONFIG) -> Iterator[Dict]:
+    """Confident climate answers from exported interaction logs, in the builder's schema"""
+    for path in paths:
+        for entry in _read_log_entries(path):
+            if 'input' in entry:
+                question = re.sub(r'^question:\s*', '', entry['input'])
+                answer = entry.get('output', '')
+                confidence = float(entry.get('metadata', {}).get('confidence', 0.0) or 0.0)
+            else:
+                if str(entry.get('is_climate_related', False)) != 'True' or \
+                        entry.get('response_type', 'climate_answer') != 'climate_answer':
+                    continue
+                question, answer = entry.get('user_question', ''), entry.get('bot_response', '')
+                confidence = float(entry.get('confidence_score', 0.0) or 0.0)
+            if confidence < config['min_log_confidence']:
+                continue
+            yield {'question': question.strip(), 'answer': answer.strip(), 'category': 'user_questions',
+                   'difficulty': 'intermediate', 'source': 'user_logs', 'url': os.path.basename(path)}
+
+
+def default_log_paths() -> List[str]:
+    return sorted(glob.glob(os.path.join(LOG_DIR, 'interactions_*.json')))
+
+
+# =============================================================================
+# PER-RECORD STAGES (run in the pool)
+# =============================================================================
+
+_augmenter: Optional[QuestionAugmenter] = None
+
+
+def augment_chunk(chunk: List[Dict], config: Dict = PIPELINE_CONFIG) -> Tuple[List[Dict], Counter]:
+    """
+    The chunk's records followed by their question variations (originals first, so a variant
+    never displaces a real question in dedupe). Variants only depend on the chunk, not on
+    which worker saw which chunks before.
+    """
+    global _augmenter
+    if _augmenter is None:
+        _augmenter = QuestionAugmenter({**AUGMENT_CONFIG, 'variants_per_question': config['variants_per_question'],
+                                        'paraphrase_model': config['paraphrase_model']})
+    _augmenter.reset()
+    return chunk + _augmenter.augment(chunk), Counter()
+
+
+def _ngram_counts(tokens: List[str], n: int) -> Counter:
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def rejection_reason(record: Dict, config: Dict = PIPELINE_CONFIG) -> Optional[str]:
+    """Why a record is unusable as a training pair, or None"""
+    question, answer = record.get('question', '') or '', record.get('answer', '') or ''
+    if len(question.split()) < config['min_question_words']:
+        return 'short_question'
+    words = answer.split()
+    if len(words) < config['min_answer_words']:
+        return 'short_answer'
+    if len(words) > config['max_answer_words']:
+        return 'long_answer'
+    bigrams = _ngram_counts(normalize_text(answer).split(), 2)
+    if len(bigrams) < config['min_distinct_bigrams'] * sum(bigrams.values()):
+        return 'repetitive_answer'
+    return None
+
+
+def validate_chunk(chunk: List[Dict], config: Dict = PIPELINE_CONFIG) -> Tuple[List[Dict], Counter]:
+    kept, reasons = [], Counter()
+    for record in chunk:
+        reason = rejection_reason(record, config)
+        if reason:
+            reasons[reason] += 1
+        else:
+            kept.append(record)
+    return kept, reasons
+
+
+# =============================================================================
+# STATEFUL STAGES (main process)
+# =============================================================================
+
+def dedupe(records: Iterable[Dict], metrics: PipelineMetrics, state: SplitState,
+           index: Optional[NearDuplicateIndex] = None) -> Iterator[Dict]:
+    """
+    Drop repeated questions (first occurrence wins; one 64-bit key kept per distinct
+    question) and questions an earlier build already wrote. With an index, tag each
+    record with its near-duplicate cluster and drop members beyond `max_cluster_size`.
+    """
+    seen = set()
+    max_size = index.config['max_cluster_size'] if index is not None else 0
+    for record in records:
+        key = example_key(record['question'])
+        if key in seen:
+            metrics.reject('dedupe', Counter(duplicate_question=1))
+            continue
+        if key in state:
+            metrics.reject('dedupe', Counter(already_built=1))
+            continue
+        seen.add(key)
+        record['key'] = key
+
+        signatures = record.pop('_minhash', None)
+        if index is not None and signatures is not None:
+            record['cluster'], size = index.assign(*signatures)
+            if max_size and size > max_size:
+                metrics.reject('dedupe', Counter(near_duplicate=1))
+                continue
+        yield record
+
+
+def finalize_record(record: Dict, index: int, config: Dict = PIPELINE_CONFIG) -> Dict:
+    """Fill the metadata columns the builder adds to every entry"""
+    record = dict(record)
+    record['id'] = f"climate_qa_{index:03d}"
+    record['word_count'] = len(record['answer'].split())
+    record['char_count'] = len(record['answer'])
+    record.setdefault('created_date', config['created_date'])
+    record['url'] = record.get('url') or 'manual_creation'
+    return {column: record.get(column, '') for column in COLUMNS}
+
+
+def assign_splits(records: Iterable[Dict], state: SplitState) -> Iterator[Tuple[str, Dict]]:
+    """Stable split per record: its cluster's split, or the hash of its key"""
+    for record in records:
+        yield state.assign(record['key'], record.get('cluster')), record
+
+
+# =============================================================================
+# OUTPUT
+# =============================================================================
+
+class ShardWriter:
+    """Writes one split as numbered shards; only the current Parquet shard is buffered"""
+
+    def __init__(self, directory: str, split: str, shard_size: int, formats: List[str],
+                 shards: Optional[List[Dict]] = None):
+        self.directory = directory
+        self.split = split
+        self.shard_size = shard_size
+        self.formats = formats
+        self.shards: List[Dict] = list(shards or [])  # earlier builds' shards; new ones are numbered after them
+        self._rows: List[Dict] = []
+        self._jsonl = None
+        self._count = 0
+
+    def _path(self, extension: str) -> str:
+        return os.path.join(self.directory, f"{self.split}-{len(self.shards):05d}.{extension}")
+
+    def write(self, record: Dict):
+        if self._count == 0 and 'jsonl' in self.formats:
+            self._jsonl = open(self._path('jsonl'), 'w', encoding='utf-8')
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if 'parquet' in self.formats:
+            self._rows.append(record)
+        self._count += 1
+        if self._count == self.shard_size:
+            self._flush()
+
+    def _flush(self):
+        if self._count == 0:
+            return
+        files = []
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+            files.append(os.path.relpath(self._path('jsonl'), self.directory))
+        if 'parquet' in self.formats:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            pq.write_table(pa.Table.from_pylist(self._rows), self._path('parquet'))
+            files.append(os.path.relpath(self._path('parquet'), self.directory))
+            self._rows = []
+        self.shards.append({'files': files, 'rows': self._count})
+        self._count = 0
+
+    def close(self) -> List[Dict]:
+        self._flush()
+        return self.shards
+
+
+def write_shards(assigned: Iterable[Tuple[str, Dict]], writers: Dict[str, ShardWriter], state: SplitState,
+                 leakage: Optional[LeakageTracker] = None, config: Dict = PIPELINE_CONFIG) -> Iterator[str]:
+    splits = list(writers)
+    for split, record in assigned:
+        if leakage is not None and 'cluster' in record:
+            leakage.observe(record['cluster'], split, splits)
+        writers[split].write(finalize_record(record, state.next_index, config))
+        state.next_index += 1
+        yield split
+
+
+def write_manifest(directory: str, writers: Dict[str, ShardWriter], metrics: PipelineMetrics, config: Dict,
+                   sources: List[str], extra: Optional[Dict] = None, previous: Optional[Dict] = None) -> Dict:
+    """Manifest of all shards; `previous` (the manifest being appended to) keeps the build history"""
+    built = datetime.now().isoformat()
+    added = {split: sum(shard['rows'] for shard in writer.shards[len(previous['splits'][split]['shards']):])
+             if previous else sum(shard['rows'] for shard in writer.shards) for split, writer in writers.items()}
+    manifest = {
+        'built': built,
+        'builds': (previous or {}).get('builds', []) + [{'built': built, 'sources': sources, 'added': added}],
+        'columns': COLUMNS,
+        'formats': config['formats'],
+        'sources': sources,
+        'config': {key: value for key, value in config.items() if key not in ('workers',)},
+        'splits': {split: {'rows': sum(shard['rows'] for shard in writer.shards), 'shards': writer.shards}
+                   for split, writer in writers.items()},
+        'stages': metrics.report(),
+        **(extra or {})
+    }
+    manifest['rows'] = sum(split['rows'] for split in manifest['splits'].values())
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(directory: str) -> Optional[Dict]:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_split(directory: str, split: str, first_shard: int = 0) -> Iterator[Dict]:
+    """Stream the records of one split back from its JSONL (or Parquet) shards"""
+    manifest = load_manifest(directory)
+    for shard in manifest['splits'].get(split, {}).get('shards', [])[first_shard:]:
+        jsonl = [name for name in shard['files'] if name.endswith('.jsonl')]
+        if jsonl:
+            with open(os.path.join(directory, jsonl[0]), 'r', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+        else:
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(os.path.join(directory, shard['files'][0])).iter_batches():
+                yield from batch.to_pylist()
+
+
+def export_csv(directory: str, output_dir: str = DATASET_DIR,
+               first_shards: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Stream the shards into the CSV files training and evaluation read (climate_dataset.csv
+    plus one file per split). With `first_shards`, only rows of the shards from those
+    positions on are appended, leaving the rows already in the files untouched.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if first_shards and not all(os.path.exists(os.path.join(output_dir, name))
+                                for name in ['climate_dataset.csv'] + list(SPLIT_CSV_FILES.values())):
+        first_shards = None  # nothing to append to: write the files in full
+    counts = {}
+    mode = 'a' if first_shards else 'w'
+    with open(os.path.join(output_dir, 'climate_dataset.csv'), mode, encoding='utf-8', newline='') as full:
+        full_writer = csv.DictWriter(full, fieldnames=COLUMNS)
+        if not first_shards:
+            full_writer.writeheader()
+        for split in SPLITS:
+            counts[split] = 0
+            with open(os.path.join(output_dir, SPLIT_CSV_FILES[split]), mode, encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS)
+                if not first_shards:
+                    writer.writeheader()
+                for record in iter_split(directory, split, (first_shards or {}).get(split, 0)):
+                    writer.writerow(record)
+                    full_writer.writerow(record)
+                    counts[split] += 1
+    return counts
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+def run_pipeline(output_dir: str = BUILD_DIR, log_paths: Optional[List[str]] = None,
+                 config: Dict = PIPELINE_CONFIG, csv_dir: Optional[str] = None, incremental: bool = False,
+                 corpus_dirs: Optional[List[str]] = None) -> Dict:
+    """
+    Build the dataset from the curated pairs (and logs and local corpora, if given) into sharded split files.
+    Incremental builds keep every row already written, in its split, and only append new
+    shards (and new CSV rows) for examples the saved split state has not seen.
+    """
+    config = {**PIPELINE_CONFIG, **config}
+    if 'parquet' in config['formats']:
+        import pyarrow  # noqa: F401  fail before any work if Parquet output cannot be written
+
+    state_dir = os.path.join(output_dir, STATE_DIR)
+    previous = load_manifest(output_dir) if incremental else None
+    os.makedirs(output_dir, exist_ok=True)
+    if previous is None:
+        for path in glob.glob(os.path.join(output_dir, '*-[0-9][0-9][0-9][0-9][0-9].*')):
+            os.remove(path)
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    split_config = {'split_ratios': config['split_ratios'], 'split_salt': config['split_salt']}
+    state = SplitState.load(state_dir, split_config)
+    index = NearDuplicateIndex.load(state_dir, NEAR_DUP_CONFIG) if config['near_duplicates'] else None
+    leakage = LeakageTracker() if index is not None else None
+
+    sources = ['curated'] + [os.path.basename(path) for path in log_paths or []] + \
+        [f"corpus:{os.path.basename(os.path.normpath(root))}" for root in corpus_dirs or []]
+    print(f"{'Extending' if previous else 'Building'} dataset from {len(sources)} sources with {config['workers']} "
+          f"workers (chunks of {config['chunk_size']}, shards of {config['shard_size']})...")
+
+    def source_stream():
+        yield from curated_source()
+        if log_paths:
+            yield from logged_source(log_paths, config)
+        if corpus_dirs:
+            from corpus_ingestion import ingest_corpus  # imports this module
+            yield from ingest_corpus(corpus_dirs, ingestion_metrics, pool, pipeline_config=config)
+
+    metrics = PipelineMetrics()
+    ingestion_metrics = PipelineMetrics()
+    first_shards = {split: len(previous['splits'][split]['shards']) for split in config['split_ratios']} \
+        if previous else {}
+    writers = {split: ShardWriter(output_dir, split, config['shard_size'], config['formats'],
+                                  previous['splits'][split]['shards'] if previous else None)
+               for split in config['split_ratios']}
+
+    pool = multiprocessing.get_context().Pool(config['workers']) if config['workers'] > 1 else None
+    try:
+        stages = [('augment', partial(augment_chunk, config=config)), ('validate', partial(validate_chunk, config=config))]
+        if index is not None:
+            stages.append(('minhash', signature_chunk))
+        records = metrics.wrap('source', source_stream())
+        records = metrics.wrap('collect', parallel_stages(stages, records, metrics, pool, config))
+        records = metrics.wrap('dedupe', dedupe(records, metrics, state, index))
+        assigned = metrics.wrap('split', assign_splits(records, state))
+        for _ in metrics.wrap('write', write_shards(assigned, writers, state, leakage, config)):
+            pass
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    for writer in writers.values():
+        writer.close()
+    state.save(state_dir)
+    extra = {'ingestion': ingestion_metrics.report()} if corpus_dirs else {}
+    if index is not None:
+        index.save(state_dir)
+        extra['near_duplicates'] = dict(index.summary(), leakage=leakage.report(list(writers)))
+    manifest = write_manifest(output_dir, writers, metrics, config, sources, extra, previous)
+
+    added = manifest['builds'][-1]['added']
+    print(f"\nDATASET {'EXTENDED' if previous else 'BUILT'}: {manifest['rows']:,} Q&A pairs in {output_dir} "
+          f"({sum(added.values()):,} new)")
+    for split, info in manifest['splits'].items():
+        print(f"   {split}: {info['rows']:,} pairs (+{added[split]:,}) in {len(info['shards'])} shards")
+    if 'near_duplicates' in manifest:
+        near = manifest['near_duplicates']
+        print(f"   Near-duplicate clusters: {near['multi_member_clusters']:,} ({near['clustered_records']:,} records, "
+              f"largest {near['largest_cluster']}), spanning splits: {near['leakage']['leaking_clusters']:,}")
+    metrics.print_report()
+    if corpus_dirs:
+        print(f"\n   Corpus ingestion (inside the source stage):")
+        ingestion_metrics.print_report()
+
+    if csv_dir:
+        counts = export_csv(output_dir, csv_dir, first_shards)
+        print(f"\nCSV rows {'appended' if previous else 'written'} in {csv_dir}: {counts}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming, multi-process climate dataset builder")
+    parser.add_argument('--output-dir', default=BUILD_DIR)
+    parser.add_argument('--logs', nargs='*', default=None,
+                        help="Interaction logs to merge (no paths: outputs/ayikabot_logs/interactions_*.json)")
+    parser.add_argument('--corpus', nargs='+', default=None,
+                        help="Directories of saved HTML/text pages to extract candidate Q&A pairs from")
+    parser.add_argument('--workers', type=int, default=PIPELINE_CONFIG['workers'])
+    parser.add_argument('--chunk-size', type=int, default=PIPELINE_CONFIG['chunk_size'])
+    parser.add_argument('--shard-size', type=int, default=PIPELINE_CONFIG['shard_size'])
+    parser.add_argument('--variants', type=int, default=PIPELINE_CONFIG['variants_per_question'],
+                        help="Question variations generated per example")
+    parser.add_argument('--paraphrase-model', default=None, help="Seq2seq checkpoint for model paraphrases")
+    parser.add_argument('--formats', nargs='+', choices=['jsonl', 'parquet'], default=PIPELINE_CONFIG['formats'])
+    parser.add_argument('--incremental', action='store_true',
+                        help="Append new examples to an existing build instead of rebuilding it")
+    parser.add_argument('--no-near-duplicates', action='store_true', help="Skip MinHash-LSH clustering")
+    parser.add_argument('--export-csv', nargs='?', const=DATASET_DIR, default=None,
+                        help="Also write climate_dataset.csv and the split CSVs (default: data/dataset)")
+    args = parser.parse_args()
+
+    log_paths = args.logs if args.logs is None or args.logs else default_log_paths()
+    run_pipeline(args.output_dir, log_paths, {
+        'workers': args.workers, 'chunk_size': args.chunk_size, 'shard_size': args.shard_size,
+        'formats': args.formats, 'variants_per_question': args.variants, 'paraphrase_model': args.paraphrase_model,
+        'near_duplicates': not args.no_near_duplicates
+    }, args.export_csv, args.incremental, args.corpus)
@@ -0,0 +1,336 @@
+# =============================================================================
+# NEAR-DUPLICATE DETECTION (MINHASH + LSH)
+# Character-shingle MinHash signatures of questions and answers computed in
+# vectorized NumPy, LSH banding for candidates, union-find clusters and a
+# report of clusters that leak across the train/val/test splits
+# =============================================================================
+
+import os
+import re
+import csv
+import json
+import argparse
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+DATASET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+NEAR_DUP_CONFIG = {
+    'shingle_size': 5,            # characters per shingle of the normalized text
+    'num_perm': 64,               # MinHash permutations (signature length)
+    'bands': 16,                  # LSH bands of num_perm / bands rows; candidates from Jaccard ~ (1/bands)^(1/rows)
+    'question_threshold': 0.8,    # estimated Jaccard of questions that makes a pair near-duplicate
+    'answer_threshold': 0.7,      # ... or of answers (question variations share the answer)
+    'max_cluster_size': 16,       # members kept per cluster in the dataset pipeline (0 keeps all)
+    'seed': 1
+}
+
+_HASH_SHIFT = np.uint64(32)
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower()))
+
+
+def _permutations(config: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Odd multipliers and offsets of the multiply-shift hashes standing in for permutations"""
+    rng = np.random.default_rng(config['seed'])
+    a = rng.integers(1, 2 ** 63, size=config['num_perm'], dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=config['num_perm'], dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(texts: List[str], config: Dict = NEAR_DUP_CONFIG) -> np.ndarray:
+    """
+    (len(texts), num_perm) uint32 signatures. All texts are shingled in one pass over
+    their concatenated bytes: rolling hashes of every window, windows that cross a text
+    boundary masked out, then one min-reduce per text and hash function.
+    """
+    k = config['shingle_size']
+    encoded = [_normalize(text).encode('utf-8').ljust(k) for text in texts]
+    if not encoded:
+        return np.zeros((0, config['num_perm']), dtype=np.uint32)
+
+    lengths = np.array([len(text) for text in encoded])
+    buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(buffer, k)
+    powers = np.uint64(257) ** np.arange(k - 1, -1, -1, dtype=np.uint64)
+    shingles = (windows * powers).sum(axis=1, dtype=np.uint64)
+
+    # Keep windows that start and end inside the same text
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    owner = np.repeat(np.arange(len(encoded)), lengths)[:len(shingles)]
+    valid = np.arange(len(shingles)) + k <= (starts + lengths)[owner]
+    shingles, owner = shingles[valid], owner[valid]
+
+    a, b = _permutations(config)
+    hashed = ((a[:, None] * shingles[None, :] + b[:, None]) >> _HASH_SHIFT).astype(np.uint32)
+    offsets = np.concatenate([[0], np.cumsum(lengths - k + 1)[:-1]])
+    return np.minimum.reduceat(hashed, offsets, axis=1).T.copy()
+
+
+def band_keys(signatures: np.ndarray, config: Dict = NEAR_DUP_CONFIG) -> np.ndarray:
+    """(n, bands) uint64 bucket keys: each band's rows folded into one hash"""
+    n, num_perm = signatures.shape
+    rows = num_perm // config['bands']
+    banded = signatures[:, :rows * config['bands']].reshape(n, config['bands'], rows).astype(np.uint64)
+    multipliers = np.uint64(0x9E3779B97F4A7C15) ** np.arange(1, rows + 1, dtype=np.uint64)
+    return (banded * multipliers).sum(axis=2, dtype=np.uint64)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity: share of equal signature entries (row-wise)"""
+    return (first == second).mean(axis=-1)
+
+
+def is_near_duplicate(question_sims: np.ndarray, answer_sims: np.ndarray, config: Dict = NEAR_DUP_CONFIG) -> np.ndarray:
+    return (question_sims >= config['question_threshold']) | (answer_sims >= config['answer_threshold'])
+
+
+# =============================================================================
+# BATCH CLUSTERING
+# =============================================================================
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first: int, second: int):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def candidate_pairs(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs sharing a bucket in any band: each member with its bucket's first member and
+    with its neighbour in bucket order (O(n log n) per band, never all pairs of a bucket)
+    """
+    firsts, seconds = [], []
+    for band in range(keys.shape[1]):
+        order = np.argsort(keys[:, band], kind='stable')
+        ordered = keys[order, band]
+        same = ordered[1:] == ordered[:-1]
+        group_start = np.maximum.accumulate(np.where(np.concatenate([[True], ~same]), np.arange(len(order)), 0))
+        firsts.extend([order[:-1][same], order[group_start[1:][same]]])
+        seconds.extend([order[1:][same], order[1:][same]])
+    if not firsts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    pairs = np.unique(np.stack([np.concatenate(firsts), np.concatenate(seconds)], axis=1), axis=0)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return pairs[:, 0], pairs[:, 1]
+
+
+def find_clusters(questions: List[str], answers: List[str], config: Dict = NEAR_DUP_CONFIG,
+                  batch_size: int = 256) -> np.ndarray:
+    """Cluster label (index of the cluster's first record) for every Q&A pair"""
+    question_sigs = np.concatenate([minhash_signatures(questions[i:i + batch_size], config)
+                                    for i in range(0, len(questions), batch_size)] or
+                                   [np.zeros((0, config['num_perm']), dtype=np.uint32)])
+    answer_sigs = np.concatenate([minhash_signatures(answers[i:i + batch_size], config)
+                                  for i in range(0, len(answers), batch_size)] or
+                                 [np.zeros((0, config['num_perm']), dtype=np.uint32)])
+
+    first, second = candidate_pairs(np.concatenate([band_keys(question_sigs, config),
+                                                    band_keys(answer_sigs, config)], axis=1))
+    near = is_near_duplicate(similarity(question_sigs[first], question_sigs[second]),
+                             similarity(answer_sigs[first], answer_sigs[second]), config)
+
+    clusters = UnionFind(len(questions))
+    for i, j in zip(first[near].tolist(), second[near].tolist()):
+        clusters.union(i, j)
+    return np.array([clusters.find(i) for i in range(len(questions))], dtype=np.int64)
+
+
+# =============================================================================
+# STREAMING INDEX (dataset pipeline)
+# =============================================================================
+
+def signature_chunk(chunk: List[Dict], config: Dict = NEAR_DUP_CONFIG) -> Tuple[List[Dict], Counter]:
+    """Attach the question+answer signature and the band keys to each record (pool stage)"""
+    if not chunk:
+        return chunk, Counter()
+    question_sigs = minhash_signatures([record['question'] for record in chunk], config)
+    answer_sigs = minhash_signatures([record['answer'] for record in chunk], config)
+    signatures = np.concatenate([question_sigs, answer_sigs], axis=1)
+    keys = np.concatenate([band_keys(question_sigs, config), band_keys(answer_sigs, config)], axis=1).tolist()
+    for index, record in enumerate(chunk):
+        record['_minhash'] = (signatures[index], keys[index])
+    return chunk, Counter()
+
+
+class NearDuplicateIndex:
+    """
+    One-pass LSH over cluster heads: a record joins the first head it verifies against in
+    a shared bucket, otherwise it becomes a new head. Only heads are indexed, so memory
+    grows with the number of clusters, not records.
+    """
+
+    def __init__(self, config: Dict = NEAR_DUP_CONFIG):
+        self.config = {**NEAR_DUP_CONFIG, **config}
+        self.tables = [dict() for _ in range(2 * self.config['bands'])]
+        self.signatures = np.zeros((1024, 2 * self.config['num_perm']), dtype=np.uint32)
+        self.sizes: List[int] = []
+
+    def assign(self, signature: np.ndarray, keys: List[int]) -> Tuple[int, int]:
+        """(cluster id, members so far including this one) for a question+answer signature"""
+        heads = sorted({table[key] for table, key in zip(self.tables, keys) if key in table})
+        if heads:
+            equal = self.signatures[heads] == signature
+            num_perm = self.config['num_perm']
+            near = is_near_duplicate(equal[:, :num_perm].mean(axis=1), equal[:, num_perm:].mean(axis=1), self.config)
+            if near.any():
+                head = heads[int(np.argmax(near))]
+                self.sizes[head] += 1
+                return head, self.sizes[head]
+
+        head = len(self.sizes)
+        if head == len(self.signatures):
+            self.signatures = np.concatenate([self.signatures, np.zeros_like(self.signatures)])
+        self.signatures[head] = signature
+        self.sizes.append(1)
+        for table, key in zip(self.tables, keys):
+            table.setdefault(key, head)
+        return head, 1
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'cluster_heads.npy'), self.signatures[:len(self.sizes)])
+        np.save(os.path.join(directory, 'cluster_sizes.npy'), np.array(self.sizes, dtype=np.int64))
+
+    @classmethod
+    def load(cls, directory: str, config: Dict = NEAR_DUP_CONFIG) -> "NearDuplicateIndex":
+        """Saved cluster heads (bucket tables are rebuilt from their signatures), or a new index"""
+        index = cls(config)
+        path = os.path.join(directory, 'cluster_heads.npy')
+        if not os.path.exists(path):
+            return index
+        heads = np.load(path)
+        if heads.shape[1] != 2 * index.config['num_perm']:
+            raise ValueError(f"Saved cluster heads in {directory} use a different signature length")
+        index.signatures = np.concatenate([heads, np.zeros((1024, heads.shape[1]), dtype=np.uint32)])
+        index.sizes = np.load(os.path.join(directory, 'cluster_sizes.npy')).tolist()
+        num_perm = index.config['num_perm']
+        keys = np.concatenate([band_keys(heads[:, :num_perm], index.config),
+                               band_keys(heads[:, num_perm:], index.config)], axis=1).tolist()
+        for head, head_keys in enumerate(keys):
+            for table, key in zip(index.tables, head_keys):
+                table.setdefault(key, head)
+        return index
+
+    def summary(self) -> Dict:
+        sizes = np.array(self.sizes or [0])
+        return {'clusters': len(self.sizes), 'multi_member_clusters': int((sizes > 1).sum()),
+                'clustered_records': int(sizes[sizes > 1].sum()), 'largest_cluster': int(sizes.max())}
+
+
+class LeakageTracker:
+    """Splits each cluster landed in; a cluster in more than one split leaks between them"""
+
+    def __init__(self):
+        self.masks: Dict[int, int] = {}
+
+    def observe(self, cluster: int, split: str, splits: List[str]):
+        self.masks[cluster] = self.masks.get(cluster, 0) | (1 << splits.index(split))
+
+    def report(self, splits: List[str]) -> Dict:
+        leaking = [cluster for cluster, mask in self.masks.items() if mask & (mask - 1)]
+        pairs = Counter()
+        for cluster in leaking:
+            present = [split for i, split in enumerate(splits) if self.masks[cluster] >> i & 1]
+            pairs.update(f"{a}-{b}" for i, a in enumerate(present) for b in present[i + 1:])
+        return {'clusters': len(self.masks), 'leaking_clusters': len(leaking), 'split_pairs': dict(pairs)}
+
+
+# =============================================================================
+# REPORT
+# =============================================================================
+
+def read_split_rows(paths: Dict[str, str]) -> List[Dict]:
+    rows = []
+    for split, path in paths.items():
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows.extend(dict(row, split=split) for row in csv.DictReader(f))
+    return rows
+
+
+def leakage_report(rows: List[Dict], splits: List[str], config: Dict = NEAR_DUP_CONFIG, top_n: int = 20) -> Dict:
+    """Near-duplicate clusters of split-labelled rows and the clusters shared between splits"""
+    labels = find_clusters([row['question'] for row in rows], [row['answer'] for row in rows], config)
+    members: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels.tolist()):
+        members.setdefault(label, []).append(index)
+    clusters = sorted((group for group in members.values() if len(group) > 1), key=len, reverse=True)
+
+    leaking = [group for group in clusters if len({rows[i]['split'] for i in group}) > 1]
+    pairs = Counter()
+    for group in leaking:
+        present = [split for split in splits if any(rows[i]['split'] == split for i in group)]
+        pairs.update(f"{a}-{b}" for i, a in enumerate(present) for b in present[i + 1:])
+
+    train_clusters = {int(labels[i]) for i, row in enumerate(rows) if row['split'] == splits[0]}
+    exposed = {split: sum(1 for i, row in enumerate(rows) if row['split'] == split and int(labels[i]) in train_clusters)
+               for split in splits[1:]}
+    totals = Counter(row['split'] for row in rows)
+
+    return {
+        'rows': len(rows),
+        'config': config,
+        'clusters': len(clusters),
+        'clustered_rows': sum(len(group) for group in clusters),
+        'redundant_rows': sum(len(group) - 1 for group in clusters),
+        'leaking_clusters': len(leaking),
+        'leaking_split_pairs': dict(pairs),
+        f'rows_with_{splits[0]}_near_duplicate': {split: {'rows': count, 'share': count / max(totals[split], 1)}
+                                                   for split, count in exposed.items()},
+        'largest_clusters': [[{'split': rows[i]['split'], 'question': rows[i]['question']} for i in group]
+                             for group in clusters[:top_n]],
+        'leaking_examples': [[{'split': rows[i]['split'], 'question': rows[i]['question']} for i in group]
+                             for group in leaking[:top_n]]
+    }
+
+
+def run_report(split_paths: Optional[Dict[str, str]] = None, output_file: Optional[str] = None,
+               config: Dict = NEAR_DUP_CONFIG) -> Dict:
+    split_paths = split_paths or {split: os.path.join(DATASET_DIR, f"climate_{split}_data.csv")
+                                  for split in ('train', 'val', 'test')}
+    rows = read_split_rows(split_paths)
+    report = leakage_report(rows, list(split_paths), config)
+
+    print(f"\nNEAR-DUPLICATE REPORT ({report['rows']} rows):")
+    print(f"   Clusters with 2+ members: {report['clusters']} ({report['clustered_rows']} rows, "
+          f"{report['redundant_rows']} redundant)")
+    print(f"   Clusters spanning splits: {report['leaking_clusters']} {report['leaking_split_pairs']}")
+    for split, exposed in report[f"rows_with_{list(split_paths)[0]}_near_duplicate"].items():
+        print(f"   {split} rows with a near-duplicate in {list(split_paths)[0]}: {exposed['rows']} ({exposed['share']:.1%})")
+    for group in report['leaking_examples'][:5]:
+        print("   - " + " | ".join(f"[{member['split']}] {member['question']}" for member in group[:3]))
+
+    output_file = output_file or os.path.join(DATASET_DIR, 'near_duplicate_report.json')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nReport written to {output_file}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MinHash-LSH near-duplicate clusters and split leakage")
+    parser.add_argument('--split', nargs=2, action='append', metavar=('NAME', 'CSV'), default=None,
+                        help="Split name and CSV file (repeatable; default: the climate_*_data.csv splits)")
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--question-threshold', type=float, default=NEAR_DUP_CONFIG['question_threshold'])
+    parser.add_argument('--answer-threshold', type=float, default=NEAR_DUP_CONFIG['answer_threshold'])
+    args = parser.parse_args()
+
+    run_report(dict(args.split) if args.split else None, args.output, {
+        **NEAR_DUP_CONFIG, 'question_threshold': args.question_threshold, 'answer_threshold': args.answer_threshold
+    })
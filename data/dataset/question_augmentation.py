@@ -0,0 +1,302 @@
+# =============================================================================
+# QUESTION AUGMENTATION ENGINE
+# Variants per question from every listed prefix rewrite, synonym swaps over
+# the bot's climate keyword terms and (optionally) batched model paraphrases;
+# seeded per question, run in a process pool, deduplicated against the dataset
+# =============================================================================
+
+import re
+import json
+import random
+import hashlib
+import argparse
+import multiprocessing
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from stable_split import normalize_text
+
+AUGMENT_CONFIG = {
+    'variants_per_question': 4,
+    'prefix_rewrites': True,
+    'synonym_swaps': True,
+    'max_swaps': 2,                      # synonym groups swapped in one variant
+    'paraphrase_model': None,            # e.g. a T5 paraphrase checkpoint; None disables paraphrasing
+    'paraphrase_batch_size': 32,
+    'paraphrases_per_question': 3,
+    'seed': 'climate-qa-augment-v1',     # same seed + question -> same variants, whatever the workers
+    'chunk_size': 256,
+    'workers': max(multiprocessing.cpu_count() - 1, 1)
+}
+
+# Question starters and alternatives that keep the rest of the question grammatical
+# (the longest matching starter wins, so "What are the" takes precedence over "What are")
+VARIATION_PATTERNS = {
+    "What is": ["Can you explain", "Could you describe", "Tell me about"],
+    "How does": ["In what way does", "Through what mechanisms does", "By what process does"],
+    "Why does": ["For what reason does"],
+    "What are the": ["Can you list the", "Which are the", "Could you name the"],
+    "What are some": ["Can you suggest some", "Could you name some"],
+    "What are": ["Could you describe", "Tell me about"],
+    "How do": ["What is the process by which", "In what way do", "By what means do"],
+    "Why is": ["For what reason is"],
+    "How can": ["In what ways can", "By what means can"],
+    "What can": ["What could", "What things can"]
+}
+_STARTERS = sorted(VARIATION_PATTERNS, key=len, reverse=True)
+IMPERATIVE_STARTS = ("Tell me",)         # rewritten questions become requests ending with '.'
+# "What is X and why is it ...?": an embedded second question cannot follow the new starter
+_COMPOUND_QUESTION = re.compile(r"\band (?:why|how|what|when|where|which)\b", re.IGNORECASE)
+
+# Interchangeable terms from the bot's CLIMATE_KEYWORDS table (longest match wins)
+SYNONYM_GROUPS = [
+    ['climate change', 'global warming'],
+    ['carbon dioxide', 'CO2', 'atmospheric CO2'],
+    ['carbon emissions', 'CO2 emissions', 'greenhouse gas emissions'],
+    ['greenhouse gases', 'heat-trapping gases'],
+    ['renewable energy', 'clean energy', 'green energy'],
+    ['sea level rise', 'rising seas', 'rising sea levels'],
+    ['extreme weather', 'climate disasters', 'severe weather'],
+    ['heat waves', 'heatwaves', 'extreme heat'],
+    ['melting ice', 'ice loss'],
+    ['ice caps', 'ice sheets'],
+    ['flooding', 'floods'],
+    ['hurricanes', 'tropical storms'],
+    ['fossil fuels', 'coal, oil and gas'],
+    ['deforestation', 'forest loss'],
+    ['solar panels', 'solar PV'],
+    ['wind turbines', 'wind power'],
+    ['electric vehicles', 'EVs', 'electric cars'],
+    ['carbon offsets', 'offsetting'],
+    ['climate action', 'climate solutions'],
+    ['environment', 'natural world'],
+    ['sustainable', 'eco-friendly']
+]
+
+
+def _synonym_pattern() -> re.Pattern:
+    terms = sorted({term for group in SYNONYM_GROUPS for term in group}, key=len, reverse=True)
+    return re.compile(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')\b', re.IGNORECASE)
+
+
+_SYNONYMS = {term.lower(): group for group in SYNONYM_GROUPS for term in group}
+_SYNONYM_PATTERN = _synonym_pattern()
+
+
+def question_rng(question: str, seed: str) -> random.Random:
+    """Generator seeded by the question itself, so variants do not depend on order or chunking"""
+    digest = hashlib.blake2b(normalize_text(question).encode('utf-8'), digest_size=8, key=seed.encode('utf-8'))
+    return random.Random(int.from_bytes(digest.digest(), 'little'))
+
+
+def prefix_rewrites(question: str) -> List[str]:
+    """The question with its starter replaced by each listed alternative (none for compound questions)"""
+    if _COMPOUND_QUESTION.search(question):
+        return []
+    for original_start in _STARTERS:
+        if question.startswith(original_start + ' '):
+            rewrites = []
+            for new_start in VARIATION_PATTERNS[original_start]:
+                rewrite = question.replace(original_start, new_start, 1)
+                if new_start.startswith(IMPERATIVE_STARTS) and rewrite.endswith('?'):
+                    rewrite = rewrite[:-1] + '.'
+                rewrites.append(rewrite)
+            return rewrites
+    return []
+
+
+def _match_case(replacement: str, original: str) -> str:
+    if original[:1].isupper() and replacement[:1].islower():
+        return replacement[0].upper() + replacement[1:]
+    if original[:1].islower() and replacement[:1].isupper() and not replacement[:2].isupper():
+        return replacement[0].lower() + replacement[1:]
+    return replacement
+
+
+def synonym_swaps(question: str, rng: random.Random, max_swaps: int = 2) -> List[str]:
+    """Every single swap of a matched keyword term, plus one random multi-term swap"""
+    matches = list(_SYNONYM_PATTERN.finditer(question))
+    if not matches:
+        return []
+
+    def replace(replacements):
+        parts, end = [], 0
+        for match, term in replacements:
+            parts.extend([question[end:match.start()], _match_case(term, match.group(0))])
+            end = match.end()
+        return ''.join(parts) + question[end:]
+
+    swaps = []
+    for match in matches:
+        for term in _SYNONYMS[match.group(0).lower()]:
+            if term.lower() != match.group(0).lower():
+                swaps.append(replace([(match, term)]))
+    if len(matches) > 1 and max_swaps > 1:
+        chosen = sorted(rng.sample(matches, min(max_swaps, len(matches))), key=lambda match: match.start())
+        swaps.append(replace([(match, rng.choice([term for term in _SYNONYMS[match.group(0).lower()]
+                                                  if term.lower() != match.group(0).lower()]))
+                              for match in chosen]))
+    return swaps
+
+
+class ModelParaphraser:
+    """
+    Batched seq2seq paraphrases (deterministic beam search) on TensorFlow, like the rest of
+    the repo; transformers is imported on first use
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32, per_question: int = 3):
+        from transformers import AutoTokenizer, TFAutoModelForSeq2SeqLM
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = TFAutoModelForSeq2SeqLM.from_pretrained(model_name)
+        self.batch_size = batch_size
+        self.per_question = per_question
+
+    def paraphrase(self, questions: List[str]) -> List[List[str]]:
+        paraphrases = []
+        for start in range(0, len(questions), self.batch_size):
+            batch = questions[start:start + self.batch_size]
+            inputs = self.tokenizer([f"paraphrase: {question}" for question in batch], padding=True,
+                                    truncation=True, max_length=64, return_tensors='tf')
+            outputs = self.model.generate(**inputs, max_length=64, num_beams=max(self.per_question, 4),
+                                          num_return_sequences=self.per_question, do_sample=False)
+            decoded = self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+            paraphrases.extend(decoded[i:i + self.per_question] for i in range(0, len(decoded), self.per_question))
+        return paraphrases
+
+
+class QuestionAugmenter:
+    """
+    Up to `variants_per_question` new questions per entry, drawn (with the question's own
+    seed) from its prefix rewrites, synonym swaps, swaps of the rewrites and paraphrases.
+    Variants matching an existing or already generated question are dropped.
+    """
+
+    def __init__(self, config: Dict = AUGMENT_CONFIG, existing: Iterable[str] = ()):
+        self.config = {**AUGMENT_CONFIG, **config}
+        self.existing = frozenset(normalize_text(question) for question in existing)
+        self.seen: Set[str] = set(self.existing)
+        self._paraphraser: Optional[ModelParaphraser] = None
+
+    @property
+    def paraphraser(self) -> Optional[ModelParaphraser]:
+        if self._paraphraser is None and self.config['paraphrase_model']:
+            self._paraphraser = ModelParaphraser(self.config['paraphrase_model'],
+                                                 self.config['paraphrase_batch_size'],
+                                                 self.config['paraphrases_per_question'])
+        return self._paraphraser
+
+    def candidates(self, question: str, rng: random.Random) -> List[str]:
+        candidates = []
+        rewrites = prefix_rewrites(question) if self.config['prefix_rewrites'] else []
+        candidates.extend(rewrites)
+        if self.config['synonym_swaps']:
+            for base in [question] + rewrites:
+                candidates.extend(synonym_swaps(base, rng, self.config['max_swaps']))
+        return candidates
+
+    def reset(self):
+        """Forget generated variants (keep the existing questions)"""
+        self.seen = set(self.existing)
+
+    def select(self, question: str, candidates: List[str], rng: random.Random) -> List[str]:
+        unique = {}
+        for candidate in candidates:
+            key = normalize_text(candidate)
+            if key not in self.seen and key != normalize_text(question):
+                unique.setdefault(key, candidate)
+        keys = rng.sample(sorted(unique), min(self.config['variants_per_question'], len(unique)))
+        self.seen.update(keys)
+        return [unique[key] for key in keys]
+
+    def augment(self, entries: List[Dict]) -> List[Dict]:
+        """Variants of every entry, in entry order (paraphrases are generated for the whole batch at once)"""
+        for entry in entries:
+            self.seen.add(normalize_text(entry['question']))
+        paraphrases = self.paraphraser.paraphrase([entry['question'] for entry in entries]) \
+            if self.paraphraser is not None else [[] for _ in entries]
+
+        variations = []
+        for entry, paraphrased in zip(entries, paraphrases):
+            rng = question_rng(entry['question'], self.config['seed'])
+            candidates = self.candidates(entry['question'], rng) + [text.strip() for text in paraphrased]
+            for question in self.select(entry['question'], candidates, rng):
+                variations.append({**entry, 'question': question, 'source': f"{entry['source']}_variation"})
+        return variations
+
+
+# =============================================================================
+# PARALLEL EXPANSION
+# =============================================================================
+
+_augmenter: Optional[QuestionAugmenter] = None
+
+
+def _init_worker(config: Dict, existing: List[str]):
+    global _augmenter
+    _augmenter = QuestionAugmenter(config, existing)
+
+
+def _augment_chunk(chunk: List[Dict]) -> List[Dict]:
+    _augmenter.reset()
+    return _augmenter.augment(chunk)
+
+
+def _chunks(entries: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(entries)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def expand_dataset(entries: List[Dict], config: Dict = AUGMENT_CONFIG,
+                   existing: Iterable[str] = ()) -> List[Dict]:
+    """
+    Variants of `entries` from a pool of workers. Chunks are deduplicated on their own and
+    the ordered merge drops variants an earlier chunk already produced, so the output
+    depends on the chunk size but not on the worker count.
+    """
+    config = {**AUGMENT_CONFIG, **config}
+    existing = [entry['question'] for entry in entries] + list(existing)
+    chunks = _chunks(entries, config['chunk_size'])
+    if config['workers'] > 1:
+        # spawn when a paraphrase model is loaded: TensorFlow is not fork-safe
+        context = multiprocessing.get_context('spawn' if config['paraphrase_model'] else None)
+        with context.Pool(config['workers'], initializer=_init_worker,
+                                                initargs=(config, existing)) as pool:
+            results = list(pool.imap(_augment_chunk, chunks))
+    else:
+        _init_worker(config, existing)
+        results = [_augment_chunk(chunk) for chunk in chunks]
+
+    seen, variations = set(), []
+    for variation in (variation for result in results for variation in result):
+        key = normalize_text(variation['question'])
+        if key not in seen:
+            seen.add(key)
+            variations.append(variation)
+    return variations
+
+
+if __name__ == "__main__":
+    import time
+    from climate_dataset_scraper import ClimateDatasetBuilder
+
+    parser = argparse.ArgumentParser(description="Expand the curated climate questions with variants")
+    parser.add_argument('--variants', type=int, default=AUGMENT_CONFIG['variants_per_question'])
+    parser.add_argument('--paraphrase-model', default=None)
+    parser.add_argument('--workers', type=int, default=AUGMENT_CONFIG['workers'])
+    parser.add_argument('--output', default='augmented_questions.jsonl')
+    args = parser.parse_args()
+
+    builder = ClimateDatasetBuilder()
+    base = builder.create_base_dataset() + builder.add_education_specific_content()
+    started = time.time()
+    variations = expand_dataset(base, {'variants_per_question': args.variants, 'workers': args.workers,
+                                       'paraphrase_model': args.paraphrase_model})
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for variation in variations:
+            f.write(json.dumps(variation, ensure_ascii=False) + '\n')
+    print(f"{len(base)} questions -> {len(variations)} variants ({len(variations) / max(len(base), 1):.1f}x) "
+          f"in {time.time() - started:.2f}s -> {args.output}")
@@ -0,0 +1,133 @@
+# =============================================================================
+# STABLE SPLIT ASSIGNMENT
+# Train/val/test membership from a salted hash of each example's normalized
+# question, shared by every member of a near-duplicate cluster; assignments are
+# persisted so incremental builds only append rows to each split
+# =============================================================================
+
+import os
+import re
+import json
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional
+
+from near_duplicates import NEAR_DUP_CONFIG, find_clusters
+
+STATE_DIR = "split_state"
+
+SPLIT_CONFIG = {
+    'split_ratios': {'train': 0.70, 'val': 0.15, 'test': 0.15},
+    'split_salt': 'climate-qa-split-v1'     # changing it reassigns every example
+}
+
+
+def normalize_text(text: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a question or answer"""
+    return ' '.join(re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower()))
+
+
+def example_key(question: str) -> int:
+    """Stable 64-bit key of an example: its normalized question"""
+    return int.from_bytes(hashlib.blake2b(normalize_text(question).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def split_for_key(key: int, config: Dict = SPLIT_CONFIG) -> str:
+    """Split whose share of [0, 1) contains the salted hash of `key`"""
+    digest = hashlib.blake2b(key.to_bytes(8, 'little'), digest_size=8, key=config['split_salt'].encode('utf-8'))
+    position = int.from_bytes(digest.digest(), 'little') / 2 ** 64
+    total = sum(config['split_ratios'].values())
+    cumulative = 0.0
+    for split, ratio in config['split_ratios'].items():
+        cumulative += ratio / total
+        if position < cumulative:
+            return split
+    return split
+
+
+def split_records(records: List[Dict], config: Dict = SPLIT_CONFIG,
+                  near_dup_config: Optional[Dict] = NEAR_DUP_CONFIG) -> Dict[str, List[Dict]]:
+    """
+    Split an in-memory dataset: each near-duplicate cluster goes where its first member's
+    key hashes to (pass near_dup_config=None to split every example on its own key)
+    """
+    keys = [example_key(record['question']) for record in records]
+    if near_dup_config is not None and records:
+        clusters = find_clusters([record['question'] for record in records],
+                                 [record['answer'] for record in records], near_dup_config).tolist()
+    else:
+        clusters = list(range(len(records)))
+
+    splits = {split: [] for split in config['split_ratios']}
+    for record, cluster in zip(records, clusters):
+        splits[split_for_key(keys[cluster], config)].append(record)
+    return splits
+
+
+class SplitState:
+    """
+    Split of every example already built and of every near-duplicate cluster, plus the
+    next row number. Saved next to the shards; an incremental build skips known keys,
+    puts new cluster members in their cluster's split and hashes everything else.
+    """
+
+    def __init__(self, config: Dict = SPLIT_CONFIG):
+        self.config = {**SPLIT_CONFIG, **config}
+        self.splits = list(self.config['split_ratios'])
+        self.keys: Dict[int, int] = {}
+        self.cluster_splits: Dict[int, int] = {}
+        self.next_index = 1
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.keys
+
+    def assign(self, key: int, cluster: Optional[int] = None) -> str:
+        if cluster is not None and cluster in self.cluster_splits:
+            split = self.splits[self.cluster_splits[cluster]]
+        else:
+            split = split_for_key(key, self.config)
+            if cluster is not None:
+                self.cluster_splits[cluster] = self.splits.index(split)
+        self.keys[key] = self.splits.index(split)
+        return split
+
+    def counts(self) -> Dict[str, int]:
+        values = np.bincount(np.fromiter(self.keys.values(), dtype=np.int64, count=len(self.keys)),
+                             minlength=len(self.splits))
+        return {split: int(count) for split, count in zip(self.splits, values)}
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        keys = np.fromiter(self.keys.keys(), dtype=np.uint64, count=len(self.keys))
+        order = np.argsort(keys)
+        np.save(os.path.join(directory, 'keys.npy'), keys[order])
+        np.save(os.path.join(directory, 'splits.npy'),
+                np.fromiter(self.keys.values(), dtype=np.uint8, count=len(self.keys))[order])
+        clusters = np.full(max(self.cluster_splits, default=-1) + 1, -1, dtype=np.int8)
+        for cluster, split in self.cluster_splits.items():
+            clusters[cluster] = split
+        np.save(os.path.join(directory, 'cluster_splits.npy'), clusters)
+        with open(os.path.join(directory, 'state.json'), 'w', encoding='utf-8') as f:
+            json.dump({'config': self.config, 'next_index': self.next_index, 'counts': self.counts()}, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, config: Dict = SPLIT_CONFIG) -> "SplitState":
+        """Saved state, or a new one if there is none. A different salt or ratios is an error."""
+        state = cls(config)
+        path = os.path.join(directory, 'state.json')
+        if not os.path.exists(path):
+            return state
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved['config']['split_salt'] != state.config['split_salt'] or \
+                saved['config']['split_ratios'] != state.config['split_ratios']:
+            raise ValueError(f"Split settings differ from the saved build in {directory}; "
+                             f"rebuild from scratch to change them")
+
+        keys = np.load(os.path.join(directory, 'keys.npy'))
+        splits = np.load(os.path.join(directory, 'splits.npy'))
+        state.keys = dict(zip(keys.tolist(), splits.tolist()))
+        clusters = np.load(os.path.join(directory, 'cluster_splits.npy'))
+        state.cluster_splits = {cluster: int(split) for cluster, split in enumerate(clusters.tolist()) if split >= 0}
+        state.next_index = saved['next_index']
+        return state
@@ -0,0 +1,308 @@
+# =============================================================================
+# CONTINUAL TRAINING FROM LOGGED INTERACTIONS
+# Resume from the published checkpoint, train only on interactions newer than
+# the watermark plus a curated replay sample, publish only without regression
+# =============================================================================
+
+import os
+import csv
+import json
+import glob
+import random
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from training_data import HUGGING_FACE_MODEL_ID, SPLIT_FILES, clean_example, tokenize_split
+from train_t5 import TRAINING_CONFIG, OUTPUT_DIR, configure_threads, load_model_and_tokenizer, model_loss, train
+from evaluation import (
+    load_eval_split, evaluate_model, check_regression, has_repetition, check_factual_errors
+)
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(MODEL_DIR, 'continual_state.json')
+PUBLISH_DIR = os.path.join(MODEL_DIR, 'checkpoints')
+LOG_DIR = os.path.join(MODEL_DIR, '..', '..', 'outputs', 'ayikabot_logs')
+
+CONTINUAL_CONFIG = {
+    'base_model': HUGGING_FACE_MODEL_ID,   # experiment 4c checkpoint until a version is published
+    'replay_ratio': 1.0,                   # curated examples replayed per new example
+    'min_replay': 16,
+    'min_new_examples': 8,                 # skip the run until this many usable interactions exist
+    'min_confidence': 0.3,
+    'min_answer_words': 8,
+    'num_epochs': 3,
+    'learning_rate': 5e-5,
+    'warmup_steps': 5,
+    'eval_split': 'val',
+    'eval_preset': 'greedy_eval',
+    'rebuild_answer_store': True,          # precompute the new checkpoint's answer store after publishing
+    'seed': 42
+}
+
+
+def load_state(path: str = STATE_FILE) -> Dict:
+    """Watermark, current published version and run history"""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'watermark': None, 'current': None, 'versions': [], 'rejected': []}
+
+
+def save_state(state: Dict, path: str = STATE_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _normalize_interaction(entry: Dict) -> Dict:
+    """Map interaction rows and training-export entries onto one record shape"""
+    if 'input' in entry:
+        question = entry['input']
+        if question.startswith('question: '):
+            question = question[len('question: '):]
+        metadata = entry.get('metadata', {})
+        return {
+            'timestamp': _parse_timestamp(metadata.get('timestamp')),
+            'question': question,
+            'answer': entry.get('output', ''),
+            'confidence': float(metadata.get('confidence', 0.0)),
+            'response_type': 'climate_answer',
+            'is_climate_related': True
+        }
+
+    is_climate = entry.get('is_climate_related', False)
+    return {
+        'timestamp': _parse_timestamp(entry.get('timestamp')),
+        'question': entry.get('user_question', ''),
+        'answer': entry.get('bot_response', ''),
+        'confidence': float(entry.get('confidence_score', 0.0) or 0.0),
+        'response_type': entry.get('response_type', 'unknown'),
+        'is_climate_related': is_climate if isinstance(is_climate, bool) else str(is_climate) == 'True'
+    }
+
+
+def read_logged_interactions(paths: List[str]) -> List[Dict]:
+    """Read exported logs: interaction CSV/JSON-lines files or training-export JSON lists"""
+    interactions = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith('.csv'):
+                entries = list(csv.DictReader(f))
+            else:
+                text = f.read().strip()
+                if text.startswith('['):
+                    entries = json.loads(text)
+                else:
+                    entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+        interactions.extend(_normalize_interaction(entry) for entry in entries)
+    return interactions
+
+
+def fetch_firestore_interactions(db, since: Optional[datetime]) -> List[Dict]:
+    """Only interactions logged after `since` are read from the 'interactions' collection"""
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    query = db.collection('interactions')
+    if since is not None:
+        query = query.where(filter=FieldFilter('timestamp', '>', since))
+    return [_normalize_interaction(doc.to_dict()) for doc in query.stream()]
+
+
+def select_new_examples(interactions: List[Dict], watermark: Optional[datetime],
+                        config: Dict = CONTINUAL_CONFIG) -> Tuple[List[Tuple[str, str]], Optional[datetime], Dict]:
+    """
+    Usable (question, answer) pairs newer than the watermark. Degenerate answers
+    (repetition loops, factual-error patterns, too short) are dropped; repeated
+    questions keep their latest answer. Returns the pairs, the new watermark and counts.
+    """
+    newer = [item for item in interactions
+             if item['timestamp'] is not None and (watermark is None or item['timestamp'] > watermark)]
+    counts = {'newer': len(newer), 'not_climate_answer': 0, 'low_confidence': 0, 'low_quality': 0}
+
+    latest: Dict[str, Tuple[datetime, str, str]] = {}
+    for item in newer:
+        if item['response_type'] != 'climate_answer' or not item['is_climate_related']:
+            counts['not_climate_answer'] += 1
+            continue
+        if item['confidence'] < config['min_confidence']:
+            counts['low_confidence'] += 1
+            continue
+        answer = item['answer'].strip()
+        if (len(answer.split()) < config['min_answer_words'] or has_repetition(answer)
+                or check_factual_errors(answer)):
+            counts['low_quality'] += 1
+            continue
+        key = ' '.join(item['question'].lower().split())
+        if key not in latest or item['timestamp'] > latest[key][0]:
+            latest[key] = (item['timestamp'], item['question'], answer)
+
+    examples = [(question, answer) for _, question, answer in sorted(latest.values())]
+    counts['usable'] = len(examples)
+    new_watermark = max((item['timestamp'] for item in newer), default=watermark)
+    return examples, new_watermark, counts
+
+
+def replay_sample(num_new: int, config: Dict = CONTINUAL_CONFIG) -> List[Tuple[str, str]]:
+    """Seeded sample of the curated training split to limit forgetting"""
+    with open(SPLIT_FILES['train'], 'r', encoding='utf-8', newline='') as f:
+        curated = [(row['question'], row['answer']) for row in csv.DictReader(f)]
+    size = min(len(curated), max(config['min_replay'], int(round(num_new * config['replay_ratio']))))
+    return random.Random(config['seed'] + num_new).sample(curated, size)
+
+
+def publish_checkpoint(model, tokenizer, state: Dict, metadata: Dict) -> str:
+    """Save a new versioned checkpoint (vNNN) that AyikaBot can load directly"""
+    version = len(state['versions']) + 1
+    path = os.path.join(PUBLISH_DIR, f"v{version:03d}")
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+    metadata = dict(metadata, version=version, path=path, published=datetime.now().isoformat())
+    with open(os.path.join(path, 'version.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+
+def run_continual_training(interactions: List[Dict], config: Dict = CONTINUAL_CONFIG,
+                           state_file: str = STATE_FILE, dry_run: bool = False) -> Dict:
+    """One continual-training round; returns a summary of what happened"""
+    config = {**CONTINUAL_CONFIG, **config}
+    state = load_state(state_file)
+    watermark = _parse_timestamp(state['watermark']) if state['watermark'] else None
+
+    new_examples, new_watermark, counts = select_new_examples(interactions, watermark, config)
+    print(f"Interactions after watermark {state['watermark']}: {counts['newer']} "
+          f"({counts['usable']} usable, {counts['low_quality']} low quality, "
+          f"{counts['low_confidence']} low confidence, {counts['not_climate_answer']} not climate answers)")
+
+    if counts['usable'] < config['min_new_examples']:
+        print(f"Not enough new examples (need {config['min_new_examples']}), skipping this round")
+        return {'status': 'skipped', 'counts': counts}
+
+    replay = replay_sample(len(new_examples), config)
+    examples = [clean_example(question, answer) for question, answer in new_examples + replay]
+    print(f"Training set: {len(new_examples)} new + {len(replay)} replay examples")
+    if dry_run:
+        return {'status': 'dry_run', 'counts': counts, 'replay': len(replay)}
+
+    base = state['current']['path'] if state['current'] else config['base_model']
+    model, tokenizer = load_model_and_tokenizer(base)
+    eval_examples = load_eval_split(config['eval_split'])
+
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    train_data = tokenize_split(tokenizer, f"continual_{stamp}", tokenizer_name=base, examples=examples)
+    val_data = tokenize_split(tokenizer, config['eval_split'], tokenizer_name=base)
+
+    training_config = {key: config[key] for key in ('num_epochs', 'learning_rate', 'warmup_steps', 'seed')}
+    for key in ('batch_size', 'accumulation_steps', 'precision'):
+        training_config[key] = config.get(key, TRAINING_CONFIG[key])
+
+    baseline = dict((state['current'] or {}).get('evaluation') or {})
+    if not baseline or baseline.get('preset') != config['eval_preset']:
+        print(f"\nBaseline evaluation ({base}):")
+        baseline = evaluate_model(model, tokenizer, eval_examples, config['eval_preset'])
+        baseline.pop('samples', None)
+    if 'val_loss' not in baseline:
+        # Same token-weighted loss on the same split as the candidate's last epoch, so the gate always applies
+        baseline['val_loss'] = model_loss(model, val_data, training_config, tokenizer.pad_token_id)
+        print(f"   Baseline val_loss: {baseline['val_loss']:.4f}")
+    results = train(model, train_data, val_data, training_config, os.path.join(OUTPUT_DIR, f"continual_{stamp}"),
+                    resume=False, pad_token_id=tokenizer.pad_token_id)
+
+    print("\nCandidate evaluation:")
+    candidate = evaluate_model(model, tokenizer, eval_examples, config['eval_preset'])
+    candidate.pop('samples', None)
+    if results['history']:
+        candidate['val_loss'] = results['history'][-1]['val_loss']
+
+    passed, reasons = check_regression(candidate, baseline)
+    run = {
+        'timestamp': stamp,
+        'parent': base,
+        'new_examples': len(new_examples),
+        'replay_examples': len(replay),
+        'watermark': new_watermark.isoformat() if new_watermark else None,
+        'evaluation': candidate,
+        'baseline': baseline
+    }
+
+    if not passed:
+        # Watermark stays put so these interactions are retried with the next batch
+        run['regressions'] = reasons
+        state['rejected'].append(run)
+        save_state(state, state_file)
+        print(f"\nNOT PUBLISHED - regression: {'; '.join(reasons)}")
+        return {'status': 'rejected', 'reasons': reasons, 'counts': counts}
+
+    path = publish_checkpoint(model, tokenizer, state, run)
+    state['versions'].append(dict(run, path=path))
+    state['current'] = {'path': path, 'evaluation': candidate}
+    state['watermark'] = run['watermark']
+    save_state(state, state_file)
+
+    print(f"\nPUBLISHED {path}")
+    print(f"   BLEU: {baseline['bleu']:.4f} -> {candidate['bleu']:.4f}")
+    print(f"   Factual error rate: {baseline['factual_error_rate']:.1%} -> {candidate['factual_error_rate']:.1%}")
+    summary = {'status': 'published', 'path': path, 'counts': counts}
+    if config['rebuild_answer_store']:
+        summary['answer_store'] = rebuild_answer_store(path)
+    return summary
+
+
+def rebuild_answer_store(path: str) -> Dict:
+    """
+    Precompute the answer store of a newly published checkpoint, so serving replicas
+    (which never rebuild it themselves) find a store matching it. A failure leaves
+    the checkpoint published without a store.
+    """
+    from precompute_answers import run_precompute   # imports this module
+
+    print(f"\nRebuilding the answer store for {path}...")
+    try:
+        manifest = run_precompute(path)
+    except Exception as e:
+        print(f"   Answer store not rebuilt: {e} (run data/model/precompute_answers.py --model-path {path})")
+        return {'status': 'failed', 'error': str(e)}
+    return {'status': 'rebuilt', 'entries': manifest['entries'], 'failed': manifest['failed']}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental fine-tuning from newly logged interactions")
+    parser.add_argument('--logs', nargs='*', default=None,
+                        help="Exported interaction files (default: outputs/ayikabot_logs/interactions_*)")
+    parser.add_argument('--firestore', action='store_true', help="Read new interactions directly from Firestore")
+    parser.add_argument('--service-account', default="ayikabot-v1-firebase-adminsdk-fbsvc-ad7ae9cf65.json")
+    parser.add_argument('--epochs', type=int, default=CONTINUAL_CONFIG['num_epochs'])
+    parser.add_argument('--replay-ratio', type=float, default=CONTINUAL_CONFIG['replay_ratio'])
+    parser.add_argument('--intra-op-threads', type=int, default=0)
+    parser.add_argument('--dry-run', action='store_true', help="Only report what would be trained on")
+    parser.add_argument('--skip-answer-store', action='store_true',
+                        help="Do not precompute the answer store of a published checkpoint")
+    args = parser.parse_args()
+
+    configure_threads(args.intra_op_threads)
+
+    if args.firestore:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(args.service_account))
+        current_state = load_state()
+        since = _parse_timestamp(current_state['watermark']) if current_state['watermark'] else None
+        logged = fetch_firestore_interactions(firestore.client(), since)
+    else:
+        log_paths = args.logs or sorted(glob.glob(os.path.join(LOG_DIR, 'interactions_*.json')))
+        logged = read_logged_interactions(log_paths)
+
+    run_continual_training(logged, {'num_epochs': args.epochs, 'replay_ratio': args.replay_ratio,
+                                    'rebuild_answer_store': not args.skip_answer_store}, dry_run=args.dry_run)
@@ -0,0 +1,349 @@
+# =============================================================================
+# KNOWLEDGE DISTILLATION INTO A SMALLER STUDENT
+# Exp4c teacher -> top-k soft targets -> shallower/narrower T5 student that
+# loads in AyikaBot like any other checkpoint
+# =============================================================================
+
+import os
+import glob
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from training_data import (
+    HUGGING_FACE_MODEL_ID, CACHE_DIR, LABEL_PAD_ID, DATA_CONFIG, read_examples, SPLIT_FILES, _cache_key
+)
+from train_t5 import configure_threads, create_optimizer, peak_memory_mb
+from evaluation import load_eval_split, evaluate_model, generate_batch
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(MODEL_DIR, '..', '..', 'outputs', 'ayikabot_logs')
+
+# Student shapes; layers are initialized from evenly spaced teacher layers, widths by slicing
+STUDENT_CONFIGS = {
+    'half_depth': {'num_layers': 3, 'num_decoder_layers': 3},
+    'narrow': {'num_layers': 4, 'num_decoder_layers': 4, 'd_model': 384, 'd_ff': 1536, 'num_heads': 6},
+    'tiny': {'num_layers': 2, 'num_decoder_layers': 2, 'd_model': 256, 'd_ff': 1024, 'num_heads': 4}
+}
+
+DISTILLATION_CONFIG = {
+    'student': 'half_depth',
+    'top_k': 16,                 # soft-target support kept per position
+    'temperature': 2.0,
+    'alpha': 0.7,                # weight of the soft-target loss vs hard-label cross-entropy
+    'batch_size': 8,
+    'num_epochs': 30,
+    'learning_rate': 5e-4,
+    'warmup_steps': 20,
+    'weight_decay': 0.01,
+    'teacher_preset': 'greedy_eval',
+    'seed': 42
+}
+
+
+# =============================================================================
+# SOFT TARGETS FROM THE TEACHER
+# =============================================================================
+
+def collect_distillation_questions(log_paths: Optional[List[str]] = None) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Curated (question, answer) pairs from the train split plus logged climate questions without answers"""
+    from continual_training import read_logged_interactions
+
+    curated = [(question[len('question: '):], answer) for question, answer in read_examples(SPLIT_FILES['train'])]
+    known = {question.lower().strip() for question, _ in curated}
+
+    log_paths = log_paths if log_paths is not None else sorted(glob.glob(os.path.join(LOG_DIR, 'interactions_*.json')))
+    logged = []
+    for item in read_logged_interactions(log_paths):
+        key = item['question'].lower().strip()
+        if item['response_type'] == 'climate_answer' and item['is_climate_related'] and key not in known:
+            known.add(key)
+            logged.append(item['question'])
+    return curated, logged
+
+
+def build_soft_targets(teacher, tokenizer, curated: List[Tuple[str, str]], logged_questions: List[str],
+                       config: Dict = DISTILLATION_CONFIG, teacher_name: str = HUGGING_FACE_MODEL_ID,
+                       cache_dir: str = CACHE_DIR) -> str:
+    """
+    Teacher-forced top-k logits for every target token. Curated questions use the
+    gold answer as target; logged questions use the teacher's own greedy answer.
+    Saved as flat arrays + offsets: inputs, labels, top-k ids and top-k logits.
+    """
+    import tensorflow as tf
+
+    key = _cache_key(curated + [(question, '') for question in logged_questions], teacher_name, DATA_CONFIG)
+    directory = os.path.join(cache_dir, f"distill_top{config['top_k']}_{key}")
+    if os.path.exists(os.path.join(directory, 'manifest.json')):
+        return directory
+    os.makedirs(directory, exist_ok=True)
+
+    targets = [answer for _, answer in curated]
+    if logged_questions:
+        print(f"Teacher answering {len(logged_questions)} logged questions...")
+        for offset in range(0, len(logged_questions), config['batch_size']):
+            batch = logged_questions[offset:offset + config['batch_size']]
+            targets.extend(generate_batch(teacher, tokenizer, batch, config['teacher_preset']))
+    questions = [question for question, _ in curated] + logged_questions
+
+    inputs_all, labels_all, ids_all, logits_all = [], [], [], []
+    for offset in range(0, len(questions), config['batch_size']):
+        sources = [f"question: {question.strip()}" for question in questions[offset:offset + config['batch_size']]]
+        batch_targets = targets[offset:offset + config['batch_size']]
+        encoded = tokenizer(sources, max_length=DATA_CONFIG['max_input_length'], truncation=True,
+                            padding=True, return_tensors='tf')
+        labels = tokenizer(text_target=batch_targets, max_length=DATA_CONFIG['max_target_length'],
+                           truncation=True, padding=True, return_tensors='tf')['input_ids']
+
+        logits = teacher(input_ids=encoded.input_ids, attention_mask=encoded.attention_mask,
+                         labels=labels, training=False).logits
+        top_logits, top_ids = tf.math.top_k(logits, k=config['top_k'])
+
+        for row in range(len(sources)):
+            input_length = int(tf.reduce_sum(encoded.attention_mask[row]))
+            label_length = int(tf.reduce_sum(tf.cast(labels[row] != tokenizer.pad_token_id, tf.int32)))
+            inputs_all.append(encoded.input_ids[row, :input_length].numpy())
+            labels_all.append(labels[row, :label_length].numpy())
+            ids_all.append(top_ids[row, :label_length].numpy())
+            logits_all.append(top_logits[row, :label_length].numpy().astype(np.float16))
+
+    for name, arrays in (('inputs', inputs_all), ('labels', labels_all), ('topk_ids', ids_all),
+                         ('topk_logits', logits_all)):
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(array) for array in arrays])
+        np.save(os.path.join(directory, f"{name}.npy"), np.concatenate(arrays))
+        np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'examples': len(questions), 'curated': len(curated), 'logged': len(logged_questions),
+                   'top_k': config['top_k']}, f, indent=2)
+    print(f"Soft targets for {len(questions)} examples -> {directory}")
+    return directory
+
+
+def load_soft_targets(directory: str) -> Dict[str, List[np.ndarray]]:
+    data = {}
+    for name in ('inputs', 'labels', 'topk_ids', 'topk_logits'):
+        flat = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+        offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"))
+        data[name] = [np.asarray(flat[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+    return data
+
+
+def _pad(arrays: List[np.ndarray], value) -> np.ndarray:
+    length = max(len(array) for array in arrays)
+    padded = np.full((len(arrays), length) + arrays[0].shape[1:], value, dtype=arrays[0].dtype)
+    for row, array in enumerate(arrays):
+        padded[row, :len(array)] = array
+    return padded
+
+
+def distillation_batches(data: Dict, batch_size: int, rng: np.random.Generator, pad_token_id: int = 0):
+    """Length-sorted chunks in shuffled order, padded per batch"""
+    order = np.argsort([len(labels) for labels in data['labels']], kind='stable')
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    rng.shuffle(batches)
+    for indices in batches:
+        inputs = _pad([data['inputs'][i] for i in indices], pad_token_id)
+        yield {
+            'input_ids': inputs.astype(np.int32),
+            'attention_mask': (inputs != pad_token_id).astype(np.int32),
+            'labels': _pad([data['labels'][i].astype(np.int32) for i in indices], LABEL_PAD_ID),
+            'topk_ids': _pad([data['topk_ids'][i].astype(np.int32) for i in indices], 0),
+            'topk_logits': _pad([data['topk_logits'][i].astype(np.float32) for i in indices], 0.0)
+        }
+
+
+# =============================================================================
+# STUDENT CONSTRUCTION
+# =============================================================================
+
+def teacher_layer_map(teacher_layers: int, student_layers: int) -> List[int]:
+    """Evenly spaced teacher layers, always keeping the first (it owns the relative bias) and the last"""
+    return [int(index) for index in np.linspace(0, teacher_layers - 1, student_layers).round()]
+
+
+def _slice_to(array: np.ndarray, shape: Tuple[int, ...]) -> np.ndarray:
+    return array[tuple(slice(0, size) for size in shape)]
+
+
+def build_student(teacher, student: str = 'half_depth'):
+    """Student T5 with copied (and, for narrower widths, sliced) teacher weights, plus the layer map"""
+    import tensorflow as tf
+    from transformers import T5Config, TFT5ForConditionalGeneration
+
+    overrides = STUDENT_CONFIGS[student]
+    config = T5Config.from_dict({**teacher.config.to_dict(), **overrides})
+    config.d_kv = teacher.config.d_kv
+    model = TFT5ForConditionalGeneration(config)
+    dummy = tf.constant([[0, 1]], dtype=tf.int32)
+    model(input_ids=dummy, decoder_input_ids=dummy, training=False)
+
+    model.shared.set_weights([_slice_to(weight, student_weight.shape) for weight, student_weight
+                              in zip(teacher.shared.get_weights(), model.shared.get_weights())])
+
+    layer_maps = {}
+    for stack_name, layer_key in (('encoder', 'num_layers'), ('decoder', 'num_decoder_layers')):
+        teacher_stack, student_stack = getattr(teacher, stack_name), getattr(model, stack_name)
+        mapping = teacher_layer_map(getattr(teacher.config, layer_key), getattr(config, layer_key))
+        layer_maps[stack_name] = mapping
+        for student_index, teacher_index in enumerate(mapping):
+            teacher_weights = teacher_stack.block[teacher_index].get_weights()
+            student_block = student_stack.block[student_index]
+            student_block.set_weights([_slice_to(weight, target.shape) for weight, target
+                                       in zip(teacher_weights, student_block.get_weights())])
+        student_stack.final_layer_norm.set_weights(
+            [_slice_to(weight, target.shape) for weight, target
+             in zip(teacher_stack.final_layer_norm.get_weights(), student_stack.final_layer_norm.get_weights())]
+        )
+
+    if not config.tie_word_embeddings:
+        model.lm_head.set_weights([_slice_to(weight, target.shape) for weight, target
+                                   in zip(teacher.lm_head.get_weights(), model.lm_head.get_weights())])
+
+    return model, layer_maps
+
+
+# =============================================================================
+# TRAINING
+# =============================================================================
+
+def distillation_loss(labels, student_logits, topk_ids, topk_logits, temperature: float, alpha: float):
+    """alpha x T^2 x soft cross-entropy on the teacher's top-k + (1 - alpha) x hard-label CE"""
+    import tensorflow as tf
+
+    mask = tf.cast(tf.not_equal(labels, LABEL_PAD_ID), tf.float32)
+    tokens = tf.maximum(tf.reduce_sum(mask), 1.0)
+    student_logits = tf.cast(student_logits, tf.float32)
+
+    teacher_probs = tf.nn.softmax(topk_logits / temperature, axis=-1)
+    student_log_probs = tf.nn.log_softmax(student_logits / temperature, axis=-1)
+    student_topk = tf.gather(student_log_probs, topk_ids, batch_dims=2)
+    soft = -tf.reduce_sum(teacher_probs * student_topk, axis=-1) * temperature ** 2
+
+    safe_labels = tf.where(labels == LABEL_PAD_ID, tf.zeros_like(labels), labels)
+    hard = tf.keras.losses.sparse_categorical_crossentropy(safe_labels, student_logits, from_logits=True)
+
+    return (alpha * tf.reduce_sum(soft * mask) + (1.0 - alpha) * tf.reduce_sum(hard * mask)) / tokens
+
+
+def train_student(student, data: Dict, config: Dict = DISTILLATION_CONFIG, pad_token_id: int = 0) -> Dict:
+    import tensorflow as tf
+
+    batches_per_epoch = int(np.ceil(len(data['labels']) / config['batch_size']))
+    optimizer = create_optimizer(config, batches_per_epoch * config['num_epochs'])
+    signature = {
+        'input_ids': tf.TensorSpec([None, None], tf.int32),
+        'attention_mask': tf.TensorSpec([None, None], tf.int32),
+        'labels': tf.TensorSpec([None, None], tf.int32),
+        'topk_ids': tf.TensorSpec([None, None, config['top_k']], tf.int32),
+        'topk_logits': tf.TensorSpec([None, None, config['top_k']], tf.float32)
+    }
+
+    @tf.function(input_signature=[signature])
+    def train_step(batch):
+        with tf.GradientTape() as tape:
+            logits = student(input_ids=batch['input_ids'], attention_mask=batch['attention_mask'],
+                             labels=batch['labels'], training=True).logits
+            loss = distillation_loss(batch['labels'], logits, batch['topk_ids'], batch['topk_logits'],
+                                     config['temperature'], config['alpha'])
+        gradients = tape.gradient(loss, student.trainable_variables)
+        optimizer.apply_gradients(zip(gradients, student.trainable_variables))
+        return loss
+
+    rng = np.random.default_rng(config['seed'])
+    history = []
+    start = time.time()
+    for epoch in range(config['num_epochs']):
+        losses = [float(train_step(batch)) for batch in distillation_batches(data, config['batch_size'], rng,
+                                                                             pad_token_id)]
+        history.append({'epoch': epoch + 1, 'loss': float(np.mean(losses))})
+        if (epoch + 1) % 5 == 0 or epoch == 0:
+            print(f"   Epoch {epoch + 1:2d}: distillation_loss={history[-1]['loss']:.4f}")
+
+    return {'history': history, 'train_seconds': time.time() - start}
+
+
+# =============================================================================
+# TEACHER VS STUDENT REPORT
+# =============================================================================
+
+def weights_mb(model) -> float:
+    return sum(int(np.prod(variable.shape)) * variable.dtype.size for variable in model.weights) / (1024 ** 2)
+
+
+def compare_models(teacher, student, tokenizer, split: str = 'test', preset: str = 'optimal') -> Dict:
+    """BLEU, factual-error rate, single-question latency, parameters and memory for both models"""
+    examples = load_eval_split(split)
+    report = {}
+    for name, model in (('teacher', teacher), ('student', student)):
+        print(f"\n{name.upper()}:")
+        # batch_size=1 so generation time is per-request latency
+        evaluation = evaluate_model(model, tokenizer, examples, preset, batch_size=1)
+        report[name] = {
+            'parameters': int(model.num_parameters()),
+            'weights_mb': weights_mb(model),
+            'bleu': evaluation['bleu'],
+            'factual_error_rate': evaluation['factual_error_rate'],
+            'repetition_rate': evaluation['repetition_rate'],
+            'latency_s': evaluation['avg_generation_time']
+        }
+    report['process_peak_memory_mb'] = peak_memory_mb()
+
+    teacher_stats, student_stats = report['teacher'], report['student']
+    print(f"\nDISTILLATION REPORT ({split} split, '{preset}' preset):")
+    print(f"{'':<20} {'Teacher':>12} {'Student':>12}")
+    print(f"{'Parameters':<20} {teacher_stats['parameters']:>12,} {student_stats['parameters']:>12,}")
+    print(f"{'Weights (MB)':<20} {teacher_stats['weights_mb']:>12.1f} {student_stats['weights_mb']:>12.1f}")
+    print(f"{'BLEU':<20} {teacher_stats['bleu']:>12.4f} {student_stats['bleu']:>12.4f}")
+    print(f"{'Factual error rate':<20} {teacher_stats['factual_error_rate']:>12.1%} "
+          f"{student_stats['factual_error_rate']:>12.1%}")
+    print(f"{'Latency (s)':<20} {teacher_stats['latency_s']:>12.2f} {student_stats['latency_s']:>12.2f}")
+    print(f"   Speed-up: {teacher_stats['latency_s'] / max(student_stats['latency_s'], 1e-9):.2f}x")
+    return report
+
+
+def run_distillation(config: Dict = DISTILLATION_CONFIG, teacher_name: str = HUGGING_FACE_MODEL_ID,
+                     output_dir: Optional[str] = None) -> Dict:
+    from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+
+    config = {**DISTILLATION_CONFIG, **config}
+    output_dir = output_dir or os.path.join(MODEL_DIR, 'runs', f"student_{config['student']}")
+
+    tokenizer = T5Tokenizer.from_pretrained(teacher_name)
+    teacher = TFT5ForConditionalGeneration.from_pretrained(teacher_name)
+
+    curated, logged = collect_distillation_questions()
+    data = load_soft_targets(build_soft_targets(teacher, tokenizer, curated, logged, config, teacher_name))
+
+    student, layer_map = build_student(teacher, config['student'])
+    print(f"Student '{config['student']}': {student.num_parameters():,} parameters "
+          f"(teacher {teacher.num_parameters():,}), layer map {layer_map}")
+
+    results = train_student(student, data, config, tokenizer.pad_token_id)
+
+    # Saved like any fine-tuned checkpoint, so AyikaBot(model_path=output_dir) loads it unchanged
+    student.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+
+    report = compare_models(teacher, student, tokenizer)
+    with open(os.path.join(output_dir, 'distillation.json'), 'w', encoding='utf-8') as f:
+        json.dump({'teacher': teacher_name, 'config': config, 'layer_map': layer_map,
+                   'training': results, 'report': report}, f, indent=2)
+    print(f"\nStudent saved to: {output_dir}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill the exp4c model into a smaller student")
+    parser.add_argument('--teacher', default=HUGGING_FACE_MODEL_ID)
+    parser.add_argument('--student', choices=list(STUDENT_CONFIGS), default=DISTILLATION_CONFIG['student'])
+    parser.add_argument('--epochs', type=int, default=DISTILLATION_CONFIG['num_epochs'])
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--intra-op-threads', type=int, default=0)
+    args = parser.parse_args()
+
+    configure_threads(args.intra_op_threads)
+    run_distillation({'student': args.student, 'num_epochs': args.epochs}, args.teacher, args.output_dir)
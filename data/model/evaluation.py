@@ -0,0 +1,193 @@
+# =============================================================================
+# EVALUATION HARNESS
+# BLEU (notebook protocol), factual-error rate, repetition rate and latency
+# for any checkpoint, plus the no-regression gate used before publishing
+# =============================================================================
+
+import os
+import sys
+import csv
+import math
+import time
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'climate_chatbot_BEST_exp4c'))
+from candidate_reranking import check_factual_errors
+from generation_presets import get_preset
+from training_data import SPLIT_FILES, HUGGING_FACE_MODEL_ID
+
+_PUNCTUATION_TABLE = str.maketrans('', '', '!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')
+
+# Largest acceptable change per metric before a candidate counts as a regression
+REGRESSION_TOLERANCE = {
+    'bleu': 0.005,               # absolute drop
+    'factual_error_rate': 0.0,   # absolute increase
+    'repetition_rate': 0.05,     # absolute increase
+    'val_loss': 0.02             # absolute increase
+}
+
+HIGHER_IS_BETTER = {'bleu'}
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase, strip punctuation, split on whitespace (as in the notebook's BLEU cells)"""
+    return text.lower().strip().translate(_PUNCTUATION_TABLE).split()
+
+
+def _ngram_counts(tokens: Sequence[str], n: int) -> Counter:
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def sentence_bleu(references: List[List[str]], hypothesis: List[str],
+                  weights: Tuple[float, ...] = (0.25, 0.25, 0.25, 0.25), k: int = 5) -> float:
+    """
+    Sentence BLEU with NLTK's smoothing method4 (the notebook's SmoothingFunction().method4):
+    zero-match precisions get 1 / (2^i * k / ln(hyp_len)) instead of zero.
+    """
+    hyp_len = len(hypothesis)
+    if hyp_len == 0:
+        return 0.0
+
+    numerators, denominators = [], []
+    for n in range(1, len(weights) + 1):
+        hyp_counts = _ngram_counts(hypothesis, n)
+        max_ref_counts: Counter = Counter()
+        for reference in references:
+            for gram, count in _ngram_counts(reference, n).items():
+                max_ref_counts[gram] = max(max_ref_counts[gram], count)
+        numerators.append(sum(min(count, max_ref_counts[gram]) for gram, count in hyp_counts.items()))
+        denominators.append(max(1, sum(hyp_counts.values())))
+
+    if numerators[0] == 0:
+        return 0.0
+
+    precisions = []
+    smoothing_index = 1
+    for numerator, denominator in zip(numerators, denominators):
+        if numerator == 0 and hyp_len > 1:
+            precisions.append((1.0 / (2 ** smoothing_index * k / math.log(hyp_len))) / denominator)
+            smoothing_index += 1
+        else:
+            precisions.append(numerator / denominator)
+
+    if min(precisions) <= 0:
+        return 0.0
+
+    ref_lens = [len(reference) for reference in references]
+    closest_ref_len = min(ref_lens, key=lambda ref_len: (abs(ref_len - hyp_len), ref_len))
+    brevity_penalty = 1.0 if hyp_len > closest_ref_len else math.exp(1 - closest_ref_len / hyp_len)
+
+    return brevity_penalty * math.exp(sum(w * math.log(p) for w, p in zip(weights, precisions)))
+
+
+def answer_bleu(expected: str, generated: str) -> float:
+    """4-gram BLEU for answers of 4+ words, 2-gram for 3 words, 0 otherwise (notebook protocol)"""
+    expected_tokens = normalize_tokens(expected)
+    generated_tokens = normalize_tokens(generated)
+
+    if len(generated_tokens) >= 4 and len(expected_tokens) >= 4:
+        return sentence_bleu([expected_tokens], generated_tokens)
+    if len(generated_tokens) >= 3 and len(expected_tokens) >= 3:
+        return sentence_bleu([expected_tokens], generated_tokens, weights=(0.5, 0.5))
+    return 0.0
+
+
+def has_repetition(answer: str) -> bool:
+    """True if a word trigram repeats or a bigram appears three or more times"""
+    tokens = normalize_tokens(answer)
+    return (any(count > 1 for count in _ngram_counts(tokens, 3).values())
+            or any(count > 2 for count in _ngram_counts(tokens, 2).values()))
+
+
+def load_eval_split(split: str = 'val', path: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(question, expected_answer) pairs, uncleaned, as the notebook evaluated them"""
+    with open(path or SPLIT_FILES[split], 'r', encoding='utf-8', newline='') as f:
+        return [(row['question'], row['answer']) for row in csv.DictReader(f)]
+
+
+def generate_batch(model, tokenizer, questions: List[str], preset: str = "greedy_eval",
+                   max_input_length: int = 110, **overrides) -> List[str]:
+    """Padded batch generation with a named preset"""
+    params = get_preset(preset, **overrides)
+    inputs = tokenizer([f"question: {question.strip()}" for question in questions], return_tensors="tf",
+                       max_length=max_input_length, truncation=True, padding=True)
+    output_ids = model.generate(
+        inputs.input_ids,
+        attention_mask=inputs.attention_mask,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        **params
+    )
+    return [tokenizer.decode(ids, skip_special_tokens=True) for ids in output_ids]
+
+
+def evaluate_model(model, tokenizer, examples: List[Tuple[str, str]], preset: str = "greedy_eval",
+                   batch_size: int = 8, verbose: bool = True, **overrides) -> Dict:
+    """Generate answers for `examples` and score BLEU, factual errors, repetition and latency"""
+    bleu_scores, error_flags, repetition_flags, word_counts = [], [], [], []
+    samples = []
+    start = time.time()
+
+    for offset in range(0, len(examples), batch_size):
+        batch = examples[offset:offset + batch_size]
+        answers = generate_batch(model, tokenizer, [question for question, _ in batch], preset, **overrides)
+
+        for (question, expected), answer in zip(batch, answers):
+            bleu_scores.append(answer_bleu(expected, answer))
+            error_flags.append(bool(check_factual_errors(answer)))
+            repetition_flags.append(has_repetition(answer))
+            word_counts.append(len(answer.split()))
+            samples.append({'question': question, 'expected': expected, 'generated': answer})
+
+    elapsed = time.time() - start
+    report = {
+        'examples': len(examples),
+        'bleu': float(np.mean(bleu_scores)) if bleu_scores else 0.0,
+        'factual_error_rate': float(np.mean(error_flags)) if error_flags else 0.0,
+        'repetition_rate': float(np.mean(repetition_flags)) if repetition_flags else 0.0,
+        'avg_words': float(np.mean(word_counts)) if word_counts else 0.0,
+        'avg_generation_time': elapsed / max(len(examples), 1),
+        'preset': preset,
+        'samples': samples
+    }
+
+    if verbose:
+        print(f"Evaluation over {report['examples']} examples ({preset}):")
+        print(f"   BLEU: {report['bleu']:.4f}")
+        print(f"   Factual error rate: {report['factual_error_rate']:.1%}")
+        print(f"   Repetition rate: {report['repetition_rate']:.1%}")
+        print(f"   Avg generation time: {report['avg_generation_time']:.2f}s")
+    return report
+
+
+def check_regression(candidate: Dict, baseline: Dict,
+                     tolerance: Dict = REGRESSION_TOLERANCE) -> Tuple[bool, List[str]]:
+    """Compare two evaluation reports; returns (passed, reasons for any regression)"""
+    reasons = []
+    for metric, allowed in tolerance.items():
+        if metric not in candidate or metric not in baseline:
+            continue
+        change = candidate[metric] - baseline[metric]
+        if metric in HIGHER_IS_BETTER:
+            change = -change
+        if change > allowed:
+            reasons.append(f"{metric}: {baseline[metric]:.4f} -> {candidate[metric]:.4f}")
+    return not reasons, reasons
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a checkpoint on a climate QA split")
+    parser.add_argument('--model', default=HUGGING_FACE_MODEL_ID)
+    parser.add_argument('--split', default='test', choices=list(SPLIT_FILES))
+    parser.add_argument('--preset', default='greedy_eval')
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+    eval_tokenizer = T5Tokenizer.from_pretrained(args.model)
+    eval_model = TFT5ForConditionalGeneration.from_pretrained(args.model)
+    evaluate_model(eval_model, eval_tokenizer, load_eval_split(args.split), args.preset, args.batch_size)
@@ -0,0 +1,172 @@
+# =============================================================================
+# HALF-PRECISION WEIGHT STORAGE
+# Convert a float32 NumPy export to float16/bfloat16, measure resident memory
+# per worker and check answer parity against float32 on the test split
+# =============================================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'climate_chatbot_BEST_exp4c'))
+from numpy_t5 import NumpyT5, STORAGE_DTYPES, load_weights, to_float32
+
+from numpy_export import DEFAULT_EXPORT_DIR, write_tensors
+from training_data import HUGGING_FACE_MODEL_ID
+from evaluation import load_eval_split, answer_bleu
+
+
+def convert_export(source_dir: str = DEFAULT_EXPORT_DIR, dtype: str = 'float16',
+                   output_dir: Optional[str] = None) -> Dict:
+    """Re-store an existing export in `dtype` (no TensorFlow needed)"""
+    output_dir = output_dir or f"{source_dir.rstrip(os.sep)}_{dtype}"
+    weights, manifest = load_weights(source_dir)
+    tensors = {name: to_float32(value, manifest['tensors'][name]['dtype']) for name, value in weights.items()}
+    return write_tensors(tensors, manifest['config'], output_dir, dtype, manifest.get('source_model', ''))
+
+
+def resident_memory_mb() -> Dict[str, float]:
+    """Current (VmRSS) and peak (VmHWM) resident set size of this process, Linux only"""
+    values = {}
+    with open('/proc/self/status', 'r', encoding='utf-8') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM'):
+                values[key] = int(value.split()[0]) / 1024.0
+    return {'rss_mb': values.get('VmRSS', 0.0), 'peak_rss_mb': values.get('VmHWM', 0.0)}
+
+
+def _memory_worker(weights_dir: str, tokenizer_name: str, questions: List[str], cache_decoder_weights: bool,
+                   results):
+    from transformers import T5Tokenizer
+
+    tokenizer = T5Tokenizer.from_pretrained(tokenizer_name)
+    before = resident_memory_mb()
+    engine = NumpyT5.from_pretrained(weights_dir, cache_decoder_weights=cache_decoder_weights)
+    start = time.time()
+    tokens = 0
+    for question in questions:
+        inputs = tokenizer(f"question: {question.strip()}", return_tensors="np", max_length=110, truncation=True)
+        tokens += engine.generate(inputs.input_ids, inputs.attention_mask, max_length=100).shape[1] - 1
+    elapsed = time.time() - start
+    after = resident_memory_mb()
+    results.put({
+        'weights_rss_mb': after['rss_mb'] - before['rss_mb'],
+        'peak_rss_mb': after['peak_rss_mb'] - before['rss_mb'],
+        'generation_s': elapsed / max(len(questions), 1),
+        'decode_ms_per_token': 1000.0 * elapsed / max(tokens, 1)
+    })
+
+
+def measure_memory(weights_dir: str, tokenizer_name: str, questions: List[str],
+                   cache_decoder_weights: bool = True) -> Dict:
+    """
+    Resident memory added by loading the engine and answering `questions`, and the decode
+    latency behind it, measured in a fresh process so earlier loads (and their page cache
+    mappings) do not count.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_memory_worker,
+                              args=(weights_dir, tokenizer_name, questions, cache_decoder_weights, results))
+    process.start()
+    measurement = results.get()
+    process.join()
+    return measurement
+
+
+def output_parity(reference: NumpyT5, candidate: NumpyT5, tokenizer, examples: List, max_length: int = 100) -> Dict:
+    """Greedy answers of a half-precision engine versus the float32 one on (question, answer) pairs"""
+    mismatches = []
+    max_difference = 0.0
+    reference_bleu, candidate_bleu = [], []
+    for question, expected in examples:
+        inputs = tokenizer(f"question: {question.strip()}", return_tensors="np", max_length=110, truncation=True)
+        reference_ids = reference.generate(inputs.input_ids, inputs.attention_mask, max_length=max_length)
+        candidate_ids = candidate.generate(inputs.input_ids, inputs.attention_mask, max_length=max_length)
+
+        decoder_input_ids = reference_ids[:, :-1]
+        difference = np.abs(reference.logits(inputs.input_ids, inputs.attention_mask, decoder_input_ids)
+                            - candidate.logits(inputs.input_ids, inputs.attention_mask, decoder_input_ids))
+        max_difference = max(max_difference, float(difference.max()))
+
+        reference_answer = tokenizer.decode(reference_ids[0], skip_special_tokens=True)
+        candidate_answer = tokenizer.decode(candidate_ids[0], skip_special_tokens=True)
+        reference_bleu.append(answer_bleu(expected, reference_answer))
+        candidate_bleu.append(answer_bleu(expected, candidate_answer))
+        if reference_ids.tolist() != candidate_ids.tolist():
+            mismatches.append({'question': question, 'float32': reference_answer, 'half': candidate_answer})
+
+    return {
+        'questions': len(examples),
+        'identical_greedy': len(examples) - len(mismatches),
+        'max_abs_logit_difference': max_difference,
+        'bleu_float32': float(np.mean(reference_bleu)) if reference_bleu else 0.0,
+        'bleu_half': float(np.mean(candidate_bleu)) if candidate_bleu else 0.0,
+        'mismatches': mismatches
+    }
+
+
+def run_half_precision(source_dir: str = DEFAULT_EXPORT_DIR, dtype: str = 'float16',
+                       output_dir: Optional[str] = None, tokenizer_name: str = HUGGING_FACE_MODEL_ID,
+                       split: str = 'test', limit: Optional[int] = None, memory_questions: int = 5) -> Dict:
+    from transformers import T5Tokenizer
+
+    manifest = convert_export(source_dir, dtype, output_dir)
+    output_dir = output_dir or f"{source_dir.rstrip(os.sep)}_{dtype}"
+    examples = load_eval_split(split)[:limit]
+    questions = [question for question, _ in examples[:memory_questions]]
+
+    print("Measuring resident memory and decode latency (one fresh process per setting)...")
+    memory = {'float32': measure_memory(source_dir, tokenizer_name, questions),
+              dtype: measure_memory(output_dir, tokenizer_name, questions),
+              f"{dtype}_per_step_upcast": measure_memory(output_dir, tokenizer_name, questions,
+                                                         cache_decoder_weights=False)}
+
+    tokenizer = T5Tokenizer.from_pretrained(tokenizer_name)
+    parity = output_parity(NumpyT5.from_pretrained(source_dir), NumpyT5.from_pretrained(output_dir),
+                           tokenizer, examples)
+    _, source_manifest = load_weights(source_dir)
+    report = {
+        'dtype': dtype,
+        'weights_mb': {'float32': source_manifest['total_mb'], dtype: manifest['total_mb']},
+        'memory': memory,
+        'rss_saved_mb': memory['float32']['weights_rss_mb'] - memory[dtype]['weights_rss_mb'],
+        'parity': parity
+    }
+
+    print(f"\nHALF-PRECISION REPORT ({dtype}, {split} split):")
+    print(f"   Weights on disk: {report['weights_mb']['float32']:.1f} MB -> {report['weights_mb'][dtype]:.1f} MB")
+    print(f"   Resident memory per worker: {memory['float32']['weights_rss_mb']:.1f} MB -> "
+          f"{memory[dtype]['weights_rss_mb']:.1f} MB (saved {report['rss_saved_mb']:.1f} MB)")
+    print(f"   {'Setting':<28} {'RSS MB':>8} {'Peak MB':>8} {'ms/token':>9} {'s/answer':>9}")
+    for setting, measured in memory.items():
+        print(f"   {setting:<28} {measured['weights_rss_mb']:8.1f} {measured['peak_rss_mb']:8.1f} "
+              f"{measured['decode_ms_per_token']:9.1f} {measured['generation_s']:9.2f}")
+    print(f"   Identical greedy answers: {parity['identical_greedy']}/{parity['questions']} "
+          f"(max |logit difference| {parity['max_abs_logit_difference']:.3f})")
+    print(f"   BLEU: {parity['bleu_float32']:.4f} -> {parity['bleu_half']:.4f}")
+    print(f"   Serve it by placing {output_dir} as numpy_weights/ next to the tokenizer")
+
+    with open(os.path.join(output_dir, 'half_precision_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store NumPy engine weights in float16/bfloat16 and check parity")
+    parser.add_argument('--source-dir', default=DEFAULT_EXPORT_DIR, help="float32 export from numpy_export.py")
+    parser.add_argument('--dtype', choices=[dtype for dtype in STORAGE_DTYPES if dtype != 'float32'],
+                        default='float16')
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--tokenizer', default=HUGGING_FACE_MODEL_ID)
+    parser.add_argument('--split', default='test')
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    run_half_precision(args.source_dir, args.dtype, args.output_dir, args.tokenizer, args.split, args.limit)
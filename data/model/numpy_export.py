@@ -0,0 +1,202 @@
+# =============================================================================
+# NUMPY WEIGHT EXPORT + PARITY CHECK
+# Dump the TF checkpoint into per-tensor .npy files for the TensorFlow-free
+# engine (numpy_t5.py) and compare its logits/greedy answers against TF
+# =============================================================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'climate_chatbot_BEST_exp4c'))
+from numpy_t5 import NumpyT5, MANIFEST_FILE, WEIGHTS_DIR, STORAGE_DTYPES, self_check
+
+from training_data import HUGGING_FACE_MODEL_ID
+from evaluation import load_eval_split
+from structured_pruning import _bias_variable
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_EXPORT_DIR = os.path.join(MODEL_DIR, '..', 'climate_chatbot_BEST_exp4c', WEIGHTS_DIR)
+
+# Largest |TF - NumPy| logit difference accepted by the parity check (float32 weights)
+PARITY_TOLERANCE = 1e-3
+
+CONFIG_KEYS = ['vocab_size', 'd_model', 'd_kv', 'd_ff', 'num_heads', 'num_layers', 'num_decoder_layers',
+               'relative_attention_num_buckets', 'relative_attention_max_distance', 'layer_norm_epsilon',
+               'tie_word_embeddings', 'decoder_start_token_id', 'eos_token_id', 'pad_token_id']
+
+
+def to_storage_dtype(value: np.ndarray, dtype: str) -> np.ndarray:
+    """float32 array in the storage dtype; bfloat16 rounds to nearest even and keeps the upper 16 bits"""
+    value = np.ascontiguousarray(value, dtype=np.float32)
+    if dtype == 'bfloat16':
+        bits = value.view(np.uint32)
+        rounding = ((bits >> 16) & 1) + np.uint32(0x7FFF)
+        return ((bits + rounding) >> 16).astype(np.uint16)
+    return value.astype(dtype)
+
+
+def _weight(layer, *names):
+    """First existing variable attribute (Embedding.embeddings vs TFSharedEmbeddings.weight, ...)"""
+    for name in names:
+        if hasattr(layer, name):
+            return getattr(layer, name)
+    raise AttributeError(f"{layer.name} has none of {names}")
+
+
+def collect_tensors(model) -> Dict[str, np.ndarray]:
+    """Engine tensor name -> array, read from the TF model's layers (Dense kernels are (in, out))"""
+    tensors = {'shared': _weight(model.shared, 'embeddings', 'weight').numpy()}
+    if not model.config.tie_word_embeddings:
+        tensors['lm_head'] = model.lm_head.kernel.numpy()
+
+    for stack_name, stack in (('encoder', model.encoder), ('decoder', model.decoder)):
+        tensors[f"{stack_name}.relative_attention_bias"] = \
+            _bias_variable(stack.block[0].layer[0].SelfAttention).numpy()
+        tensors[f"{stack_name}.final_layer_norm"] = stack.final_layer_norm.weight.numpy()
+
+        for index, block in enumerate(stack.block):
+            prefix = f"{stack_name}.block.{index}"
+            attention_layers = [('self_attention', block.layer[0], block.layer[0].SelfAttention)]
+            if stack_name == 'decoder':
+                attention_layers.append(('cross_attention', block.layer[1], block.layer[1].EncDecAttention))
+            for name, sublayer, attention in attention_layers:
+                for dense in ('q', 'k', 'v', 'o'):
+                    tensors[f"{prefix}.{name}.{dense}"] = getattr(attention, dense).kernel.numpy()
+                tensors[f"{prefix}.{name}.layer_norm"] = sublayer.layer_norm.weight.numpy()
+
+            ffn = block.layer[-1]
+            tensors[f"{prefix}.ffn.wi"] = ffn.DenseReluDense.wi.kernel.numpy()
+            tensors[f"{prefix}.ffn.wo"] = ffn.DenseReluDense.wo.kernel.numpy()
+            tensors[f"{prefix}.ffn.layer_norm"] = ffn.layer_norm.weight.numpy()
+    return tensors
+
+
+def write_tensors(tensors: Dict[str, np.ndarray], config: Dict, output_dir: str, dtype: str = 'float32',
+                  source: str = "") -> Dict:
+    """Write one .npy per tensor in the storage dtype plus manifest.json (engine config + tensor index)"""
+    if dtype not in STORAGE_DTYPES:
+        raise ValueError(f"Unsupported storage dtype '{dtype}'. Available: {', '.join(STORAGE_DTYPES)}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {'source_model': source, 'config': config, 'storage_dtype': dtype, 'tensors': {}}
+    total_bytes = 0
+    for name, value in tensors.items():
+        value = to_storage_dtype(value, dtype)
+        filename = f"{name}.npy"
+        np.save(os.path.join(output_dir, filename), value)
+        manifest['tensors'][name] = {'file': filename, 'shape': list(value.shape), 'dtype': dtype}
+        total_bytes += value.nbytes
+
+    manifest['total_mb'] = total_bytes / (1024 ** 2)
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Exported {len(manifest['tensors'])} {dtype} tensors ({manifest['total_mb']:.1f} MB) to {output_dir}")
+    return manifest
+
+
+def export_weights(model, output_dir: str = DEFAULT_EXPORT_DIR, source: str = "", dtype: str = 'float32') -> Dict:
+    """Export a TF checkpoint for the NumPy engine"""
+    config = {key: getattr(model.config, key) for key in CONFIG_KEYS}
+    config['num_decoder_layers'] = config['num_decoder_layers'] or config['num_layers']
+    return write_tensors(collect_tensors(model), config, output_dir, dtype, source)
+
+
+def parity_check(model, tokenizer, engine: NumpyT5, questions: List[str], max_length: int = 100,
+                 tolerance: float = PARITY_TOLERANCE) -> Dict:
+    """
+    Teacher-forced logits of both implementations on TF's greedy answer, plus whether
+    the engine's own greedy decode reproduces that answer token for token.
+    """
+    max_difference = 0.0
+    mismatches = []
+    tf_time = numpy_time = 0.0
+    for question in questions:
+        inputs = tokenizer(f"question: {question.strip()}", return_tensors="tf", max_length=110, truncation=True)
+        start = time.time()
+        tf_ids = model.generate(inputs.input_ids, attention_mask=inputs.attention_mask,
+                                max_length=max_length, do_sample=False, num_beams=1).numpy()
+        tf_time += time.time() - start
+
+        input_ids, attention_mask = inputs.input_ids.numpy(), inputs.attention_mask.numpy()
+        start = time.time()
+        numpy_ids = engine.generate(input_ids, attention_mask, max_length=max_length)
+        numpy_time += time.time() - start
+
+        decoder_input_ids = tf_ids[:, :-1]
+        tf_logits = model(input_ids=inputs.input_ids, attention_mask=inputs.attention_mask,
+                          decoder_input_ids=decoder_input_ids, training=False).logits.numpy()
+        numpy_logits = engine.logits(input_ids, attention_mask, decoder_input_ids)
+        max_difference = max(max_difference, float(np.abs(tf_logits - numpy_logits).max()))
+
+        if tf_ids.tolist() != numpy_ids.tolist():
+            mismatches.append({'question': question,
+                               'tf': tokenizer.decode(tf_ids[0], skip_special_tokens=True),
+                               'numpy': tokenizer.decode(numpy_ids[0], skip_special_tokens=True)})
+
+    return {
+        'questions': len(questions),
+        'max_abs_logit_difference': max_difference,
+        'identical_greedy': len(questions) - len(mismatches),
+        'passed': max_difference <= tolerance and not mismatches,
+        'tf_generation_s': tf_time / max(len(questions), 1),
+        'numpy_generation_s': numpy_time / max(len(questions), 1),
+        'mismatches': mismatches
+    }
+
+
+def run_export(model_name: str = HUGGING_FACE_MODEL_ID, output_dir: str = DEFAULT_EXPORT_DIR,
+               check: bool = True, split: str = 'test', limit: Optional[int] = 20, dtype: str = 'float32') -> Dict:
+    from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model = TFT5ForConditionalGeneration.from_pretrained(model_name)
+    manifest = export_weights(model, output_dir, source=model_name, dtype=dtype)
+    engine = NumpyT5.from_pretrained(output_dir)
+    sample = tokenizer([f"question: {question.strip()}" for question, _ in load_eval_split(split)[:4]],
+                       return_tensors="np", padding=True, max_length=110, truncation=True)
+    consistency = self_check(engine, sample.input_ids, sample.attention_mask)
+    print(f"Engine self-check (logits vs greedy decode): {'PASSED' if consistency['passed'] else 'FAILED'}")
+    if not consistency['passed']:
+        return {'manifest': manifest, 'self_check': consistency}
+    if dtype != 'float32':
+        # The TF tolerance is for float32 weights: half_precision.py compares against a float32 export
+        print("Skipping the TF parity check for half-precision weights (use half_precision.py)")
+        return {'manifest': manifest}
+    if not check:
+        return {'manifest': manifest}
+
+    questions = [question for question, _ in load_eval_split(split)][:limit]
+    report = parity_check(model, tokenizer, engine, questions)
+
+    print(f"\nNUMPY ENGINE PARITY ({report['questions']} {split} questions):")
+    print(f"   Max |logit difference|: {report['max_abs_logit_difference']:.2e} (tolerance {PARITY_TOLERANCE:.0e})")
+    print(f"   Identical greedy answers: {report['identical_greedy']}/{report['questions']}")
+    print(f"   Generation: TF {report['tf_generation_s']:.2f}s, NumPy {report['numpy_generation_s']:.2f}s per answer")
+    print(f"   {'PASSED' if report['passed'] else 'FAILED'}")
+    for mismatch in report['mismatches'][:3]:
+        print(f"   - {mismatch['question']}\n     TF:    {mismatch['tf']}\n     NumPy: {mismatch['numpy']}")
+
+    with open(os.path.join(output_dir, 'parity_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return {'manifest': manifest, 'parity': report}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export T5 weights for the NumPy engine and check parity with TF")
+    parser.add_argument('--model', default=HUGGING_FACE_MODEL_ID)
+    parser.add_argument('--output-dir', default=DEFAULT_EXPORT_DIR)
+    parser.add_argument('--no-check', action='store_true', help="Skip the TF parity check")
+    parser.add_argument('--split', default='test')
+    parser.add_argument('--limit', type=int, default=20, help="Questions used by the parity check")
+    parser.add_argument('--dtype', choices=STORAGE_DTYPES, default='float32', help="Weight storage precision")
+    args = parser.parse_args()
+
+    result = run_export(args.model, args.output_dir, check=not args.no_check, split=args.split, limit=args.limit,
+                        dtype=args.dtype)
+    if any(not result[key]['passed'] for key in ('self_check', 'parity') if key in result):
+        sys.exit(1)
@@ -0,0 +1,72 @@
+# =============================================================================
+# PRECOMPUTED ANSWER STORE - BATCH JOB
+# Answer the curated questions (with variations) and the most frequent logged
+# climate questions with the best preset + reranking, write the answer store
+# =============================================================================
+
+import os
+import sys
+import glob
+import argparse
+from collections import Counter
+from typing import List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'climate_chatbot_BEST_exp4c'))
+from ayikabot_complete_pipeline import AyikaBot
+from answer_store import (STORE_DIR, STORE_PRESET, STORE_NUM_CANDIDATES, build_answer_store, checkpoint_tag,
+                          default_store_questions, normalize_question)
+
+from continual_training import read_logged_interactions, LOG_DIR
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(MODEL_DIR, '..', 'climate_chatbot_BEST_exp4c')
+
+
+def top_logged_questions(bot: AyikaBot, log_paths: List[str], top_n: int = 200) -> List[str]:
+    """Most frequently asked climate questions in the logs (one spelling per normalized question)"""
+    counts = Counter()
+    spelling = {}
+    for item in read_logged_interactions(log_paths):
+        question = item['question'].strip()
+        if not question or not bot.is_climate_related(question)[0]:
+            continue
+        key = normalize_question(question)
+        counts[key] += 1
+        spelling.setdefault(key, question)
+    return [spelling[key] for key, _ in counts.most_common(top_n)]
+
+
+def run_precompute(model_path: str = DEFAULT_MODEL_PATH, backend: str = "tf", top_logged: int = 200,
+                   log_paths: Optional[List[str]] = None, store_dir: Optional[str] = None) -> dict:
+    store_dir = store_dir or os.path.join(model_path, STORE_DIR)
+    bot = AyikaBot(model_path, backend=backend, use_answer_store=False)
+
+    curated = default_store_questions()
+    log_paths = log_paths if log_paths is not None else sorted(glob.glob(os.path.join(LOG_DIR, 'interactions_*.json')))
+    logged = top_logged_questions(bot, log_paths, top_logged) if top_logged > 0 else []
+    print(f"Precomputing {len(curated)} curated and {len(logged)} logged questions "
+          f"('{STORE_PRESET}' preset, {STORE_NUM_CANDIDATES} candidates)...")
+
+    tag = checkpoint_tag(model_path)
+    manifest = build_answer_store(bot.precompute_answer, curated + logged, store_dir, tag, metadata={
+        'preset': STORE_PRESET,
+        'num_candidates': STORE_NUM_CANDIDATES,
+        'backend': backend,
+        'curated_questions': len(curated),
+        'logged_questions': len(logged)
+    })
+    print(f"\nAnswer store written to {store_dir}: {manifest['entries']} answers for {tag} "
+          f"({manifest['failed']} failed)")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute answers for known questions into the answer store")
+    parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--backend', choices=['tf', 'numpy'], default='tf')
+    parser.add_argument('--top-logged', type=int, default=200, help="Most frequent logged questions to include")
+    parser.add_argument('--logs', nargs='*', default=None, help="Interaction log files (default: outputs/ayikabot_logs)")
+    parser.add_argument('--store-dir', default=None)
+    args = parser.parse_args()
+
+    run_precompute(args.model_path, args.backend, args.top_logged, args.logs, args.store_dir)
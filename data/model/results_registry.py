@@ -0,0 +1,224 @@
+# =============================================================================
+# EXPERIMENT RESULTS REGISTRY
+# SQLite store for every training trial; generalizes comprehensive_results.json
+# (import the hand-run experiments, export any sweep back to that schema)
+# =============================================================================
+
+import os
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_FILE = os.path.join(MODEL_DIR, 'results.db')
+COMPREHENSIVE_RESULTS_FILE = os.path.join(MODEL_DIR, '..', 'climate_chatbot_BEST_exp4c', 'comprehensive_results.json')
+
+# First-class columns; anything else a trial reports is kept in the JSON `extra` column
+METRIC_COLUMNS = [
+    'train_loss', 'val_loss', 'bleu', 'factual_error_rate', 'repetition_rate',
+    'generation_time', 'train_seconds', 'tokens_per_s', 'peak_memory_mb'
+]
+PARAM_COLUMNS = ['learning_rate', 'batch_size', 'epochs', 'preset']
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sweep TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    {', '.join(f'{column} REAL' for column in PARAM_COLUMNS if column != 'preset')},
+    preset TEXT,
+    {', '.join(f'{column} REAL' for column in METRIC_COLUMNS)},
+    epochs_completed INTEGER,
+    notes TEXT,
+    description TEXT,
+    params TEXT,
+    history TEXT,
+    extra TEXT,
+    created TEXT NOT NULL,
+    finished TEXT,
+    UNIQUE (sweep, name)
+)
+"""
+
+
+class ResultsRegistry:
+    """Queryable local registry of trial parameters, metrics and timings"""
+
+    def __init__(self, path: str = REGISTRY_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def record_trial(self, sweep: str, name: str, params: Dict, metrics: Optional[Dict] = None,
+                     status: str = 'completed', history: Optional[List[Dict]] = None,
+                     notes: str = '', description: str = '') -> int:
+        """Insert or replace one trial; returns its id"""
+        metrics = dict(metrics or {})
+        row = {
+            'sweep': sweep,
+            'name': name,
+            'status': status,
+            'learning_rate': params.get('learning_rate'),
+            'batch_size': params.get('batch_size'),
+            'epochs': params.get('num_epochs', params.get('epochs')),
+            'preset': params.get('preset'),
+            'epochs_completed': metrics.pop('epochs_completed', len(history) if history else None),
+            'notes': notes,
+            'description': description,
+            'params': json.dumps(params),
+            'history': json.dumps(history or []),
+            'created': datetime.now().isoformat(),
+            'finished': datetime.now().isoformat() if status != 'running' else None
+        }
+        for column in METRIC_COLUMNS:
+            row[column] = metrics.pop(column, None)
+        row['extra'] = json.dumps(metrics)
+
+        columns = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        cursor = self.connection.execute(
+            f"INSERT OR REPLACE INTO trials ({columns}) VALUES ({placeholders})", list(row.values())
+        )
+        self.connection.commit()
+        return cursor.lastrowid
+
+    def query(self, where: str = '1=1', args: tuple = (), order_by: str = 'id') -> List[Dict]:
+        """Trials matching an SQL condition, e.g. query("sweep = ? AND bleu > 0.04", ('exp5',))"""
+        rows = self.connection.execute(f"SELECT * FROM trials WHERE {where} ORDER BY {order_by}", args)
+        trials = []
+        for row in rows:
+            trial = dict(row)
+            for column in ('params', 'history', 'extra'):
+                trial[column] = json.loads(trial[column]) if trial[column] else None
+            trials.append(trial)
+        return trials
+
+    def best(self, metric: str = 'bleu', sweep: Optional[str] = None, higher_is_better: bool = True) -> Optional[Dict]:
+        where = f"{metric} IS NOT NULL AND status = 'completed'"
+        args: tuple = ()
+        if sweep:
+            where += " AND sweep = ?"
+            args = (sweep,)
+        trials = self.query(where, args, order_by=f"{metric} {'DESC' if higher_is_better else 'ASC'}")
+        return trials[0] if trials else None
+
+    def best_val_loss_by_epoch(self, sweep: Optional[str] = None) -> Dict[int, float]:
+        """Lowest validation loss reached at each epoch by any finished trial"""
+        where, args = ("sweep = ?", (sweep,)) if sweep else ('1=1', ())
+        best: Dict[int, float] = {}
+        for trial in self.query(where, args):
+            for logs in trial['history'] or []:
+                if logs.get('val_loss') is not None:
+                    best[logs['epoch']] = min(best.get(logs['epoch'], float('inf')), logs['val_loss'])
+        return best
+
+    def import_comprehensive_results(self, path: str = COMPREHENSIVE_RESULTS_FILE, sweep: str = 'manual') -> int:
+        """Load the hand-run experiment progression into the registry"""
+        with open(path, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+
+        imported = 0
+        for name, experiment in results.get('experiment_progression', {}).items():
+            params = {key: experiment[key] for key in ('learning_rate', 'batch_size', 'epochs') if key in experiment}
+            metrics = {
+                'train_loss': experiment.get('train_loss'),
+                'val_loss': experiment.get('val_loss'),
+                'bleu': experiment.get('bleu'),
+                'generation_time': experiment.get('generation_time')
+            }
+            self.record_trial(sweep, name, params, metrics, notes=experiment.get('notes', ''),
+                              description=experiment.get('description', ''))
+            imported += 1
+        return imported
+
+    def export_comprehensive_results(self, sweep: str, path: Optional[str] = None,
+                                     metric: str = 'bleu', optimal_parameters: Optional[Dict] = None) -> Dict:
+        """Write a sweep in the comprehensive_results.json schema, best trial as the headline"""
+        trials = self.query("sweep = ?", (sweep,))
+        best = self.best(metric, sweep)
+
+        results = {
+            'experiment_info': {
+                'name': f"Climate Education Chatbot - {sweep}",
+                'version': best['name'] if best else None,
+                'description': f"Best trial by {metric} in sweep '{sweep}'",
+                'timestamp': datetime.now().isoformat()
+            },
+            'model_performance': {
+                'training_loss': best['train_loss'] if best else None,
+                'validation_loss': best['val_loss'] if best else None,
+                'bleu_score': best['bleu'] if best else None,
+                'average_generation_time': best['generation_time'] if best else None
+            },
+            'experiment_progression': {
+                trial['name']: {
+                    key: value for key, value in {
+                        'learning_rate': trial['learning_rate'],
+                        'batch_size': int(trial['batch_size']) if trial['batch_size'] is not None else None,
+                        'epochs': int(trial['epochs']) if trial['epochs'] is not None else None,
+                        'train_loss': trial['train_loss'],
+                        'val_loss': trial['val_loss'],
+                        'bleu': trial['bleu'],
+                        'generation_time': trial['generation_time'],
+                        'description': trial['description'] or None,
+                        'notes': trial['notes'] or trial['status']
+                    }.items() if value is not None
+                }
+                for trial in trials
+            }
+        }
+        if optimal_parameters is not None:
+            results['optimal_parameters'] = optimal_parameters
+
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        return results
+
+
+def print_trials(trials: List[Dict]):
+    def fmt(value, spec: str, width: int) -> str:
+        return (format(value, spec) if value is not None else '-').ljust(width)
+
+    print(f"{'Sweep':<12} {'Trial':<36} {'Status':<10} {'LR':<9} {'Batch':<6} {'Epochs':<7} "
+          f"{'Val loss':<9} {'BLEU':<7} {'Time'}")
+    print("-" * 112)
+    for trial in trials:
+        print(f"{trial['sweep']:<12} {trial['name']:<36} {trial['status']:<10} "
+              f"{fmt(trial['learning_rate'], '.1e', 9)} {fmt(trial['batch_size'], '.0f', 6)} "
+              f"{fmt(trial['epochs_completed'] or trial['epochs'], '.0f', 7)} {fmt(trial['val_loss'], '.4f', 9)} "
+              f"{fmt(trial['bleu'], '.4f', 7)} {fmt(trial['train_seconds'] or trial['generation_time'], '.1f', 0)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the experiment results registry")
+    parser.add_argument('command', choices=['import', 'export', 'list', 'best'])
+    parser.add_argument('--db', default=REGISTRY_FILE)
+    parser.add_argument('--sweep', default=None)
+    parser.add_argument('--metric', default='bleu')
+    parser.add_argument('--where', default='1=1', help="SQL condition for 'list'")
+    parser.add_argument('--output', default=None, help="Output JSON for 'export'")
+    args = parser.parse_args()
+
+    registry = ResultsRegistry(args.db)
+    if args.command == 'import':
+        print(f"Imported {registry.import_comprehensive_results()} experiments into sweep 'manual'")
+    elif args.command == 'export':
+        exported = registry.export_comprehensive_results(args.sweep or 'manual', args.output, args.metric)
+        if not args.output:
+            print(json.dumps(exported, indent=2))
+    elif args.command == 'list':
+        condition = f"({args.where}) AND sweep = ?" if args.sweep else args.where
+        print_trials(registry.query(condition, (args.sweep,) if args.sweep else ()))
+    else:
+        trial = registry.best(args.metric, args.sweep, higher_is_better=args.metric in ('bleu', 'tokens_per_s'))
+        print_trials([trial] if trial else [])
+    registry.close()
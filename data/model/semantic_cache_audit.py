@@ -0,0 +1,144 @@
+# =============================================================================
+# SEMANTIC CACHE AUDIT + THRESHOLD CALIBRATION
+# Label cache hits (logged or replayed) as true/false by comparing fresh greedy
+# answers, report the false-hit rate and a hit-rate/false-hit table per threshold
+# =============================================================================
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'climate_chatbot_BEST_exp4c'))
+from ayikabot_complete_pipeline import AyikaBot
+from semantic_cache import SemanticCache, CACHE_DIR, CACHE_CONFIG
+from answer_store import checkpoint_tag
+from curated_answers import content_words, load_curated_dataset
+
+from evaluation import load_eval_split
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(MODEL_DIR, '..', 'climate_chatbot_BEST_exp4c')
+
+AUDIT_CONFIG = {
+    'agreement_threshold': 0.5,      # content-word cosine between answers that counts as the same answer
+    'thresholds': [0.85, 0.88, 0.90, 0.92, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99],
+    'judge_preset': 'greedy_eval'
+}
+
+
+def answer_agreement(first: str, second: str) -> float:
+    """Cosine similarity of the answers' content-word counts"""
+    words_a, words_b = content_words(first), content_words(second)
+    vocabulary = {word: i for i, word in enumerate(sorted(set(words_a) | set(words_b)))}
+    if not vocabulary:
+        return 1.0
+    a, b = np.zeros(len(vocabulary)), np.zeros(len(vocabulary))
+    for word in words_a:
+        a[vocabulary[word]] += 1
+    for word in words_b:
+        b[vocabulary[word]] += 1
+    return float(a @ b / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-8))
+
+
+def label_hits(bot: AyikaBot, hits: List[Dict], config: Dict = AUDIT_CONFIG) -> List[Dict]:
+    """
+    A hit is false when the deterministic answer to the asked question and the one to the
+    matched cached question disagree (the cached answer would not have been given).
+    """
+    greedy = {}
+
+    def answer(question):
+        if question not in greedy:
+            greedy[question] = bot.generate_answer(question, preset=config['judge_preset'])
+        return greedy[question]
+
+    labelled = []
+    for hit in hits:
+        agreement = answer_agreement(answer(hit['question']), answer(hit['matched_question']))
+        labelled.append(dict(hit, agreement=agreement, false_hit=agreement < config['agreement_threshold']))
+    return labelled
+
+
+def replay_questions(bot: AyikaBot, cache: SemanticCache, questions: List[str]) -> List[Dict]:
+    """
+    Nearest other cached question for each question, whatever the similarity (for
+    calibration); the question's own entry is skipped, as replayed questions are cached too
+    """
+    pairs = []
+    for question in questions:
+        slot, similarity = cache.search(bot.embed_question(question), exclude=question)
+        if slot is not None:
+            pairs.append({'question': question, 'matched_question': cache.questions[slot], 'similarity': similarity})
+    return pairs
+
+
+def threshold_table(labelled: List[Dict], thresholds: List[float]) -> List[Dict]:
+    rows = []
+    for threshold in thresholds:
+        hits = [pair for pair in labelled if pair['similarity'] >= threshold]
+        false_hits = sum(pair['false_hit'] for pair in hits)
+        rows.append({'threshold': threshold, 'hit_rate': len(hits) / max(len(labelled), 1),
+                     'hits': len(hits), 'false_hit_rate': false_hits / len(hits) if hits else 0.0})
+    return rows
+
+
+def run_audit(model_path: str = DEFAULT_MODEL_PATH, backend: str = "tf", cache_dir: Optional[str] = None,
+              replay_split: Optional[str] = 'test', config: Dict = AUDIT_CONFIG) -> Dict:
+    """
+    Audit logged hits of a persisted cache. With `replay_split`, also fill an empty cache
+    with the curated questions and replay the split's questions to calibrate the threshold.
+    """
+    bot = AyikaBot(model_path, backend=backend, use_answer_store=False)
+    cache_dir = cache_dir or os.path.join(model_path, CACHE_DIR)
+    cache = SemanticCache.load(cache_dir, model_tag=checkpoint_tag(model_path))
+    report = {'cache': cache.summary()}
+
+    if cache.recent_hits:
+        labelled = label_hits(bot, list(cache.recent_hits), config)
+        report['logged_hits'] = {
+            'audited': len(labelled),
+            'false_hit_rate': sum(pair['false_hit'] for pair in labelled) / len(labelled),
+            'false_hits': [pair for pair in labelled if pair['false_hit']][:20]
+        }
+
+    if replay_split:
+        # Calibration cache: every curated question with its curated answer, no eviction
+        calibration = SemanticCache(config={**CACHE_CONFIG, 'capacity': 10000, 'autosave_every': 0})
+        for entry in load_curated_dataset():
+            calibration.add(bot.embed_question(entry['question']), entry['question'], entry['answer'])
+        questions = [question for question, _ in load_eval_split(replay_split)]
+        labelled = label_hits(bot, replay_questions(bot, calibration, questions), config)
+        report['calibration'] = threshold_table(labelled, config['thresholds'])
+
+    print("\nSEMANTIC CACHE AUDIT:")
+    print(f"   Cache: {report['cache']['entries']} entries, hit rate {report['cache']['hit_rate']:.1%} "
+          f"over {report['cache']['lookups']} lookups")
+    if 'logged_hits' in report:
+        print(f"   Logged hits audited: {report['logged_hits']['audited']}, "
+              f"false-hit rate {report['logged_hits']['false_hit_rate']:.1%}")
+        for pair in report['logged_hits']['false_hits'][:5]:
+            print(f"   - '{pair['question']}' -> '{pair['matched_question']}' ({pair['similarity']:.3f})")
+    if 'calibration' in report:
+        print(f"\n   {replay_split} questions replayed against the curated questions:")
+        print(f"   {'Threshold':<11} {'Hit rate':<10} {'False hits'}")
+        for row in report['calibration']:
+            print(f"   {row['threshold']:<11.2f} {row['hit_rate']:<10.1%} {row['false_hit_rate']:.1%}")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, 'audit_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit semantic cache hits and calibrate its threshold")
+    parser.add_argument('--model-path', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--backend', choices=['tf', 'numpy'], default='tf')
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--replay-split', default='test', help="Split replayed for calibration ('' to skip)")
+    args = parser.parse_args()
+
+    run_audit(args.model_path, args.backend, args.cache_dir, args.replay_split or None)
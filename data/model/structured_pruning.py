@@ -0,0 +1,227 @@
+# =============================================================================
+# STRUCTURED HEAD / FFN PRUNING
+# First-order Taylor importance on the validation split, physical removal of
+# the weakest attention heads and FFN neurons, prune-ratio vs quality/latency table
+# =============================================================================
+
+import os
+import json
+import argparse
+import numpy as np
+from typing import Dict, List, Optional
+
+from training_data import HUGGING_FACE_MODEL_ID, tokenize_split, build_bucketed_dataset
+from train_t5 import _masked_loss, configure_threads, train
+from evaluation import load_eval_split, evaluate_model
+from distillation import weights_mb
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PRUNE_CONFIG = {
+    'ratios': [0.0, 0.25, 0.375, 0.5],   # fraction of heads and FFN neurons removed
+    'eval_split': 'test',
+    'eval_preset': 'optimal',
+    'finetune_epochs': 0,                # > 0 runs a short recovery fine-tune on the train split
+    'finetune_learning_rate': 5e-5
+}
+
+
+def _attention_modules(model) -> Dict[str, List]:
+    """Attention layers grouped by the head sets that must stay aligned"""
+    return {
+        # Every layer in a stack reuses block 0's relative position bias, indexed by head,
+        # so self-attention keeps the same head indices throughout the stack
+        'encoder_self': [block.layer[0].SelfAttention for block in model.encoder.block],
+        'decoder_self': [block.layer[0].SelfAttention for block in model.decoder.block],
+        # Cross-attention has no position bias: heads are chosen per layer
+        'decoder_cross': [block.layer[1].EncDecAttention for block in model.decoder.block]
+    }
+
+
+def _ffn_modules(model) -> List:
+    return [block.layer[-1].DenseReluDense for block in model.encoder.block + model.decoder.block]
+
+
+def compute_importance(model, val_data, pad_token_id: int = 0, batch_size: int = 8) -> Dict:
+    """
+    Taylor importance |sum(w * dL/dw)| per head (q/k/v columns + o rows) and per FFN
+    neuron (wi column + wo row), accumulated over validation batches.
+    """
+    import tensorflow as tf
+
+    config = model.config
+    heads, d_kv = config.num_heads, config.d_kv
+    attention = _attention_modules(model)
+    ffns = _ffn_modules(model)
+
+    attention_layers = [layer for group in attention.values() for layer in group]
+    variables = [dense.kernel for layer in attention_layers for dense in (layer.q, layer.k, layer.v, layer.o)]
+    variables += [dense.kernel for ffn in ffns for dense in (ffn.wi, ffn.wo)]
+
+    head_scores = np.zeros((len(attention_layers), heads))
+    ffn_scores = np.zeros((len(ffns), config.d_ff))
+
+    for batch in build_bucketed_dataset(val_data, batch_size, pad_token_id, shuffle=False):
+        with tf.GradientTape() as tape:
+            logits = model(input_ids=batch['input_ids'], attention_mask=batch['attention_mask'],
+                           labels=batch['labels'], training=False).logits
+            loss = _masked_loss(batch['labels'], logits)
+        gradients = tape.gradient(loss, variables)
+        products = [(variable * gradient).numpy() for variable, gradient in zip(variables, gradients)]
+
+        for index in range(len(attention_layers)):
+            q, k, v, o = products[4 * index:4 * index + 4]
+            per_head = sum(p.reshape(-1, heads, d_kv).sum(axis=(0, 2)) for p in (q, k, v))
+            per_head += o.reshape(heads, d_kv, -1).sum(axis=(1, 2))
+            head_scores[index] += np.abs(per_head)
+
+        offset = 4 * len(attention_layers)
+        for index in range(len(ffns)):
+            wi, wo = products[offset + 2 * index], products[offset + 2 * index + 1]
+            ffn_scores[index] += np.abs(wi.sum(axis=0) + wo.sum(axis=1))
+
+    scores = {'ffn': ffn_scores}
+    start = 0
+    for name, group in attention.items():
+        scores[name] = head_scores[start:start + len(group)]
+        start += len(group)
+    return scores
+
+
+def select_structures(scores: Dict, num_heads: int, d_ff: int) -> Dict:
+    """Kept head / neuron indices (sorted) for the target sizes"""
+    keep = {}
+    for name in ('encoder_self', 'decoder_self'):
+        stack_score = scores[name].sum(axis=0)
+        keep[name] = [sorted(np.argsort(-stack_score)[:num_heads].tolist())] * len(scores[name])
+    keep['decoder_cross'] = [sorted(np.argsort(-layer)[:num_heads].tolist()) for layer in scores['decoder_cross']]
+    keep['ffn'] = [sorted(np.argsort(-layer)[:d_ff].tolist()) for layer in scores['ffn']]
+    return keep
+
+
+def _head_columns(head_indices: List[int], d_kv: int) -> np.ndarray:
+    return np.concatenate([np.arange(head * d_kv, (head + 1) * d_kv) for head in head_indices])
+
+
+def _bias_variable(attention):
+    """(num_buckets, num_heads) relative position bias; an Embedding layer in older transformers"""
+    bias = attention.relative_attention_bias
+    return bias.embeddings if hasattr(bias, 'embeddings') else bias
+
+
+def build_pruned_model(model, keep: Dict):
+    """Dense checkpoint with fewer heads and FFN neurons, weights copied from `model`"""
+    import tensorflow as tf
+    from transformers import T5Config, TFT5ForConditionalGeneration
+
+    num_heads = len(keep['encoder_self'][0])
+    d_ff = len(keep['ffn'][0])
+    config = T5Config.from_dict({**model.config.to_dict(), 'num_heads': num_heads, 'd_ff': d_ff})
+    pruned = TFT5ForConditionalGeneration(config)
+    dummy = tf.constant([[0, 1]], dtype=tf.int32)
+    pruned(input_ids=dummy, decoder_input_ids=dummy, training=False)
+
+    # Start from a straight copy of every weight with an unchanged shape (embeddings, layer norms)
+    for target, source in zip(pruned.weights, model.weights):
+        if tuple(target.shape) == tuple(source.shape):
+            target.assign(source)
+
+    d_kv = model.config.d_kv
+    source_attention, target_attention = _attention_modules(model), _attention_modules(pruned)
+    for name in source_attention:
+        for layer_index, (source, target) in enumerate(zip(source_attention[name], target_attention[name])):
+            heads = keep[name][layer_index]
+            columns = _head_columns(heads, d_kv)
+            for dense in ('q', 'k', 'v'):
+                getattr(target, dense).kernel.assign(tf.gather(getattr(source, dense).kernel, columns, axis=1))
+            target.o.kernel.assign(tf.gather(source.o.kernel, columns, axis=0))
+            if getattr(source, 'has_relative_attention_bias', False):
+                _bias_variable(target).assign(tf.gather(_bias_variable(source), heads, axis=1))
+
+    for layer_index, (source, target) in enumerate(zip(_ffn_modules(model), _ffn_modules(pruned))):
+        neurons = keep['ffn'][layer_index]
+        target.wi.kernel.assign(tf.gather(source.wi.kernel, neurons, axis=1))
+        target.wo.kernel.assign(tf.gather(source.wo.kernel, neurons, axis=0))
+
+    return pruned
+
+
+def prune_sweep(model_name: str = HUGGING_FACE_MODEL_ID, config: Dict = PRUNE_CONFIG,
+                output_dir: Optional[str] = None) -> List[Dict]:
+    """Prune at each ratio, optionally fine-tune, evaluate; prints the ratio/quality/latency table"""
+    from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+
+    config = {**PRUNE_CONFIG, **config}
+    output_dir = output_dir or os.path.join(MODEL_DIR, 'runs', 'pruned')
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model = TFT5ForConditionalGeneration.from_pretrained(model_name)
+
+    val_data = tokenize_split(tokenizer, 'val', tokenizer_name=model_name)
+    print("Scoring heads and FFN neurons on the validation split...")
+    scores = compute_importance(model, val_data, tokenizer.pad_token_id)
+    eval_examples = load_eval_split(config['eval_split'])
+
+    rows = []
+    for ratio in config['ratios']:
+        num_heads = max(1, int(round(model.config.num_heads * (1 - ratio))))
+        d_ff = max(1, int(round(model.config.d_ff * (1 - ratio))))
+        print(f"\nPrune ratio {ratio:.0%}: {num_heads} heads, d_ff {d_ff}")
+
+        if ratio == 0:
+            pruned = model
+        else:
+            keep = select_structures(scores, num_heads, d_ff)
+            pruned = build_pruned_model(model, keep)
+            if config['finetune_epochs'] > 0:
+                train_data = tokenize_split(tokenizer, 'train', tokenizer_name=model_name)
+                train(pruned, train_data, val_data,
+                      {'num_epochs': config['finetune_epochs'], 'learning_rate': config['finetune_learning_rate']},
+                      os.path.join(output_dir, f"ratio_{ratio:.3f}"), resume=False,
+                      pad_token_id=tokenizer.pad_token_id)
+            path = os.path.join(output_dir, f"ratio_{ratio:.3f}")
+            pruned.save_pretrained(path)
+            tokenizer.save_pretrained(path)
+            with open(os.path.join(path, 'pruning.json'), 'w', encoding='utf-8') as f:
+                json.dump({'source_model': model_name, 'ratio': ratio, 'kept': keep}, f)
+
+        evaluation = evaluate_model(pruned, tokenizer, eval_examples, config['eval_preset'],
+                                    batch_size=1, verbose=False)
+        rows.append({
+            'ratio': ratio,
+            'num_heads': num_heads,
+            'd_ff': d_ff,
+            'parameters': int(pruned.num_parameters()),
+            'weights_mb': weights_mb(pruned),
+            'bleu': evaluation['bleu'],
+            'factual_error_rate': evaluation['factual_error_rate'],
+            'latency_s': evaluation['avg_generation_time']
+        })
+
+    print(f"\nSTRUCTURED PRUNING ({config['eval_split']} split, '{config['eval_preset']}' preset"
+          f"{', fine-tuned' if config['finetune_epochs'] else ''}):")
+    print(f"{'Ratio':<7} {'Heads':<6} {'d_ff':<6} {'Params':<12} {'MB':<7} {'BLEU':<8} {'Fact.err':<9} {'Latency'}")
+    print("-" * 72)
+    for row in rows:
+        print(f"{row['ratio']:<7.1%} {row['num_heads']:<6} {row['d_ff']:<6} {row['parameters']:<12,} "
+              f"{row['weights_mb']:<7.1f} {row['bleu']:<8.4f} {row['factual_error_rate']:<9.1%} "
+              f"{row['latency_s']:.2f}s")
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'pruning_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(rows, f, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Structured head/FFN pruning with a latency/quality table")
+    parser.add_argument('--model', default=HUGGING_FACE_MODEL_ID)
+    parser.add_argument('--ratios', type=float, nargs='+', default=PRUNE_CONFIG['ratios'])
+    parser.add_argument('--finetune-epochs', type=int, default=PRUNE_CONFIG['finetune_epochs'])
+    parser.add_argument('--split', default=PRUNE_CONFIG['eval_split'])
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--intra-op-threads', type=int, default=0)
+    args = parser.parse_args()
+
+    configure_threads(args.intra_op_threads)
+    prune_sweep(args.model, {'ratios': args.ratios, 'finetune_epochs': args.finetune_epochs,
+                             'eval_split': args.split}, args.output_dir)
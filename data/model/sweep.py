@@ -0,0 +1,287 @@
+# =============================================================================
+# PARALLEL HYPERPARAMETER SWEEP RUNNER
+# Grid or random search over training + generation settings, trials in worker
+# processes with per-process thread limits, early stopping, results registry
+# =============================================================================
+
+import os
+import json
+import math
+import hashlib
+import random
+import itertools
+import argparse
+import multiprocessing
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from results_registry import ResultsRegistry, REGISTRY_FILE
+
+# Grid around the notebook's experiment progression (see comprehensive_results.json).
+# 'preset' only changes evaluation: each training configuration is trained once and
+# every preset listed for it is evaluated on that model
+DEFAULT_SEARCH_SPACE = {
+    'learning_rate': [1e-4, 3e-4, 5e-4],
+    'batch_size': [4, 8],
+    'num_epochs': [10, 20],
+    'preset': ['optimal', 'greedy_eval']
+}
+
+SWEEP_CONFIG = {
+    'model_name': 't5-small',       # the experiments fine-tuned from the base checkpoint
+    'workers': 2,
+    'threads_per_worker': 2,
+    'min_epochs': 3,                # never stop a trial before this many epochs
+    'hopeless_margin': 0.25,        # stop if val loss > (1 + margin) x best seen at the same epoch
+    'patience': 3,                  # stop after this many epochs without improvement
+    'eval_split': 'val',
+    'seed': 42
+}
+
+
+def expand_grid(space: Dict) -> List[Dict]:
+    """Every combination of the listed values"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def sample_random(space: Dict, num_trials: int, seed: int = 42) -> List[Dict]:
+    """
+    Random search. Lists are sampled uniformly; {'log_uniform': [low, high]} and
+    {'uniform': [low, high]} describe continuous ranges; {'int': [low, high]} integers.
+    """
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(num_trials):
+        params = {}
+        for key, spec in space.items():
+            if isinstance(spec, list):
+                params[key] = rng.choice(spec)
+            elif 'log_uniform' in spec:
+                low, high = spec['log_uniform']
+                params[key] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+            elif 'uniform' in spec:
+                params[key] = rng.uniform(*spec['uniform'])
+            elif 'int' in spec:
+                params[key] = rng.randint(*spec['int'])
+            else:
+                raise ValueError(f"Unsupported search space entry for '{key}': {spec}")
+        trials.append(params)
+    return trials
+
+
+def trial_name(params: Dict) -> str:
+    """Readable prefix plus a digest of every setting, so distinct trials never share a name"""
+    parts = [f"lr{params['learning_rate']:.2g}" if 'learning_rate' in params else '',
+             f"bs{params['batch_size']}" if 'batch_size' in params else '',
+             f"ep{params['num_epochs']}" if 'num_epochs' in params else '',
+             params.get('preset') or '',
+             hashlib.blake2b(json.dumps(params, sort_keys=True).encode('utf-8'), digest_size=4).hexdigest()]
+    return '_'.join(part for part in parts if part)
+
+
+def group_by_training(trials: List[Dict]) -> List[Dict]:
+    """Trials sharing every setting but the preset, as {'params': training settings, 'presets': [...]}"""
+    groups = {}
+    for params in trials:
+        training = {key: value for key, value in params.items() if key != 'preset'}
+        group = groups.setdefault(json.dumps(training, sort_keys=True), {'params': training, 'presets': []})
+        preset = params.get('preset')
+        if preset not in group['presets']:
+            group['presets'].append(preset)
+    return list(groups.values())
+
+
+class EarlyStopper:
+    """
+    Stops trials that cannot catch up (NaN loss, or validation loss far above the best
+    seen at the same epoch by any trial in the sweep) and trials that have converged
+    (no improvement for `patience` epochs). Converged trials are still evaluated, with
+    the best-val-loss weights kept from `model`.
+    """
+
+    def __init__(self, shared_best: Dict, config: Dict = SWEEP_CONFIG, model=None):
+        self.shared_best = shared_best
+        self.config = config
+        self.model = model
+        self.best_val_loss = float('inf')
+        self.best_weights = None
+        self.epochs_without_improvement = 0
+        self.reason = None
+        self.converged = False
+
+    def __call__(self, epoch: int, logs: Dict) -> bool:
+        val_loss = logs.get('val_loss')
+        if val_loss is None:
+            return True
+        if math.isnan(val_loss) or math.isnan(logs['train_loss']):
+            self.reason = f"NaN loss at epoch {epoch + 1}"
+            return False
+
+        reference = self.shared_best.get(epoch + 1)
+        if reference is None or val_loss < reference:
+            self.shared_best[epoch + 1] = val_loss
+
+        if val_loss < self.best_val_loss:
+            self.best_val_loss = val_loss
+            self.epochs_without_improvement = 0
+            if self.model is not None:
+                self.best_weights = self.model.get_weights()
+        else:
+            self.epochs_without_improvement += 1
+
+        if epoch + 1 < self.config['min_epochs']:
+            return True
+        if reference is not None and val_loss > reference * (1.0 + self.config['hopeless_margin']):
+            self.reason = f"val_loss {val_loss:.4f} vs best {reference:.4f} at epoch {epoch + 1}"
+            return False
+        if self.epochs_without_improvement >= self.config['patience']:
+            self.reason = f"no improvement for {self.config['patience']} epochs"
+            self.converged = True
+            return False
+        return True
+
+    def restore_best(self):
+        """Put the best-val-loss weights back into the model (if a later epoch was worse)"""
+        if self.best_weights is not None and self.epochs_without_improvement:
+            self.model.set_weights(self.best_weights)
+
+
+def _init_worker(threads: int):
+    """Pin each worker's thread pools before TensorFlow is imported in that process"""
+    for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[variable] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+
+def run_trial(job: Dict) -> List[Dict]:
+    """
+    Train one configuration and evaluate it with each of its presets (runs inside a
+    worker process); returns one result per preset.
+    """
+    from train_t5 import configure_threads, load_model_and_tokenizer, train
+    from training_data import tokenize_split
+    from evaluation import load_eval_split, evaluate_model
+
+    params, presets, config = job['params'], job['presets'], job['config']
+    configure_threads(config['threads_per_worker'], 1)
+
+    def results_for(status: str, metrics: Dict, history: List[Dict], notes: str, evaluations: Dict = None):
+        return [{'params': dict(params, preset=preset) if preset else params, 'status': status,
+                 'metrics': dict(metrics, **(evaluations or {}).get(preset, {})),
+                 'history': history, 'notes': notes} for preset in presets]
+
+    try:
+        model, tokenizer = load_model_and_tokenizer(config['model_name'])
+        train_data = tokenize_split(tokenizer, 'train', tokenizer_name=config['model_name'])
+        val_data = tokenize_split(tokenizer, config['eval_split'], tokenizer_name=config['model_name'])
+
+        training_config = dict(params, seed=config['seed'])
+        stopper = EarlyStopper(job['shared_best'], config, model)
+        results = train(model, train_data, val_data, training_config, job['output_dir'], resume=False,
+                        pad_token_id=tokenizer.pad_token_id, epoch_callback=stopper)
+
+        history = results['history']
+        metrics = {
+            'train_loss': history[-1]['train_loss'] if history else None,
+            'val_loss': min(logs['val_loss'] for logs in history) if history else None,
+            'train_seconds': results['train_seconds'],
+            'tokens_per_s': results['tokens_per_s'],
+            'peak_memory_mb': results['peak_memory_mb']
+        }
+
+        if stopper.reason and not stopper.converged:
+            return results_for('stopped', metrics, history, stopper.reason)
+
+        # Evaluate the weights behind the reported (minimum) val_loss
+        stopper.restore_best()
+        eval_examples = load_eval_split(config['eval_split'])
+        evaluations = {}
+        for preset in presets:
+            evaluation = evaluate_model(model, tokenizer, eval_examples, preset or 'greedy_eval', verbose=False)
+            evaluations[preset] = {
+                'bleu': evaluation['bleu'],
+                'factual_error_rate': evaluation['factual_error_rate'],
+                'repetition_rate': evaluation['repetition_rate'],
+                'generation_time': evaluation['avg_generation_time']
+            }
+        return results_for('completed', metrics, history, stopper.reason or '', evaluations)
+
+    except Exception as e:
+        return results_for('failed', {}, [], str(e))
+
+
+def run_sweep(trials: List[Dict], sweep_name: str, config: Dict = SWEEP_CONFIG,
+              registry_path: str = REGISTRY_FILE, output_dir: Optional[str] = None) -> List[Dict]:
+    """Run trials in parallel and record every result (including stopped/failed ones)"""
+    config = {**SWEEP_CONFIG, **config}
+    output_dir = output_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runs', f"sweep_{sweep_name}")
+    registry = ResultsRegistry(registry_path)
+
+    done = {trial['name'] for trial in registry.query("sweep = ? AND status != 'failed'", (sweep_name,))}
+    pending = [params for params in trials if trial_name(params) not in done]
+    groups = group_by_training(pending)
+    print(f"Sweep '{sweep_name}': {len(trials)} trials ({len(trials) - len(pending)} already recorded), "
+          f"{len(groups)} training runs, {config['workers']} workers x {config['threads_per_worker']} threads")
+
+    # Tokenize once up front so workers only read the shared token cache
+    from transformers import T5Tokenizer
+    from training_data import tokenize_split
+    tokenizer = T5Tokenizer.from_pretrained(config['model_name'])
+    for split in ('train', config['eval_split']):
+        tokenize_split(tokenizer, split, tokenizer_name=config['model_name'])
+
+    # spawn: workers must not inherit an initialized TensorFlow runtime from the parent
+    context = multiprocessing.get_context('spawn')
+    manager = context.Manager()
+    shared_best = manager.dict(registry.best_val_loss_by_epoch(sweep_name))
+
+    jobs = [{'params': group['params'], 'presets': group['presets'], 'config': config, 'shared_best': shared_best,
+             'output_dir': os.path.join(output_dir, trial_name(group['params']))} for group in groups]
+
+    results = []
+    with context.Pool(config['workers'], initializer=_init_worker,
+                      initargs=(config['threads_per_worker'],)) as pool:
+        for trial_results in pool.imap_unordered(run_trial, jobs):
+            for result in trial_results:
+                name = trial_name(result['params'])
+                registry.record_trial(sweep_name, name, result['params'], result['metrics'],
+                                      status=result['status'], history=result['history'], notes=result['notes'])
+                results.append(result)
+
+                metrics = result['metrics']
+                summary = f"val_loss={metrics['val_loss']:.4f}" if metrics.get('val_loss') is not None else ''
+                if metrics.get('bleu') is not None:
+                    summary += f", BLEU={metrics['bleu']:.4f}"
+                print(f"   [{len(results)}/{len(pending)}] {name}: {result['status']} {summary} {result['notes']}")
+
+    best = registry.best('bleu', sweep_name)
+    if best:
+        print(f"\nBest trial: {best['name']} (BLEU {best['bleu']:.4f})")
+    registry.close()
+    manager.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the climate T5 model")
+    parser.add_argument('--space', default=None, help="JSON file with the search space (default: built-in grid)")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--trials', type=int, default=8, help="Number of random-search trials")
+    parser.add_argument('--name', default=datetime.now().strftime('%Y%m%d_%H%M%S'))
+    parser.add_argument('--workers', type=int, default=SWEEP_CONFIG['workers'])
+    parser.add_argument('--threads-per-worker', type=int, default=SWEEP_CONFIG['threads_per_worker'])
+    parser.add_argument('--model', default=SWEEP_CONFIG['model_name'])
+    parser.add_argument('--db', default=REGISTRY_FILE)
+    args = parser.parse_args()
+
+    search_space = DEFAULT_SEARCH_SPACE
+    if args.space:
+        with open(args.space, 'r', encoding='utf-8') as f:
+            search_space = json.load(f)
+
+    sweep_trials = expand_grid(search_space) if args.mode == 'grid' else sample_random(search_space, args.trials)
+    run_sweep(sweep_trials, args.name,
+              {'workers': args.workers, 'threads_per_worker': args.threads_per_worker, 'model_name': args.model},
+              registry_path=args.db)
@@ -0,0 +1,389 @@
+# =============================================================================
+# T5 FINE-TUNING ENGINE (CPU-FRIENDLY)
+# Gradient accumulation, bfloat16 mixed precision, checkpoint/resume,
+# configurable thread layout, tokens/s and peak memory reporting
+# =============================================================================
+
+import os
+import json
+import time
+import resource
+import argparse
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from training_data import (
+    HUGGING_FACE_MODEL_ID, LABEL_PAD_ID, TokenizedSplit, tokenize_split, build_bucketed_dataset
+)
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runs')
+
+# Defaults from the notebook's CONFIG_EXP4 (the experiment the 4c checkpoint came from)
+TRAINING_CONFIG = {
+    'model_name': HUGGING_FACE_MODEL_ID,
+    'batch_size': 8,                # micro-batch held in memory at once
+    'accumulation_steps': 1,        # effective batch = batch_size x accumulation_steps
+    'learning_rate': 1e-4,
+    'num_epochs': 20,
+    'warmup_steps': 20,
+    'weight_decay': 0.02,
+    'precision': 'float32',         # or 'mixed_bfloat16'
+    'intra_op_threads': 0,          # 0 lets TensorFlow decide
+    'inter_op_threads': 0,
+    'checkpoint_every': 50,         # optimizer steps between mid-epoch checkpoints
+    'max_checkpoints': 3,
+    'seed': 42
+}
+
+
+def configure_threads(intra_op_threads: int = 0, inter_op_threads: int = 0):
+    """Set the TensorFlow thread layout; must run before the first op executes"""
+    import tensorflow as tf
+
+    if intra_op_threads:
+        os.environ['OMP_NUM_THREADS'] = str(intra_op_threads)
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def _keras():
+    """
+    The Keras the HF TF models are built with: tf_keras (Keras 2) when TensorFlow ships
+    Keras 3, so the precision policy and optimizer reach the model layers
+    """
+    try:
+        from transformers.modeling_tf_utils import keras
+    except ImportError:   # transformers before the Keras 3 split only uses tf.keras
+        import tensorflow as tf
+        keras = tf.keras
+    return keras
+
+
+def configure_precision(precision: str = 'float32'):
+    """'mixed_bfloat16' keeps float32 master weights and computes in bfloat16 on CPU"""
+    if precision not in ('float32', 'mixed_bfloat16'):
+        raise ValueError(f"Unsupported precision '{precision}'")
+    _keras().mixed_precision.set_global_policy(precision)
+
+
+def peak_memory_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is in KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _warmup_decay_schedule(learning_rate: float, warmup_steps: int, total_steps: int):
+    """Linear warmup then square-root decay, as in the notebook's lr_schedule"""
+    import tensorflow as tf
+
+    class WarmupDecay(_keras().optimizers.schedules.LearningRateSchedule):
+        def __call__(self, step):
+            step = tf.cast(step, tf.float32)
+            warmup = learning_rate * step / max(warmup_steps, 1)
+            remaining = tf.maximum(float(total_steps) - step, 0.0)
+            decay = learning_rate * tf.sqrt(remaining / max(total_steps - warmup_steps, 1))
+            return tf.where(step < warmup_steps, warmup, decay)
+
+        def get_config(self):
+            return {'learning_rate': learning_rate, 'warmup_steps': warmup_steps, 'total_steps': total_steps}
+
+    return WarmupDecay()
+
+
+def create_optimizer(config: Dict, total_steps: int):
+    """AdamW with the notebook's betas/epsilon and a warmup + decay schedule"""
+    return _keras().optimizers.AdamW(
+        learning_rate=_warmup_decay_schedule(config['learning_rate'], config['warmup_steps'], total_steps),
+        weight_decay=config['weight_decay'],
+        beta_1=0.9,
+        beta_2=0.999,
+        epsilon=1e-7
+    )
+
+
+def _masked_loss(labels, logits):
+    """Mean token cross-entropy over non-padding label positions, computed in float32"""
+    import tensorflow as tf
+
+    mask = tf.cast(tf.not_equal(labels, LABEL_PAD_ID), tf.float32)
+    safe_labels = tf.where(labels == LABEL_PAD_ID, tf.zeros_like(labels), labels)
+    losses = tf.keras.losses.sparse_categorical_crossentropy(
+        safe_labels, tf.cast(logits, tf.float32), from_logits=True
+    )
+    return tf.reduce_sum(losses * mask) / tf.maximum(tf.reduce_sum(mask), 1.0)
+
+
+class GradientAccumulator:
+    """
+    Sums micro-batch gradients into float32 buffers and applies them every
+    `accumulation_steps` micro-batches, so large effective batches fit in memory.
+    """
+
+    def __init__(self, model, optimizer, accumulation_steps: int = 1):
+        import tensorflow as tf
+
+        self.model = model
+        self.optimizer = optimizer
+        self.accumulation_steps = accumulation_steps
+        self.variables = model.trainable_variables
+        self.buffers = [tf.Variable(tf.zeros_like(variable, dtype=tf.float32), trainable=False)
+                        for variable in self.variables]
+        self.micro_step = tf.Variable(0, dtype=tf.int64, trainable=False)
+        # Create optimizer slots up front; they cannot be created inside the traced conditional
+        self.optimizer.build(self.variables)
+
+        signature = {
+            'input_ids': tf.TensorSpec([None, None], tf.int32),
+            'attention_mask': tf.TensorSpec([None, None], tf.int32),
+            'labels': tf.TensorSpec([None, None], tf.int32)
+        }
+        # Dynamic dims avoid one retrace per bucket shape
+        self.train_step = tf.function(self._train_step, input_signature=[signature])
+        self.eval_step = tf.function(self._eval_step, input_signature=[signature])
+
+    def _forward(self, batch, training: bool):
+        outputs = self.model(
+            input_ids=batch['input_ids'],
+            attention_mask=batch['attention_mask'],
+            labels=batch['labels'],
+            training=training,
+            return_dict=True
+        )
+        return _masked_loss(batch['labels'], outputs.logits)
+
+    def _train_step(self, batch):
+        import tensorflow as tf
+
+        with tf.GradientTape() as tape:
+            loss = self._forward(batch, training=True)
+        gradients = tape.gradient(loss, self.variables)
+
+        for buffer, gradient in zip(self.buffers, gradients):
+            if gradient is not None:
+                buffer.assign_add(tf.cast(tf.convert_to_tensor(gradient), tf.float32) / self.accumulation_steps)
+        self.micro_step.assign_add(1)
+
+        if tf.equal(self.micro_step % self.accumulation_steps, 0):
+            self.apply()
+        return loss
+
+    def apply(self):
+        """Apply and reset the accumulated gradients"""
+        import tensorflow as tf
+
+        self.optimizer.apply_gradients(zip([tf.identity(buffer) for buffer in self.buffers], self.variables))
+        for buffer in self.buffers:
+            buffer.assign(tf.zeros_like(buffer))
+
+    def flush(self):
+        """Apply a partially filled window (end of epoch) and realign the micro-step counter"""
+        remainder = int(self.micro_step.numpy()) % self.accumulation_steps
+        if remainder:
+            self.apply()
+            self.micro_step.assign_add(self.accumulation_steps - remainder)
+
+    def _eval_step(self, batch):
+        return self._forward(batch, training=False)
+
+
+def _batch_tokens(batch) -> int:
+    """Real (non-padding) encoder + decoder tokens in a batch"""
+    real_inputs = int(batch['attention_mask'].numpy().sum())
+    real_labels = int((batch['labels'].numpy() != LABEL_PAD_ID).sum())
+    return real_inputs + real_labels
+
+
+def _token_weighted_loss(eval_step: Callable, val_data: TokenizedSplit, batch_size: int,
+                         pad_token_id: int = 0) -> float:
+    dataset = build_bucketed_dataset(val_data, batch_size, pad_token_id, shuffle=False)
+    total_loss = total_tokens = 0.0
+    for batch in dataset:
+        tokens = float((batch['labels'].numpy() != LABEL_PAD_ID).sum())
+        total_loss += float(eval_step(batch)) * tokens
+        total_tokens += tokens
+    return total_loss / max(total_tokens, 1.0)
+
+
+def evaluate_loss(accumulator: GradientAccumulator, val_data: TokenizedSplit, config: Dict,
+                  pad_token_id: int = 0) -> float:
+    """Token-weighted mean validation loss"""
+    return _token_weighted_loss(accumulator.eval_step, val_data, config['batch_size'], pad_token_id)
+
+
+def model_loss(model, val_data: TokenizedSplit, config: Dict = TRAINING_CONFIG, pad_token_id: int = 0) -> float:
+    """The same token-weighted loss for a model that is not being trained (no optimizer state is built)"""
+    import tensorflow as tf
+
+    def eval_step(batch):
+        outputs = model(input_ids=batch['input_ids'], attention_mask=batch['attention_mask'],
+                        labels=batch['labels'], training=False, return_dict=True)
+        return _masked_loss(batch['labels'], outputs.logits)
+
+    signature = {key: tf.TensorSpec([None, None], tf.int32) for key in ('input_ids', 'attention_mask', 'labels')}
+    step = tf.function(eval_step, input_signature=[signature])
+    return _token_weighted_loss(step, val_data, {**TRAINING_CONFIG, **config}['batch_size'], pad_token_id)
+
+
+def train(model, train_data: TokenizedSplit, val_data: Optional[TokenizedSplit], config: Dict,
+          output_dir: str, resume: bool = True, pad_token_id: int = 0,
+          epoch_callback: Optional[Callable[[int, Dict], bool]] = None) -> Dict:
+    """
+    Fine-tune `model` on a pre-tokenized split. Checkpoints (model, optimizer, position)
+    go to `output_dir/checkpoints`; with `resume` the latest one is restored and training
+    continues from the same epoch and batch. `epoch_callback(epoch, logs)` may return
+    False to stop early. Returns the training history and throughput stats.
+    """
+    import tensorflow as tf
+
+    config = {**TRAINING_CONFIG, **config}
+    batches_per_epoch = sum(1 for _ in build_bucketed_dataset(train_data, config['batch_size'],
+                                                               pad_token_id, shuffle=False))
+    total_steps = max(batches_per_epoch * config['num_epochs'] // config['accumulation_steps'], 1)
+
+    optimizer = create_optimizer(config, total_steps)
+    accumulator = GradientAccumulator(model, optimizer, config['accumulation_steps'])
+    epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+    batch_in_epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+
+    checkpoint = tf.train.Checkpoint(model=model, optimizer=optimizer, epoch=epoch,
+                                     batch_in_epoch=batch_in_epoch,
+                                     micro_step=accumulator.micro_step,
+                                     gradient_buffers=accumulator.buffers)
+    manager = tf.train.CheckpointManager(checkpoint, os.path.join(output_dir, 'checkpoints'),
+                                         max_to_keep=config['max_checkpoints'])
+    if resume and manager.latest_checkpoint:
+        checkpoint.restore(manager.latest_checkpoint)
+        print(f"Resumed from {manager.latest_checkpoint} "
+              f"(epoch {int(epoch.numpy()) + 1}, batch {int(batch_in_epoch.numpy())})")
+
+    print(f"Training: {len(train_data)} examples, {batches_per_epoch} batches/epoch, "
+          f"effective batch {config['batch_size'] * config['accumulation_steps']}, "
+          f"{total_steps} optimizer steps, precision {config['precision']}")
+
+    history = []
+    total_tokens = 0
+    train_seconds = 0.0
+
+    while int(epoch.numpy()) < config['num_epochs']:
+        current_epoch = int(epoch.numpy())
+        skip = int(batch_in_epoch.numpy())
+        # Per-epoch seed keeps the batch order reproducible, so a resumed run skips exactly what was done
+        dataset = build_bucketed_dataset(train_data, config['batch_size'], pad_token_id,
+                                         seed=config['seed'] + current_epoch).skip(skip)
+
+        epoch_loss = epoch_batches = epoch_tokens = 0
+        start = time.time()
+        for batch in dataset:
+            epoch_loss += float(accumulator.train_step(batch))
+            epoch_batches += 1
+            epoch_tokens += _batch_tokens(batch)
+            batch_in_epoch.assign_add(1)
+
+            micro_step = int(accumulator.micro_step.numpy())
+            steps_done = micro_step // config['accumulation_steps']
+            if micro_step % config['accumulation_steps'] == 0 and steps_done % config['checkpoint_every'] == 0:
+                manager.save()
+
+        accumulator.flush()
+
+        elapsed = time.time() - start
+        train_seconds += elapsed
+        total_tokens += epoch_tokens
+
+        logs = {
+            'epoch': current_epoch + 1,
+            'train_loss': epoch_loss / max(epoch_batches, 1),
+            'tokens_per_s': epoch_tokens / max(elapsed, 1e-9),
+            'peak_memory_mb': peak_memory_mb(),
+            'seconds': elapsed
+        }
+        if val_data is not None:
+            logs['val_loss'] = evaluate_loss(accumulator, val_data, config, pad_token_id)
+        history.append(logs)
+
+        print(f"   Epoch {logs['epoch']:2d}: train_loss={logs['train_loss']:.4f}"
+              + (f", val_loss={logs['val_loss']:.4f}" if 'val_loss' in logs else "")
+              + f", {logs['tokens_per_s']:.0f} tokens/s, peak {logs['peak_memory_mb']:.0f} MB")
+
+        epoch.assign_add(1)
+        batch_in_epoch.assign(0)
+        manager.save()
+
+        if epoch_callback is not None and epoch_callback(current_epoch, logs) is False:
+            print(f"Stopped early after epoch {current_epoch + 1}")
+            break
+
+    return {
+        'history': history,
+        'tokens_per_s': total_tokens / max(train_seconds, 1e-9),
+        'peak_memory_mb': peak_memory_mb(),
+        'train_seconds': train_seconds,
+        'config': config
+    }
+
+
+def load_model_and_tokenizer(model_name: str):
+    from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model = TFT5ForConditionalGeneration.from_pretrained(model_name)
+    return model, tokenizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tune T5 on the climate QA splits (CPU-friendly)")
+    parser.add_argument('--model', default=TRAINING_CONFIG['model_name'], help="Initial checkpoint path or Hugging Face ID")
+    parser.add_argument('--output-dir', default=os.path.join(OUTPUT_DIR, datetime.now().strftime('%Y%m%d_%H%M%S')))
+    parser.add_argument('--epochs', type=int, default=TRAINING_CONFIG['num_epochs'])
+    parser.add_argument('--batch-size', type=int, default=TRAINING_CONFIG['batch_size'])
+    parser.add_argument('--accumulation-steps', type=int, default=TRAINING_CONFIG['accumulation_steps'])
+    parser.add_argument('--learning-rate', type=float, default=TRAINING_CONFIG['learning_rate'])
+    parser.add_argument('--weight-decay', type=float, default=TRAINING_CONFIG['weight_decay'])
+    parser.add_argument('--warmup-steps', type=int, default=TRAINING_CONFIG['warmup_steps'])
+    parser.add_argument('--precision', choices=['float32', 'mixed_bfloat16'], default=TRAINING_CONFIG['precision'])
+    parser.add_argument('--intra-op-threads', type=int, default=TRAINING_CONFIG['intra_op_threads'])
+    parser.add_argument('--inter-op-threads', type=int, default=TRAINING_CONFIG['inter_op_threads'])
+    parser.add_argument('--checkpoint-every', type=int, default=TRAINING_CONFIG['checkpoint_every'])
+    parser.add_argument('--no-resume', action='store_true', help="Ignore existing checkpoints in the output dir")
+    args = parser.parse_args()
+
+    # Thread layout and precision policy must be set before the model is built
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    configure_precision(args.precision)
+
+    config = {
+        'model_name': args.model,
+        'batch_size': args.batch_size,
+        'accumulation_steps': args.accumulation_steps,
+        'learning_rate': args.learning_rate,
+        'num_epochs': args.epochs,
+        'warmup_steps': args.warmup_steps,
+        'weight_decay': args.weight_decay,
+        'precision': args.precision,
+        'intra_op_threads': args.intra_op_threads,
+        'inter_op_threads': args.inter_op_threads,
+        'checkpoint_every': args.checkpoint_every
+    }
+
+    model, tokenizer = load_model_and_tokenizer(args.model)
+    train_data = tokenize_split(tokenizer, 'train', tokenizer_name=args.model)
+    val_data = tokenize_split(tokenizer, 'val', tokenizer_name=args.model)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    results = train(model, train_data, val_data, config, args.output_dir,
+                    resume=not args.no_resume, pad_token_id=tokenizer.pad_token_id)
+
+    final_dir = os.path.join(args.output_dir, 'final')
+    model.save_pretrained(final_dir)
+    tokenizer.save_pretrained(final_dir)
+    with open(os.path.join(args.output_dir, 'training_results.json'), 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nTRAINING COMPLETE!")
+    print(f"   Throughput: {results['tokens_per_s']:.0f} tokens/s")
+    print(f"   Peak memory: {results['peak_memory_mb']:.0f} MB")
+    print(f"   Model saved to: {final_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# =============================================================================
+# TRAINING INPUT PIPELINE - PRE-TOKENIZED, LENGTH-BUCKETED
+# Tokenize the climate splits once, cache them as memory-mapped arrays and
+# feed training with bucketed, dynamically padded batches
+# =============================================================================
+
+import os
+import csv
+import glob
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+HUGGING_FACE_MODEL_ID = "Climi/Climate-Education-QA-Chatbot"
+
+SPLIT_FILES = {
+    'train': os.path.join(DATASET_DIR, 'climate_train_data.csv'),
+    'val': os.path.join(DATASET_DIR, 'climate_val_data.csv'),
+    'test': os.path.join(DATASET_DIR, 'climate_test_data.csv')
+}
+
+# Sequence lengths from model_architecture.json (task_adaptation)
+DATA_CONFIG = {
+    'max_input_length': 128,
+    'max_target_length': 100,
+    'max_answer_words': 70,
+    'bucket_boundaries': [16, 32, 48, 64, 80, 96],
+    'shuffle_buffer': 1024
+}
+
+LABEL_PAD_ID = -100  # ignored by the HF TF loss, unlike the pad id the notebook used
+
+
+def clean_example(question: str, answer: str, max_answer_words: int = DATA_CONFIG['max_answer_words']) -> Tuple[str, str]:
+    """Same cleaning as the notebook's preprocess_function_enhanced"""
+    question = question.strip()
+    if not question.endswith('?'):
+        question += '?'
+
+    answer = answer.strip()
+    if len(answer.split()) > max_answer_words:
+        answer = '. '.join(answer.split('. ')[:3])
+        if not answer.endswith('.'):
+            answer += '.'
+
+    return f"question: {question}", answer
+
+
+def read_examples(path: str) -> List[Tuple[str, str]]:
+    """(input_text, target_text) pairs from a split CSV"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return [clean_example(row['question'], row['answer']) for row in csv.DictReader(f)]
+
+
+# =============================================================================
+# ON-DISK TOKEN CACHE
+# =============================================================================
+
+def _cache_key(examples: List[Tuple[str, str]], tokenizer_name: str, config: Dict) -> str:
+    digest = hashlib.sha1()
+    digest.update(tokenizer_name.encode('utf-8'))
+    digest.update(json.dumps([config['max_input_length'], config['max_target_length']]).encode('utf-8'))
+    for source, target in examples:
+        digest.update(source.encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(target.encode('utf-8'))
+        digest.update(b'\x01')
+    return digest.hexdigest()[:16]
+
+
+def _write_ragged(directory: str, name: str, sequences: List[List[int]],
+                  prefix: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+    """Store variable-length sequences as one flat token array plus offsets (after `prefix`'s)"""
+    offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(sequence) for sequence in sequences])
+    flat = np.fromiter((token for sequence in sequences for token in sequence),
+                       dtype=np.int32, count=int(offsets[-1]))
+    if prefix is not None:
+        prefix_tokens, prefix_offsets = prefix
+        flat = np.concatenate([np.asarray(prefix_tokens), flat])
+        offsets = np.concatenate([prefix_offsets, prefix_offsets[-1] + offsets[1:]])
+    np.save(os.path.join(directory, f"{name}_tokens.npy"), flat)
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+
+class TokenizedSplit:
+    """Memory-mapped, pre-tokenized split: flat token arrays + offsets for inputs and labels"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.input_tokens = np.load(os.path.join(directory, "inputs_tokens.npy"), mmap_mode='r')
+        self.input_offsets = np.load(os.path.join(directory, "inputs_offsets.npy"))
+        self.label_tokens = np.load(os.path.join(directory, "labels_tokens.npy"), mmap_mode='r')
+        self.label_offsets = np.load(os.path.join(directory, "labels_offsets.npy"))
+        with open(os.path.join(directory, "manifest.json"), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.input_offsets) - 1
+
+    @property
+    def input_lengths(self) -> np.ndarray:
+        return np.diff(self.input_offsets)
+
+    @property
+    def label_lengths(self) -> np.ndarray:
+        return np.diff(self.label_offsets)
+
+    def example(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        inputs = self.input_tokens[self.input_offsets[index]:self.input_offsets[index + 1]]
+        labels = self.label_tokens[self.label_offsets[index]:self.label_offsets[index + 1]]
+        return np.asarray(inputs), np.asarray(labels)
+
+
+def _prefix_cache(split: str, examples: List[Tuple[str, str]], tokenizer_name: str, config: Dict,
+                  cache_dir: str) -> Optional[TokenizedSplit]:
+    """
+    Largest cached tokenization of a leading slice of `examples` (split files built
+    incrementally only gain rows at the end, so their old cache is such a prefix)
+    """
+    candidates = []
+    for manifest_path in glob.glob(os.path.join(cache_dir, f"{split}_*", "manifest.json")):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('tokenizer') == tokenizer_name and \
+                manifest.get('max_input_length') == config['max_input_length'] and \
+                manifest.get('max_target_length') == config['max_target_length'] and \
+                0 < manifest.get('examples', 0) < len(examples):
+            candidates.append((manifest['examples'], os.path.dirname(manifest_path)))
+    for count, directory in sorted(candidates, reverse=True):
+        if os.path.basename(directory) == f"{split}_{_cache_key(examples[:count], tokenizer_name, config)}":
+            return TokenizedSplit(directory)
+    return None
+
+
+def tokenize_split(tokenizer, split: str = 'train', path: Optional[str] = None,
+                   tokenizer_name: str = HUGGING_FACE_MODEL_ID, config: Dict = DATA_CONFIG,
+                   cache_dir: str = CACHE_DIR, examples: Optional[List[Tuple[str, str]]] = None) -> TokenizedSplit:
+    """
+    Tokenize a split once (no padding) and cache it; later calls reuse the cache
+    as long as the CSV content, tokenizer and length limits are unchanged. If rows were
+    only appended since a cached version, just the new rows are tokenized.
+    """
+    examples = examples if examples is not None else read_examples(path or SPLIT_FILES[split])
+    directory = os.path.join(cache_dir, f"{split}_{_cache_key(examples, tokenizer_name, config)}")
+
+    if os.path.exists(os.path.join(directory, "manifest.json")):
+        return TokenizedSplit(directory)
+
+    prefix = _prefix_cache(split, examples, tokenizer_name, config, cache_dir)
+    start = len(prefix) if prefix is not None else 0
+
+    os.makedirs(directory, exist_ok=True)
+    sources = [source for source, _ in examples[start:]]
+    targets = [target for _, target in examples[start:]]
+
+    inputs = tokenizer(sources, max_length=config['max_input_length'], truncation=True)['input_ids']
+    labels = tokenizer(text_target=targets, max_length=config['max_target_length'], truncation=True)['input_ids']
+
+    _write_ragged(directory, "inputs", inputs, (prefix.input_tokens, prefix.input_offsets) if prefix else None)
+    _write_ragged(directory, "labels", labels, (prefix.label_tokens, prefix.label_offsets) if prefix else None)
+    with open(os.path.join(directory, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump({'split': split, 'examples': len(examples), 'tokenizer': tokenizer_name,
+                   'max_input_length': config['max_input_length'],
+                   'max_target_length': config['max_target_length']}, f, indent=2)
+
+    print(f"Tokenized {len(examples) - start} {split} examples"
+          f"{f' (appended to {start} cached)' if start else ''} -> {directory}")
+    return TokenizedSplit(directory)
+
+
+# =============================================================================
+# tf.data PIPELINES
+# =============================================================================
+
+def build_bucketed_dataset(split_data: TokenizedSplit, batch_size: int = 8, pad_token_id: int = 0,
+                           shuffle: bool = True, seed: int = 42, config: Dict = DATA_CONFIG):
+    """
+    Cached token dataset -> shuffle -> bucket by length -> pad per batch -> prefetch.
+    Batches only pad up to their longest member, so little compute is spent on padding.
+    """
+    import tensorflow as tf
+
+    inputs = tf.RaggedTensor.from_row_splits(np.asarray(split_data.input_tokens), split_data.input_offsets)
+    labels = tf.RaggedTensor.from_row_splits(np.asarray(split_data.label_tokens), split_data.label_offsets)
+
+    dataset = tf.data.Dataset.from_tensor_slices({'input_ids': inputs, 'labels': labels})
+    dataset = dataset.map(lambda example: {
+        'input_ids': example['input_ids'],
+        'attention_mask': tf.ones_like(example['input_ids']),
+        'labels': example['labels']
+    }, num_parallel_calls=tf.data.AUTOTUNE).cache()
+
+    if shuffle:
+        dataset = dataset.shuffle(min(config['shuffle_buffer'], len(split_data)), seed=seed,
+                                  reshuffle_each_iteration=True)
+
+    boundaries = config['bucket_boundaries']
+    dataset = dataset.bucket_by_sequence_length(
+        element_length_func=lambda example: tf.maximum(tf.shape(example['input_ids'])[0],
+                                                        tf.shape(example['labels'])[0]),
+        bucket_boundaries=boundaries,
+        bucket_batch_sizes=[batch_size] * (len(boundaries) + 1),
+        padding_values={'input_ids': pad_token_id, 'attention_mask': 0, 'labels': LABEL_PAD_ID}
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def build_fixed_padding_dataset(tokenizer, examples: List[Tuple[str, str]], batch_size: int = 8,
+                                config: Dict = DATA_CONFIG):
+    """The notebook's original pipeline: pad everything to the max length, from_tensor_slices"""
+    import tensorflow as tf
+
+    sources = [source for source, _ in examples]
+    targets = [target for _, target in examples]
+    model_inputs = tokenizer(sources, max_length=config['max_input_length'], truncation=True,
+                             padding='max_length', return_tensors='tf')
+    labels = tokenizer(text_target=targets, max_length=config['max_target_length'], truncation=True,
+                       padding='max_length', return_tensors='tf')
+    model_inputs['labels'] = labels['input_ids']
+    return tf.data.Dataset.from_tensor_slices(dict(model_inputs)).batch(batch_size)
+
+
+def measure_pipeline(dataset, pad_token_id: int = 0) -> Dict:
+    """One pass over a dataset: padding ratio and examples/s"""
+    examples = real_tokens = total_tokens = 0
+    start = time.time()
+
+    for batch in dataset:
+        input_ids = batch['input_ids'].numpy()
+        labels = batch['labels'].numpy()
+        examples += input_ids.shape[0]
+        total_tokens += input_ids.size + labels.size
+        real_tokens += int(batch['attention_mask'].numpy().sum())
+        real_tokens += int(((labels != LABEL_PAD_ID) & (labels != pad_token_id)).sum())
+
+    elapsed = time.time() - start
+    return {
+        'examples': examples,
+        'padding_ratio': 1.0 - real_tokens / max(total_tokens, 1),
+        'examples_per_s': examples / max(elapsed, 1e-9),
+        'seconds': elapsed
+    }
+
+
+def compare_pipelines(tokenizer, split: str = 'train', batch_size: int = 8,
+                      tokenizer_name: str = HUGGING_FACE_MODEL_ID) -> Dict:
+    """Report padding ratio and examples/s for the fixed-padding and bucketed pipelines"""
+    examples = read_examples(SPLIT_FILES[split])
+
+    start = time.time()
+    fixed = measure_pipeline(build_fixed_padding_dataset(tokenizer, examples, batch_size), tokenizer.pad_token_id)
+    fixed['seconds_including_tokenization'] = time.time() - start
+
+    start = time.time()
+    split_data = tokenize_split(tokenizer, split, tokenizer_name=tokenizer_name, examples=examples)
+    bucketed_dataset = build_bucketed_dataset(split_data, batch_size, tokenizer.pad_token_id)
+    bucketed = measure_pipeline(bucketed_dataset, tokenizer.pad_token_id)
+    bucketed['seconds_including_tokenization'] = time.time() - start
+    # Second epoch is served from the tf.data cache
+    bucketed_cached = measure_pipeline(bucketed_dataset, tokenizer.pad_token_id)
+
+    print(f"\nINPUT PIPELINE COMPARISON ({split}, batch size {batch_size}):")
+    print(f"   Fixed padding:  padding ratio {fixed['padding_ratio']:.1%}, "
+          f"{fixed['examples_per_s']:.0f} examples/s")
+    print(f"   Bucketed:       padding ratio {bucketed['padding_ratio']:.1%}, "
+          f"{bucketed['examples_per_s']:.0f} examples/s (first epoch)")
+    print(f"   Bucketed cache: {bucketed_cached['examples_per_s']:.0f} examples/s (later epochs)")
+
+    return {'fixed_padding': fixed, 'bucketed': bucketed, 'bucketed_cached': bucketed_cached}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-tokenize climate splits and compare input pipelines")
+    parser.add_argument('--model', default=HUGGING_FACE_MODEL_ID, help="Tokenizer path or Hugging Face ID")
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    from transformers import T5Tokenizer
+    tokenizer = T5Tokenizer.from_pretrained(args.model)
+
+    for split_name in SPLIT_FILES:
+        tokenize_split(tokenizer, split_name, tokenizer_name=args.model)
+    compare_pipelines(tokenizer, 'train', args.batch_size, tokenizer_name=args.model)
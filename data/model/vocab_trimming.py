@@ -0,0 +1,212 @@
+# =============================================================================
+# DOMAIN VOCABULARY TRIMMING
+# Measure SentencePiece token usage on climate data + logged traffic, keep only
+# the used rows of the shared embedding / LM head, ship a remapping tokenizer
+# =============================================================================
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'climate_chatbot_BEST_exp4c'))
+from trimmed_vocab import RemappingTokenizer
+
+from training_data import HUGGING_FACE_MODEL_ID, DATASET_DIR
+from evaluation import generate_batch
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(MODEL_DIR, '..', '..', 'outputs', 'ayikabot_logs')
+
+TRIM_CONFIG = {
+    'min_count': 1,              # tokens seen fewer times than this are dropped
+    'keep_single_chars': True,   # always keep one-character pieces (punctuation, digits, letters)
+    'generation_presets': ['greedy_eval', 'optimal'],
+    'samples_per_question': 2    # sampled generations per question for the 'optimal' preset
+}
+
+
+def collect_domain_texts(log_paths: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """Questions and answers from every dataset CSV plus logged questions/responses"""
+    texts = {'questions': [], 'answers': []}
+    for path in sorted(glob.glob(os.path.join(DATASET_DIR, '*.csv'))):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                texts['questions'].append(f"question: {row['question'].strip()}")
+                texts['answers'].append(row['answer'])
+
+    from continual_training import read_logged_interactions
+    log_paths = log_paths if log_paths is not None else sorted(glob.glob(os.path.join(LOG_DIR, 'interactions_*.json')))
+    for item in read_logged_interactions(log_paths):
+        texts['questions'].append(f"question: {item['question'].strip()}")
+        texts['answers'].append(item['answer'])
+    return texts
+
+
+def measure_token_usage(tokenizer, texts: List[str], vocab_size: int,
+                        counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """Per-id token counts over `texts` (added to `counts` if given)"""
+    counts = counts if counts is not None else np.zeros(vocab_size, dtype=np.int64)
+    for ids in tokenizer(texts)['input_ids']:
+        np.add.at(counts, np.asarray(ids), 1)
+    return counts
+
+
+def measure_generation_usage(model, tokenizer, questions: List[str], counts: np.ndarray,
+                             config: Dict = TRIM_CONFIG, batch_size: int = 8) -> np.ndarray:
+    """
+    Count tokens the model itself emits for the domain questions: the trimmed head
+    reproduces full-vocabulary outputs only if these are all kept.
+    """
+    for preset in config['generation_presets']:
+        repeats = 1 if preset == 'greedy_eval' else config['samples_per_question']
+        for _ in range(repeats):
+            for offset in range(0, len(questions), batch_size):
+                batch = [question[len('question: '):] for question in questions[offset:offset + batch_size]]
+                answers = generate_batch(model, tokenizer, batch, preset)
+                counts = measure_token_usage(tokenizer, answers, len(counts), counts)
+    return counts
+
+
+def select_vocabulary(tokenizer, counts: np.ndarray, config: Dict = TRIM_CONFIG) -> List[int]:
+    """Ids to keep: special tokens, used tokens and (optionally) every one-character piece"""
+    keep = counts >= config['min_count']
+    keep[[tokenizer.pad_token_id, tokenizer.eos_token_id, tokenizer.unk_token_id]] = True
+
+    if config['keep_single_chars']:
+        pieces = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+        for token_id, piece in enumerate(pieces):
+            if piece is not None and len(piece.lstrip('▁')) <= 1:
+                keep[token_id] = True
+
+    # Ids beyond the tokenizer (embedding padding rows 32100-32127) are never produced
+    keep[len(tokenizer):] = False
+    return np.nonzero(keep)[0].tolist()
+
+
+def trim_model(model, kept_ids: List[int]):
+    """New checkpoint whose shared embedding (and LM head, if untied) keep only `kept_ids`"""
+    import tensorflow as tf
+    from transformers import T5Config, TFT5ForConditionalGeneration
+
+    config = T5Config.from_dict({**model.config.to_dict(), 'vocab_size': len(kept_ids)})
+    trimmed = TFT5ForConditionalGeneration(config)
+    dummy = tf.constant([[0, 1]], dtype=tf.int32)
+    trimmed(input_ids=dummy, decoder_input_ids=dummy, training=False)
+
+    index = np.asarray(kept_ids)
+    original_vocab = model.config.vocab_size
+    for target, source in zip(trimmed.weights, model.weights):
+        value = source.numpy()
+        if value.shape != tuple(target.shape):
+            # Vocabulary-sized matrices: shared embedding (vocab, d_model), untied lm_head (d_model, vocab)
+            axis = value.shape.index(original_vocab)
+            value = np.take(value, index, axis=axis)
+        target.assign(value)
+    return trimmed
+
+
+def lm_head_benchmark(d_model: int, vocab_sizes: List[int], steps: int = 200) -> Dict[int, float]:
+    """Milliseconds per single-row LM-head matmul + softmax for each vocabulary size"""
+    import tensorflow as tf
+
+    timings = {}
+    hidden = tf.random.normal([1, d_model])
+    for vocab_size in vocab_sizes:
+        weights = tf.random.normal([vocab_size, d_model])
+        step = tf.function(lambda h, w=weights: tf.nn.softmax(tf.matmul(h, w, transpose_b=True)))
+        step(hidden)
+        start = time.time()
+        for _ in range(steps):
+            step(hidden)
+        timings[vocab_size] = (time.time() - start) / steps * 1000.0
+    return timings
+
+
+def verify_trimmed(model, tokenizer, trimmed, trimmed_tokenizer, questions: List[str],
+                   batch_size: int = 8) -> Dict:
+    """Greedy outputs of full and trimmed models must match on in-domain questions"""
+    mismatches = []
+    full_time = trimmed_time = 0.0
+    for offset in range(0, len(questions), batch_size):
+        batch = questions[offset:offset + batch_size]
+        start = time.time()
+        full = generate_batch(model, tokenizer, batch, 'greedy_eval')
+        full_time += time.time() - start
+        start = time.time()
+        reduced = generate_batch(trimmed, trimmed_tokenizer, batch, 'greedy_eval')
+        trimmed_time += time.time() - start
+        mismatches.extend({'question': question, 'full': a, 'trimmed': b}
+                          for question, a, b in zip(batch, full, reduced) if a != b)
+
+    return {
+        'questions': len(questions),
+        'identical': len(questions) - len(mismatches),
+        'mismatches': mismatches,
+        'full_generation_s': full_time,
+        'trimmed_generation_s': trimmed_time
+    }
+
+
+def run_trimming(model_name: str = HUGGING_FACE_MODEL_ID, output_dir: Optional[str] = None,
+                 config: Dict = TRIM_CONFIG) -> Dict:
+    from transformers import T5Tokenizer, TFT5ForConditionalGeneration
+
+    output_dir = output_dir or os.path.join(MODEL_DIR, 'runs', 'trimmed_vocab')
+    tokenizer = T5Tokenizer.from_pretrained(model_name)
+    model = TFT5ForConditionalGeneration.from_pretrained(model_name)
+
+    texts = collect_domain_texts()
+    counts = measure_token_usage(tokenizer, texts['questions'] + texts['answers'], model.config.vocab_size)
+    print(f"Reference texts use {int((counts > 0).sum()):,} distinct tokens")
+    counts = measure_generation_usage(model, tokenizer, texts['questions'], counts, config)
+    kept_ids = select_vocabulary(tokenizer, counts, config)
+    print(f"Keeping {len(kept_ids):,} of {model.config.vocab_size:,} vocabulary rows "
+          f"({len(kept_ids) / model.config.vocab_size:.1%})")
+
+    trimmed = trim_model(model, kept_ids)
+    trimmed_tokenizer = RemappingTokenizer(tokenizer, kept_ids)
+
+    questions = sorted({question[len('question: '):] for question in texts['questions']})
+    verification = verify_trimmed(model, tokenizer, trimmed, trimmed_tokenizer, questions)
+    timings = lm_head_benchmark(model.config.d_model, [model.config.vocab_size, len(kept_ids)])
+
+    report = {
+        'original_vocab_size': model.config.vocab_size,
+        'trimmed_vocab_size': len(kept_ids),
+        'embedding_mb_saved': (model.config.vocab_size - len(kept_ids)) * model.config.d_model * 4 / (1024 ** 2),
+        'lm_head_ms': {'full': timings[model.config.vocab_size], 'trimmed': timings[len(kept_ids)]},
+        'identical_outputs': f"{verification['identical']}/{verification['questions']}",
+        'generation_s': {'full': verification['full_generation_s'], 'trimmed': verification['trimmed_generation_s']},
+        'mismatches': verification['mismatches']
+    }
+
+    trimmed.save_pretrained(output_dir)
+    trimmed_tokenizer.save_pretrained(output_dir, metadata={'source_model': model_name,
+                                                            'original_vocab_size': model.config.vocab_size})
+    with open(os.path.join(output_dir, 'trim_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nVOCABULARY TRIMMING REPORT:")
+    print(f"   Vocabulary: {report['original_vocab_size']:,} -> {report['trimmed_vocab_size']:,}")
+    print(f"   Embedding memory saved: {report['embedding_mb_saved']:.1f} MB")
+    print(f"   LM head + softmax per step: {report['lm_head_ms']['full']:.3f} ms -> "
+          f"{report['lm_head_ms']['trimmed']:.3f} ms")
+    print(f"   Identical greedy outputs: {report['identical_outputs']}")
+    print(f"   Trimmed checkpoint: {output_dir}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trim the T5 vocabulary to the climate domain")
+    parser.add_argument('--model', default=HUGGING_FACE_MODEL_ID)
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--min-count', type=int, default=TRIM_CONFIG['min_count'])
+    args = parser.parse_args()
+
+    run_trimming(args.model, args.output_dir, {**TRIM_CONFIG, 'min_count': args.min_count})
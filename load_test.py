@@ -0,0 +1,292 @@
+# =============================================================================
+# LOAD TEST
+# Replay logged questions (or a synthetic mix with the logged response_type
+# distribution) as Poisson arrivals against the in-process AyikaBot or an HTTP
+# endpoint, with bounded concurrency and load shedding; reports throughput,
+# latency percentiles, error/shed rates and cache-hit rates over time
+# =============================================================================
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(ROOT_DIR, 'outputs', 'ayikabot_logs')
+MODEL_DIR = os.path.join(ROOT_DIR, 'data', 'climate_chatbot_BEST_exp4c')
+DATASET_FILE = os.path.join(ROOT_DIR, 'data', 'dataset', 'climate_test_data.csv')
+
+LOAD_CONFIG = {
+    'rate': 2.0,                 # mean arrivals per second (Poisson)
+    'duration': 60.0,            # seconds of arrivals
+    'concurrency': 4,            # requests served at once
+    'max_queue': 16,             # arrivals waiting for a slot; later ones are shed
+    'window': 10.0,              # seconds per row of the over-time table
+    'timeout': 30.0,             # HTTP request timeout
+    'seed': 0
+}
+
+CACHE_SOURCES = {'answer_store', 'semantic_cache'}
+PERCENTILES = [50, 90, 95, 99]
+
+# Questions for the non-climate response types of a synthetic mix
+SYNTHETIC_QUESTIONS = {
+    'greeting': ["hi", "hello", "hey there", "good morning", "hello AyikaBot"],
+    'compliment': ["thanks", "great answer", "thank you so much", "nice, that helps"],
+    'redirect': ["How do I cook pasta?", "Who won the football match?", "What is the best smartphone?",
+                 "Recommend a movie for tonight", "How do I invest in stocks?", "pasta"]
+}
+
+
+# =============================================================================
+# QUESTION STREAMS
+# =============================================================================
+
+def logged_questions(paths: List[str]) -> List[Tuple[str, str]]:
+    """(question, logged response_type) of every interaction in the JSON-lines logs, in log order"""
+    questions = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    questions.append((entry.get('user_question', ''), entry.get('response_type', 'unknown')))
+    return [(question, kind) for question, kind in questions if question.strip()]
+
+
+def synthetic_questions(count: int, distribution: Dict[str, float], seed: int = 0,
+                        dataset_file: str = DATASET_FILE) -> List[Tuple[str, str]]:
+    """`count` questions whose response types follow `distribution`; climate ones come from the dataset"""
+    with open(dataset_file, 'r', encoding='utf-8', newline='') as f:
+        climate = [row['question'] for row in csv.DictReader(f)]
+    pools = dict(SYNTHETIC_QUESTIONS, climate_answer=climate)
+    kinds = [kind for kind in distribution if kind in pools]
+    rng = random.Random(seed)
+    chosen = rng.choices(kinds, weights=[distribution[kind] for kind in kinds], k=count)
+    return [(rng.choice(pools[kind]), kind) for kind in chosen]
+
+
+def arrival_times(count: int, rate: float, seed: int = 0) -> np.ndarray:
+    """Offsets (seconds) of a Poisson arrival process"""
+    return np.cumsum(np.random.default_rng(seed).exponential(1.0 / rate, count))
+
+
+# =============================================================================
+# TARGETS
+# =============================================================================
+
+class InProcessTarget:
+    """
+    AyikaBot in this process, called from every load thread at once: each request carries
+    its own length budget, so concurrent generations do not interfere.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def __call__(self, question: str) -> Dict:
+        _, metadata = self.bot.respond(question)
+        return metadata
+
+
+class HttpTarget:
+    """POST {"question": ...} as JSON; response_type/answer_source are read from a JSON reply if present"""
+
+    def __init__(self, url: str, timeout: float = LOAD_CONFIG['timeout']):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, question: str) -> Dict:
+        request = urllib.request.Request(self.url, data=json.dumps({'question': question}).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+        try:
+            reply = json.loads(body)
+        except ValueError:
+            return {}
+        metadata = reply.get('metadata', reply) if isinstance(reply, dict) else {}
+        return {key: metadata.get(key) for key in ('response_type', 'answer_source') if key in metadata}
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+def run_load(target, questions: List[Tuple[str, str]], config: Dict = LOAD_CONFIG) -> List[Dict]:
+    """
+    Open-loop replay: arrivals follow their schedule whatever the response times. At most
+    `concurrency` requests run and `max_queue` wait; an arrival beyond that is shed.
+    Latency runs from the scheduled arrival, so it includes queueing.
+    """
+    config = {**LOAD_CONFIG, **config}
+    offsets = arrival_times(len(questions), config['rate'], config['seed'])
+    keep = offsets < config['duration']
+    results, lock = [], threading.Lock()
+    pending = [0]   # running + waiting
+
+    def serve(question, kind, arrival):
+        started = time.perf_counter()
+        record = {'arrival': arrival - t0, 'logged_type': kind, 'wait': started - arrival}
+        try:
+            metadata = target(question)
+            record.update(status='ok', response_type=metadata.get('response_type'),
+                          answer_source=metadata.get('answer_source'))
+            if metadata.get('response_type') == 'error':
+                record['status'] = 'error'
+        except Exception as e:
+            record.update(status='error', error=f"{type(e).__name__}: {e}")
+        finished = time.perf_counter()
+        record.update(service=finished - started, latency=finished - arrival, finished=finished - t0)
+        with lock:
+            pending[0] -= 1
+            results.append(record)
+
+    with ThreadPoolExecutor(max_workers=config['concurrency']) as executor:
+        t0 = time.perf_counter()
+        for (question, kind), offset in zip((q for q, k in zip(questions, keep) if k), offsets[keep]):
+            delay = t0 + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with lock:
+                if pending[0] >= config['concurrency'] + config['max_queue']:
+                    results.append({'arrival': float(offset), 'logged_type': kind, 'status': 'shed'})
+                    continue
+                pending[0] += 1
+            executor.submit(serve, question, kind, t0 + offset)
+    return sorted(results, key=lambda record: record['arrival'])
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    return {f"p{p}": float(value) for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def summarize(results: List[Dict], config: Dict = LOAD_CONFIG) -> Dict:
+    """Overall figures plus one row per time window (by arrival)"""
+    config = {**LOAD_CONFIG, **config}
+    served = [record for record in results if record['status'] != 'shed']
+    ok = [record for record in served if record['status'] == 'ok']
+    span = max((record['finished'] for record in served), default=0.0)
+    climate = [record for record in ok if record.get('response_type') == 'climate_answer']
+
+    def cache_rate(records):
+        climate_records = [record for record in records if record.get('response_type') == 'climate_answer']
+        if not climate_records:
+            return None
+        return sum(record.get('answer_source') in CACHE_SOURCES for record in climate_records) / len(climate_records)
+
+    windows = []
+    for start in np.arange(0.0, max((record['arrival'] for record in results), default=0.0) + 1e-9,
+                           config['window']):
+        arrived = [record for record in results if start <= record['arrival'] < start + config['window']]
+        window_ok = [record for record in arrived if record['status'] == 'ok']
+        windows.append({
+            'start': float(start), 'arrivals': len(arrived),
+            'completed_per_s': len(window_ok) / config['window'],
+            'p95': _percentiles([record['latency'] for record in window_ok])['p95'],
+            'errors': sum(record['status'] == 'error' for record in arrived),
+            'shed': sum(record['status'] == 'shed' for record in arrived),
+            'cache_hit_rate': cache_rate(window_ok)
+        })
+
+    return {
+        'requests': len(results),
+        'completed': len(ok),
+        'throughput_per_s': len(ok) / span if span else 0.0,
+        'latency': _percentiles([record['latency'] for record in ok]),
+        'service_time': _percentiles([record['service'] for record in ok]),
+        'climate_latency': _percentiles([record['latency'] for record in climate]),
+        'error_rate': (len(served) - len(ok)) / len(results) if results else 0.0,
+        'shed_rate': (len(results) - len(served)) / len(results) if results else 0.0,
+        'cache_hit_rate': cache_rate(ok),
+        'answer_sources': dict(Counter(record.get('answer_source') or 'none' for record in climate)),
+        'response_types': dict(Counter(record.get('response_type') or 'unknown' for record in ok)),
+        'windows': windows
+    }
+
+
+def print_summary(summary: Dict, config: Dict = LOAD_CONFIG):
+    config = {**LOAD_CONFIG, **config}
+
+    def fmt(value):
+        return '-' if value is None else f"{value:.3f}"
+
+    print(f"\nLOAD TEST ({config['rate']:g} req/s Poisson, concurrency {config['concurrency']}, "
+          f"queue {config['max_queue']}):")
+    print(f"   Requests: {summary['requests']}, completed {summary['completed']}, "
+          f"throughput {summary['throughput_per_s']:.2f}/s")
+    cache = summary['cache_hit_rate']
+    print(f"   Errors: {summary['error_rate']:.1%}, shed: {summary['shed_rate']:.1%}, "
+          f"cache hits: {'-' if cache is None else f'{cache:.1%}'}")
+    for name in ('latency', 'service_time', 'climate_latency'):
+        print(f"   {name:<16} " + '  '.join(f"{key} {fmt(value)}s" for key, value in summary[name].items()))
+    print(f"   Response types: {summary['response_types']}")
+
+    print(f"\n   {'Window':<8} {'Arrivals':>8} {'Done/s':>7} {'p95':>8} {'Errors':>7} {'Shed':>5} {'Cache':>6}")
+    for window in summary['windows']:
+        cache = '-' if window['cache_hit_rate'] is None else f"{window['cache_hit_rate']:.0%}"
+        print(f"   {window['start']:<8.0f} {window['arrivals']:>8} {window['completed_per_s']:>7.2f} "
+              f"{fmt(window['p95']):>8} {window['errors']:>7} {window['shed']:>5} {cache:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay AyikaBot traffic at a configurable rate and concurrency")
+    parser.add_argument('--target', default='inprocess', help="'inprocess' or the URL of an HTTP endpoint")
+    parser.add_argument('--model-path', default=MODEL_DIR)
+    parser.add_argument('--backend', choices=['tf', 'numpy'], default='tf')
+    parser.add_argument('--semantic-cache', action='store_true', help="Enable the in-process semantic cache")
+    parser.add_argument('--logs', nargs='*', default=None,
+                        help="Interaction logs to replay (default: outputs/ayikabot_logs/interactions_*.json)")
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="Generate N questions with the logs' response_type mix instead of replaying them")
+    parser.add_argument('--repeat', type=int, default=1, help="Replay the logged stream this many times")
+    parser.add_argument('--rate', type=float, default=LOAD_CONFIG['rate'])
+    parser.add_argument('--duration', type=float, default=LOAD_CONFIG['duration'])
+    parser.add_argument('--concurrency', type=int, default=LOAD_CONFIG['concurrency'])
+    parser.add_argument('--max-queue', type=int, default=LOAD_CONFIG['max_queue'])
+    parser.add_argument('--window', type=float, default=LOAD_CONFIG['window'])
+    parser.add_argument('--seed', type=int, default=LOAD_CONFIG['seed'])
+    parser.add_argument('--output', default=None, help="Write the summary and per-request records as JSON")
+    args = parser.parse_args()
+
+    config = {'rate': args.rate, 'duration': args.duration, 'concurrency': args.concurrency,
+              'max_queue': args.max_queue, 'window': args.window, 'seed': args.seed}
+    logged = logged_questions(args.logs if args.logs else sorted(glob.glob(os.path.join(LOG_DIR, 'interactions_*.json'))))
+    if args.synthetic:
+        mix = Counter(kind for _, kind in logged) or Counter(climate_answer=1)
+        questions = synthetic_questions(args.synthetic, {kind: count / sum(mix.values()) for kind, count in mix.items()},
+                                        args.seed)
+    else:
+        questions = logged * args.repeat
+    # Enough questions for the whole duration; the stream wraps around if it is short
+    needed = int(args.rate * args.duration * 1.5) + 10
+    questions = (questions * (needed // max(len(questions), 1) + 1))[:needed]
+
+    if args.target == 'inprocess':
+        sys.path.append(MODEL_DIR)
+        from ayikabot_complete_pipeline import AyikaBot
+        target = InProcessTarget(AyikaBot(args.model_path, backend=args.backend,
+                                          use_semantic_cache=args.semantic_cache))
+    else:
+        target = HttpTarget(args.target)
+
+    print(f"Replaying {'synthetic' if args.synthetic else 'logged'} questions for {args.duration:g}s...")
+    results = run_load(target, questions, config)
+    summary = summarize(results, config)
+    print_summary(summary, config)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'target': args.target, 'summary': summary, 'requests': results}, f, indent=2)
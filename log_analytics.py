@@ -0,0 +1,386 @@
+# =============================================================================
+# LOG ANALYTICS
+# Incrementally convert outputs/ayikabot_logs interaction and session-summary
+# logs into date-partitioned Parquet, and query latency percentiles, response
+# type mix, rejection rates and top questions over any date range
+# =============================================================================
+
+import os
+import re
+import csv
+import glob
+import json
+import shutil
+import tempfile
+import argparse
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow.fs import LocalFileSystem
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(ROOT_DIR, 'outputs', 'ayikabot_logs')
+WAREHOUSE_DIR = os.path.join(ROOT_DIR, 'outputs', 'log_warehouse')
+STATE_FILE = "_ingested.json"
+
+INTERACTION_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('session_id', pa.string()),
+    ('user_question', pa.string()),
+    ('bot_response', pa.string()),
+    ('response_type', pa.string()),
+    ('is_climate_related', pa.bool_()),
+    ('confidence_score', pa.float64()),
+    ('detection_reason', pa.string()),
+    ('generation_time', pa.float64()),
+    ('question_length', pa.int32()),
+    ('response_length', pa.int32())
+])
+
+SUMMARY_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('session_id', pa.string()),
+    ('total_questions', pa.int32()),
+    ('climate_questions', pa.int32()),
+    ('rejected_questions', pa.int32()),
+    ('total_time', pa.float64()),
+    ('avg_response_time', pa.float64()),
+    ('session_duration', pa.int32()),
+    ('engagement_score', pa.float64())
+])
+
+TABLES = {
+    'interactions': {'pattern': 'interactions_*', 'schema': INTERACTION_SCHEMA},
+    'session_summaries': {'pattern': 'session_summaries_*', 'schema': SUMMARY_SCHEMA}
+}
+
+# Field names of the Firestore documents that differ from the local logs
+FIELD_ALIASES = {'session_duration_interactions': 'session_duration'}
+
+# The bot declined the question: off-topic topic detected ('rejected') or not climate-related ('redirect')
+REJECTED_TYPES = ['rejected', 'redirect']
+PERCENTILES = [0.5, 0.9, 0.95, 0.99]
+
+
+# =============================================================================
+# INGESTION
+# =============================================================================
+
+def log_files(log_dir: str, pattern: str) -> List[str]:
+    """Log files of one table: JSON-lines files, and CSVs only where no JSON copy exists"""
+    files = sorted(glob.glob(os.path.join(log_dir, pattern + '.json')))
+    stems = {os.path.splitext(path)[0] for path in files}
+    files += [path for path in sorted(glob.glob(os.path.join(log_dir, pattern + '.csv')))
+              if os.path.splitext(path)[0] not in stems]
+    return files
+
+
+def read_new_rows(path: str, offset: int) -> Tuple[List[Dict], int]:
+    """Rows appended to a log since byte `offset`, and the offset after the last complete row"""
+    rows = []
+    with open(path, 'rb') as f:
+        if path.endswith('.csv'):
+            header = f.readline()
+            if offset == 0:
+                offset = f.tell()
+            f.seek(offset)
+            data = f.read()
+            end = data.rfind(b'\n') + 1   # a partially written last row waits for the next run
+            lines = (header + data[:end]).decode('utf-8').splitlines()
+            rows = list(csv.DictReader(lines))
+        else:
+            f.seek(offset)
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            rows = [json.loads(line) for line in data[:end].decode('utf-8').splitlines() if line.strip()]
+    return rows, offset + end
+
+
+def _convert(value, field: pa.Field):
+    if value is None or value == '':
+        return None
+    if pa.types.is_timestamp(field.type):
+        return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    if pa.types.is_boolean(field.type):
+        return value if isinstance(value, bool) else str(value) == 'True'
+    if pa.types.is_integer(field.type):
+        return int(float(value))
+    if pa.types.is_floating(field.type):
+        return float(value)
+    return str(value)
+
+
+def to_table(rows: List[Dict], schema: pa.Schema) -> pa.Table:
+    """Rows of a log as a typed table, with the `date` partition column"""
+    rows = [{FIELD_ALIASES.get(key, key): value for key, value in row.items()} for row in rows]
+    columns = {field.name: [_convert(row.get(field.name), field) for row in rows] for field in schema}
+    table = pa.table(columns, schema=schema)
+    return table.append_column('date', pc.strftime(table['timestamp'], format='%Y-%m-%d'))
+
+
+def load_state(warehouse_dir: str) -> Dict:
+    path = os.path.join(warehouse_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ingest(log_dir: str = LOG_DIR, warehouse_dir: str = WAREHOUSE_DIR) -> Dict[str, int]:
+    """
+    Append rows added to the logs since the last run as new Parquet files, one per date
+    partition touched (`<table>/date=YYYY-MM-DD/<log>-<offset>.parquet`). Each log's
+    byte offset is kept in the warehouse state, so nothing is converted twice.
+    """
+    os.makedirs(warehouse_dir, exist_ok=True)
+    state = load_state(warehouse_dir)
+    added = Counter()
+
+    for name, table_config in TABLES.items():
+        for path in log_files(log_dir, table_config['pattern']):
+            key = os.path.relpath(path, log_dir)
+            offset = state.get(key, {}).get('offset', 0)
+            if os.path.getsize(path) < offset:
+                offset = 0   # the log was rewritten: convert it again
+                for old in glob.glob(os.path.join(warehouse_dir, name, 'date=*', f"{_part_stem(key)}-*.parquet")):
+                    os.remove(old)
+            rows, end = read_new_rows(path, offset)
+            if rows:
+                table = to_table(rows, table_config['schema'])
+                for partition in pc.unique(table['date']).to_pylist():
+                    part = table.filter(pc.equal(table['date'], partition)).drop_columns(['date'])
+                    directory = os.path.join(warehouse_dir, name, f"date={partition}")
+                    os.makedirs(directory, exist_ok=True)
+                    pq.write_table(part, os.path.join(directory, f"{_part_stem(key)}-{offset:012d}.parquet"))
+                added[name] += table.num_rows
+            state[key] = {'offset': end, 'table': name, 'ingested': datetime.now().isoformat()}
+
+    with open(os.path.join(warehouse_dir, STATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    return dict(added)
+
+
+def _part_stem(key: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_]+', '_', os.path.splitext(key)[0])
+
+
+# =============================================================================
+# QUERIES
+# =============================================================================
+
+def open_table(warehouse_dir: str, name: str) -> Optional[ds.Dataset]:
+    """A table of the warehouse as a hive-partitioned dataset read through memory maps"""
+    directory = os.path.join(warehouse_dir, name)
+    if not os.path.isdir(directory):
+        return None
+    return ds.dataset(directory, format='parquet',
+                      partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'),
+                      filesystem=LocalFileSystem(use_mmap=True))
+
+
+def date_filter(start: Optional[date], end: Optional[date]):
+    """Partition filter on the inclusive date range (only matching partitions are opened)"""
+    expression = None
+    for bound, compare in ((start, pc.field('date') >= str(start)), (end, pc.field('date') <= str(end))):
+        if bound is not None:
+            expression = compare if expression is None else expression & compare
+    return expression
+
+
+def read_columns(dataset: ds.Dataset, columns: List[str], start: Optional[date], end: Optional[date],
+                 extra_filter=None) -> pa.Table:
+    expression = date_filter(start, end)
+    if extra_filter is not None:
+        expression = extra_filter if expression is None else expression & extra_filter
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def latency_percentiles(values: pa.ChunkedArray, percentiles: List[float] = PERCENTILES) -> Dict[str, float]:
+    values = pc.drop_null(values)
+    if len(values) == 0:
+        return {}
+    quantiles = pc.quantile(values, q=percentiles).to_pylist()
+    result = {f"p{round(q * 100):g}": value for q, value in zip(percentiles, quantiles)}
+    result.update(mean=pc.mean(values).as_py(), max=pc.max(values).as_py(), count=len(values))
+    return result
+
+
+def query(warehouse_dir: str = WAREHOUSE_DIR, start: Optional[date] = None, end: Optional[date] = None,
+          response_type: Optional[str] = None, top_n: int = 10) -> Dict:
+    """Latency, response-type mix, rejection rates and top questions between `start` and `end`"""
+    report = {'start': str(start) if start else None, 'end': str(end) if end else None}
+    interactions = open_table(warehouse_dir, 'interactions')
+    if interactions is not None:
+        table = read_columns(interactions, ['response_type', 'generation_time', 'is_climate_related', 'date'],
+                             start, end)
+        report['interactions'] = table.num_rows
+        mix = {row['values']: row['counts'] for row in pc.value_counts(table['response_type']).to_pylist()}
+        report['response_types'] = dict(sorted(mix.items(), key=lambda item: -item[1]))
+        rejected = sum(mix.get(kind, 0) for kind in REJECTED_TYPES)
+        report['rejection_rate'] = rejected / table.num_rows if table.num_rows else None
+
+        report['latency'] = {}
+        for kind in ([response_type] if response_type else sorted(mix)):
+            selected = table.filter(pc.equal(table['response_type'], kind))
+            report['latency'][kind] = latency_percentiles(selected['generation_time'])
+
+        daily = {}
+        for row in table.group_by('date').aggregate([('response_type', 'count')]).to_pylist():
+            daily[row['date']] = {'interactions': row['response_type_count']}
+        for row in table.filter(pc.is_in(table['response_type'], pa.array(REJECTED_TYPES))) \
+                .group_by('date').aggregate([('response_type', 'count')]).to_pylist():
+            daily[row['date']]['rejected'] = row['response_type_count']
+        report['daily'] = {day: dict(counts, rejection_rate=counts.get('rejected', 0) / counts['interactions'])
+                           for day, counts in sorted(daily.items())}
+
+        question_filter = pc.field('response_type') == response_type if response_type else None
+        questions = read_columns(interactions, ['user_question'], start, end, question_filter)['user_question']
+        normalized = pc.utf8_trim_whitespace(pc.utf8_lower(questions))
+        counts = pc.value_counts(normalized).to_pylist()
+        report['top_questions'] = [(row['values'], row['counts'])
+                                   for row in sorted(counts, key=lambda row: -row['counts'])[:top_n]]
+
+    summaries = open_table(warehouse_dir, 'session_summaries')
+    if summaries is not None:
+        table = read_columns(summaries, ['total_questions', 'rejected_questions', 'engagement_score'], start, end)
+        total = pc.sum(table['total_questions']).as_py() or 0
+        report['sessions'] = {
+            'sessions': table.num_rows,
+            'questions': total,
+            'question_rejection_rate': (pc.sum(table['rejected_questions']).as_py() or 0) / total if total else None,
+            'mean_engagement': pc.mean(table['engagement_score']).as_py() if table.num_rows else None
+        }
+    return report
+
+
+def print_report(report: Dict):
+    period = f"{report['start'] or 'first log'} .. {report['end'] or 'last log'}"
+    print(f"\nLOG ANALYTICS ({period}):")
+    if 'interactions' in report:
+        rate = report['rejection_rate']
+        print(f"   Interactions: {report['interactions']:,}, rejection rate "
+              f"{'-' if rate is None else f'{rate:.1%}'}")
+        print(f"\n   {'Response type':<16} {'Count':>8} {'Share':>7}")
+        for kind, count in report['response_types'].items():
+            print(f"   {kind:<16} {count:>8,} {count / max(report['interactions'], 1):>7.1%}")
+
+        print(f"\n   Generation time (s):")
+        print(f"   {'Response type':<16} {'n':>7} " + ' '.join(f"{f'p{round(q * 100):g}':>8}" for q in PERCENTILES))
+        for kind, latency in report['latency'].items():
+            if latency:
+                print(f"   {kind:<16} {latency['count']:>7,} " +
+                      ' '.join(f"{latency[f'p{round(q * 100):g}']:>8.3f}" for q in PERCENTILES))
+
+        if len(report['daily']) > 1:
+            print(f"\n   {'Date':<12} {'Interactions':>12} {'Rejected':>9}")
+            for day, counts in report['daily'].items():
+                print(f"   {day:<12} {counts['interactions']:>12,} {counts['rejection_rate']:>9.1%}")
+
+        print(f"\n   Top questions:")
+        for question, count in report['top_questions']:
+            print(f"   {count:>6,}  {question[:80]}")
+    if 'sessions' in report:
+        sessions = report['sessions']
+        rate, engagement = sessions['question_rejection_rate'], sessions['mean_engagement']
+        print(f"\n   Sessions: {sessions['sessions']:,} ({sessions['questions']:,} questions), rejected "
+              f"{'-' if rate is None else f'{rate:.1%}'}, mean engagement "
+              f"{'-' if engagement is None else f'{engagement:.2f}'}")
+
+
+# =============================================================================
+# SELF-CHECK
+# =============================================================================
+
+def self_check(log_dir: str = LOG_DIR) -> Dict:
+    """
+    Ingest a copy of the logs into a temporary warehouse and compare the query against
+    the raw rows; then append a 'rejected' interaction and check that only it is ingested
+    and that it counts as a rejection.
+    """
+    work_dir = tempfile.mkdtemp(prefix='log_analytics_check-')
+    try:
+        logs, warehouse = os.path.join(work_dir, 'logs'), os.path.join(work_dir, 'warehouse')
+        shutil.copytree(log_dir, logs)
+        expected = Counter()
+        for path in log_files(logs, TABLES['interactions']['pattern']):
+            expected.update(row['response_type'] for row in read_new_rows(path, 0)[0])
+        sessions = sum(len(read_new_rows(path, 0)[0])
+                       for path in log_files(logs, TABLES['session_summaries']['pattern']))
+
+        added = ingest(logs, warehouse)
+        report = query(warehouse)
+        total = sum(expected.values())
+        checks = {
+            'interactions': added.get('interactions', 0) == total == report.get('interactions', 0),
+            'sessions': added.get('session_summaries', 0) == sessions,
+            'response_types': report.get('response_types') == dict(expected),
+            'rejection_rate': report.get('rejection_rate') == (
+                sum(expected[kind] for kind in REJECTED_TYPES) / total if total else None),
+            'reingest_adds_nothing': sum(ingest(logs, warehouse).values()) == 0
+        }
+
+        path = os.path.join(logs, 'interactions_29991231.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'timestamp': '2999-12-31T12:00:00', 'session_id': 'self_check',
+                                'user_question': 'How do I cook pasta?', 'response_type': 'rejected',
+                                'generation_time': 0.001}) + '\n')
+        added = ingest(logs, warehouse)
+        day = query(warehouse, date(2999, 12, 31), date(2999, 12, 31))
+        checks['incremental'] = added == {'interactions': 1}
+        checks['rejected_counted'] = day.get('rejection_rate') == 1.0
+
+        return {'interactions': total, 'sessions': sessions, 'checks': checks, 'passed': all(checks.values())}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def parse_range(args) -> Tuple[Optional[date], Optional[date]]:
+    end = date.fromisoformat(args.end) if args.end else None
+    if args.last_days:
+        end = end or date.today()
+        return end - timedelta(days=args.last_days - 1), end
+    return (date.fromisoformat(args.start) if args.start else None), end
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partitioned Parquet analytics over the AyikaBot logs")
+    parser.add_argument('--warehouse', default=WAREHOUSE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = commands.add_parser('ingest', help="Convert new log rows to Parquet")
+    ingest_parser.add_argument('--log-dir', default=LOG_DIR)
+
+    query_parser = commands.add_parser('query', help="Report over a date range")
+    query_parser.add_argument('--start', help="First date (YYYY-MM-DD)")
+    query_parser.add_argument('--end', help="Last date (YYYY-MM-DD), inclusive")
+    query_parser.add_argument('--last-days', type=int, help="The N days up to --end (default: today)")
+    query_parser.add_argument('--response-type', help="Latency and top questions for one response type only")
+    query_parser.add_argument('--top', type=int, default=10)
+    query_parser.add_argument('--ingest', action='store_true', help="Ingest new log rows first")
+    query_parser.add_argument('--log-dir', default=LOG_DIR)
+    query_parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    check_parser = commands.add_parser('check', help="Ingest and query a copy of the logs in a temporary warehouse")
+    check_parser.add_argument('--log-dir', default=LOG_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        check = self_check(args.log_dir)
+        print(json.dumps(check, indent=2))
+        raise SystemExit(0 if check['passed'] else 1)
+
+    if args.command == 'ingest' or args.ingest:
+        added = ingest(args.log_dir, args.warehouse)
+        print(f"Ingested {sum(added.values()):,} new rows into {args.warehouse}: {added}")
+    if args.command == 'query':
+        start, end = parse_range(args)
+        report = query(args.warehouse, start, end, args.response_type, args.top)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
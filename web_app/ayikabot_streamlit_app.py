@@ -16,6 +16,8 @@ from firebase_admin import firestore
 
 # Add the current directory to Python path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Shared generation presets live next to the trained model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'climate_chatbot_BEST_exp4c'))
 
 # Try to import transformers, install if needed
 try:
@@ -24,9 +26,15 @@ except ImportError:
     st.error("Please install transformers: pip install transformers tensorflow")
     st.stop()
 
+from generation_presets import get_preset
+from interaction_rollups import add_rollup_writes, enable_rollups
+
 # Define Hugging Face Hub model ID
 HUGGING_FACE_MODEL_ID = "Climi/Climate-Education-QA-Chatbot"
 
+# Named generation preset used for climate answers (see generation_presets.py)
+GENERATION_PRESET = os.environ.get("AYIKABOT_PRESET", "pipeline")
+
 # Firebase Initialization
 # Use st.cache_resource to initialize Firebase only once
 @st.cache_resource
@@ -42,6 +50,7 @@ def initialize_firestore():
             firebase_admin.initialize_app(cred)
         
         db = firestore.client()
+        enable_rollups(db)
         # Log success message to console instead
         print("Firebase Firestore initialized successfully (backend log).")
         return db
@@ -272,9 +281,11 @@ def is_compliment(question: str) -> bool:
     return False
 
 # Firestore Logging Functions
-def log_user_interaction(db, question: str, response: str, metadata: Dict[str, Any], session_id: str = None):
+def log_user_interaction(db, question: str, response: str, metadata: Dict[str, Any], session_id: str = None,
+                         new_session: bool = False):
     """
-    Log user interactions to Firestore.
+    Log user interactions to Firestore, with the session/hourly/daily rollups
+    (interaction_rollups.py) updated in the same batch.
     """
     try:
         if session_id is None:
@@ -295,8 +306,11 @@ def log_user_interaction(db, question: str, response: str, metadata: Dict[str, A
             'response_length': len(response)
         }
         
-        # Add document to 'interactions' collection
-        db.collection('interactions').add(log_entry)
+        # Add document to 'interactions' collection and merge it into the rollups
+        batch = db.batch()
+        batch.set(db.collection('interactions').document(), log_entry)
+        add_rollup_writes(batch, db, log_entry, new_session)
+        batch.commit()
         # print(f"Logged interaction for session {session_id}") # For debugging in logs
             
     except Exception as e:
@@ -420,7 +434,7 @@ def detect_non_climate_topics(question: str) -> Tuple[bool, str]:
             return True, topic
     return False, ""
 
-def generate_climate_response(question: str, tokenizer, model) -> str:
+def generate_climate_response(question: str, tokenizer, model, preset: str = GENERATION_PRESET) -> str:
     """Generate response using the climate model"""
     try:
         prompt = f"question: {question.strip()}"
@@ -428,17 +442,9 @@ def generate_climate_response(question: str, tokenizer, model) -> str:
         output_ids = model.generate(
             inputs.input_ids,
             attention_mask=inputs.attention_mask,
-            max_length=100,
-            min_length=20,
-            temperature=0.7,
-            do_sample=True,
-            top_p=0.9,
-            top_k=50,
-            repetition_penalty=1.2,
-            num_beams=2,
-            early_stopping=True,
             pad_token_id=tokenizer.pad_token_id,
-            eos_token_id=tokenizer.eos_token_id
+            eos_token_id=tokenizer.eos_token_id,
+            **get_preset(preset)
         )
         answer = tokenizer.decode(output_ids[0], skip_special_tokens=True)
         
@@ -620,7 +626,8 @@ def main():
             st.session_state.last_processed_input = question_to_process
             
             # Log the interaction to Firestore
-            log_user_interaction(db, question_to_process, response, metadata)
+            log_user_interaction(db, question_to_process, response, metadata,
+                                 new_session=stats['questions_asked'] == 1)
             
             st.session_state.is_thinking = False
             st.session_state.pending_question = ""
@@ -0,0 +1,265 @@
+# =============================================================================
+# INTERACTION ROLLUPS
+# Per-session, per-hour and per-day aggregate documents in Firestore, merged
+# with Increment transforms in the same batch that logs each interaction, so
+# dashboards read a handful of documents instead of scanning 'interactions'
+# =============================================================================
+
+import math
+import json
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+ROLLUP_COLLECTIONS = {
+    'session': 'rollups_sessions',     # document id: session id
+    'hour': 'rollups_hourly',          # document id: YYYY-MM-DDTHH
+    'day': 'rollups_daily'             # document id: YYYY-MM-DD
+}
+META_DOCUMENT = ('rollups_meta', 'state')
+
+# Log-bucketed latency histogram: any quantile read back is within `relative_accuracy`
+# of a true generation time, and histograms of any documents merge by adding buckets
+SKETCH_CONFIG = {
+    'relative_accuracy': 0.02,
+    'min_value': 1e-4                  # faster generations (greetings) share the 'zero' bucket
+}
+_GAMMA = (1 + SKETCH_CONFIG['relative_accuracy']) / (1 - SKETCH_CONFIG['relative_accuracy'])
+
+PERCENTILES = [0.5, 0.9, 0.95, 0.99]
+BATCH_LIMIT = 500                      # writes per Firestore batch
+
+
+# =============================================================================
+# SKETCH
+# =============================================================================
+
+def sketch_bucket(value: float) -> str:
+    if value <= SKETCH_CONFIG['min_value']:
+        return 'zero'
+    return f"b{math.ceil(math.log(value, _GAMMA))}"
+
+
+def bucket_value(bucket: str) -> float:
+    if bucket == 'zero':
+        return 0.0
+    index = int(bucket[1:])
+    return 2 * _GAMMA ** index / (_GAMMA + 1)
+
+
+def sketch_quantile(buckets: Dict[str, int], q: float) -> Optional[float]:
+    """Approximate q-quantile of the values counted in `buckets`"""
+    ordered = sorted(buckets.items(), key=lambda item: bucket_value(item[0]))
+    total = sum(count for _, count in ordered)
+    if total == 0:
+        return None
+    rank, seen = q * (total - 1), 0
+    for bucket, count in ordered:
+        seen += count
+        if seen > rank:
+            return bucket_value(bucket)
+    return bucket_value(ordered[-1][0])
+
+
+# =============================================================================
+# ROLLUP DELTAS
+# =============================================================================
+
+def _timestamp(entry: Dict) -> datetime:
+    value = entry.get('timestamp') or datetime.now()
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def rollup_keys(entry: Dict) -> Dict[str, str]:
+    """Document id of each rollup an interaction belongs to"""
+    timestamp = _timestamp(entry)
+    return {'session': entry.get('session_id') or 'unknown',
+            'hour': timestamp.strftime('%Y-%m-%dT%H'),
+            'day': timestamp.strftime('%Y-%m-%d')}
+
+
+def interaction_delta(entry: Dict, new_session: bool = False) -> Dict:
+    """Counters one logged interaction adds to each of its rollups"""
+    response_type = entry.get('response_type', 'unknown')
+    generation_time = float(entry.get('generation_time', 0.0) or 0.0)
+    climate = response_type == 'climate_answer'
+    delta = {
+        'interactions': 1,
+        'climate_questions': int(climate),
+        'rejected_questions': int(not climate),
+        'response_types': {response_type: 1},
+        'generation_time_sum': generation_time,
+        'confidence_sum': float(entry.get('confidence_score', 0.0) or 0.0),
+        'question_length_sum': int(entry.get('question_length', 0) or 0),
+        'response_length_sum': int(entry.get('response_length', 0) or 0)
+    }
+    if climate:
+        # Latency sums and sketch cover generated answers only, like avg_response_time
+        delta['climate_generation_time_sum'] = generation_time
+        delta['latency_sketch'] = {sketch_bucket(generation_time): 1}
+    if new_session:
+        delta['sessions_started'] = 1
+    return delta
+
+
+def merge_delta(total: Dict, delta: Dict):
+    """Add `delta` into `total` in place (nested maps are merged key by key)"""
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            merge_delta(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def _increments(delta: Dict) -> Dict:
+    """A delta as nested Increment transforms (set with merge=True applies them field by field)"""
+    from firebase_admin import firestore
+    return {key: _increments(value) if isinstance(value, dict) else firestore.Increment(value)
+            for key, value in delta.items()}
+
+
+def add_rollup_writes(batch, db, entry: Dict, new_session: bool = False):
+    """Queue the rollup updates of one interaction on `batch` (committed with the interaction itself)"""
+    delta = interaction_delta(entry, new_session)
+    timestamp = _timestamp(entry)
+    for granularity, key in rollup_keys(entry).items():
+        fields = _increments(delta)
+        fields.update(period=key, last_interaction=timestamp)
+        if granularity == 'session':
+            fields.pop('sessions_started', None)
+        batch.set(db.collection(ROLLUP_COLLECTIONS[granularity]).document(key), fields, merge=True)
+
+
+def enable_rollups(db):
+    """Record when live rollups started (once); the backfill covers everything logged before it"""
+    reference = db.collection(META_DOCUMENT[0]).document(META_DOCUMENT[1])
+    if not reference.get().exists:
+        reference.set({'enabled_at': datetime.now()}, merge=True)
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+def summarize(rollup: Dict) -> Dict:
+    """Dashboard figures of one rollup (or of several merged with merge_delta)"""
+    interactions = rollup.get('interactions', 0)
+    climate = rollup.get('climate_questions', 0)
+    sketch = rollup.get('latency_sketch', {})
+    return {
+        'interactions': interactions,
+        'sessions_started': rollup.get('sessions_started', 0),
+        'climate_questions': climate,
+        'rejected_questions': rollup.get('rejected_questions', 0),
+        'rejection_rate': rollup.get('rejected_questions', 0) / interactions if interactions else None,
+        'avg_response_time': rollup.get('climate_generation_time_sum', 0.0) / climate if climate else 0.0,
+        'engagement_score': climate / interactions if interactions else 0.0,
+        'response_types': rollup.get('response_types', {}),
+        'latency_percentiles': {f"p{round(q * 100):g}": sketch_quantile(sketch, q) for q in PERCENTILES}
+    }
+
+
+def read_rollups(db, granularity: str, start: str, end: str) -> List[Dict]:
+    """Rollup documents whose period lies in [start, end] (ids sort chronologically)"""
+    query = db.collection(ROLLUP_COLLECTIONS[granularity]) \
+        .where('period', '>=', start).where('period', '<=', end).order_by('period')
+    return [document.to_dict() for document in query.stream()]
+
+
+def period_summary(db, start: str, end: str) -> Dict:
+    """Merged daily rollups between two dates (YYYY-MM-DD), plus each day's figures"""
+    days = read_rollups(db, 'day', start, end)
+    total = {}
+    for day in days:
+        merge_delta(total, {key: value for key, value in day.items() if key not in ('period', 'last_interaction')})
+    return dict(summarize(total), days={day['period']: summarize(day) for day in days})
+
+
+# =============================================================================
+# BACKFILL
+# =============================================================================
+
+def compute_rollups(entries: Iterable[Dict]) -> Dict[str, Dict[str, Dict]]:
+    """Exact rollups of a set of interactions: {granularity: {document id: delta}}"""
+    rollups = {granularity: defaultdict(dict) for granularity in ROLLUP_COLLECTIONS}
+    sessions_seen = set()
+    for entry in sorted(entries, key=_timestamp):
+        keys = rollup_keys(entry)
+        # A session counts as started in the hour and day of its first interaction, as when logged live
+        new_session = keys['session'] not in sessions_seen
+        sessions_seen.add(keys['session'])
+        for granularity, key in keys.items():
+            rollup = rollups[granularity][key]
+            merge_delta(rollup, interaction_delta(entry, new_session and granularity != 'session'))
+            rollup['last_interaction'] = _timestamp(entry)
+    return rollups
+
+
+def backfill(db, until: Optional[datetime] = None, batch_size: int = BATCH_LIMIT) -> Dict[str, int]:
+    """
+    Fold the interactions logged before live rollups were enabled (after the last backfill
+    checkpoint) into the rollup documents, as Increments so live updates are kept.
+    """
+    meta = db.collection(META_DOCUMENT[0]).document(META_DOCUMENT[1])
+    state = meta.get().to_dict() or {}
+    until = until or state.get('enabled_at') or datetime.now()
+    since = state.get('backfilled_until')
+
+    query = db.collection('interactions').where('timestamp', '<', until)
+    if since is not None:
+        query = query.where('timestamp', '>=', since)
+    entries = [document.to_dict() for document in query.stream()]
+    rollups = compute_rollups(entries)
+
+    writes = [(ROLLUP_COLLECTIONS[granularity], key, delta)
+              for granularity, documents in rollups.items() for key, delta in documents.items()]
+    for start in range(0, len(writes), batch_size):
+        batch = db.batch()
+        for collection, key, delta in writes[start:start + batch_size]:
+            fields = _increments({name: value for name, value in delta.items() if name != 'last_interaction'})
+            fields.update(period=key, last_interaction=delta['last_interaction'])
+            batch.set(db.collection(collection).document(key), fields, merge=True)
+        batch.commit()
+    meta.set({'backfilled_until': until}, merge=True)
+    return {granularity: len(documents) for granularity, documents in rollups.items()} | {'interactions': len(entries)}
+
+
+def _read_local_logs(paths: List[str]) -> Iterable[Dict]:
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and read AyikaBot interaction rollups")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backfill_parser = commands.add_parser('backfill', help="Fold interactions logged before rollups into them")
+    backfill_parser.add_argument('--service-account', default="ayikabot-v1-firebase-adminsdk-fbsvc-ad7ae9cf65.json")
+    report_parser = commands.add_parser('report', help="Summary of the last N days from the daily rollups")
+    report_parser.add_argument('--days', type=int, default=7)
+    report_parser.add_argument('--service-account', default="ayikabot-v1-firebase-adminsdk-fbsvc-ad7ae9cf65.json")
+    local_parser = commands.add_parser('local', help="Rollups of local interaction logs (no Firestore)")
+    local_parser.add_argument('logs', nargs='+', help="interactions_*.json files (JSON lines)")
+    args = parser.parse_args()
+
+    if args.command == 'local':
+        rollups = compute_rollups(_read_local_logs(args.logs))
+        for key, rollup in sorted(rollups['day'].items()):
+            print(key, json.dumps(summarize(rollup), indent=2))
+    else:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(args.service_account))
+        db = firestore.client()
+        if args.command == 'backfill':
+            print(f"Backfilled rollups: {backfill(db)}")
+        else:
+            end = datetime.now()
+            summary = period_summary(db, (end - timedelta(days=args.days - 1)).strftime('%Y-%m-%d'),
+                                     end.strftime('%Y-%m-%d'))
+            print(json.dumps(summary, indent=2, default=str))